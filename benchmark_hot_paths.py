@@ -0,0 +1,258 @@
+"""
+Micro-benchmarks de las Rutas Más Costosas en Python
+Mide con datos sintéticos de 10, 1.000 y 100.000 filas el trabajo que
+hacen las rutas después de consultar Supabase:
+
+- evolution:   build_competencias_evolution (GET /api/monthly/evolution)
+- comparison:  compute_competencias_stats (GET /api/monthly/comparison/{id})
+- financial:   group_financial_records (GET /api/financial/summary)
+- tasks_by_day: group_tasks_by_day (GET /api/dashboard/tasks-by-day)
+- model_dict:  DailyTask(**payload).dict() + isoformat de fechas (POST/PUT)
+- analytics:   compute_productivity_analytics (GET /api/analytics, 24 meses)
+
+Se mide el menor tiempo por llamada y se compara con benchmark_baseline.json:
+un caso más lento que la línea base por encima de la tolerancia (y de
+--min-delta-ms) es una regresión (exit 1). Las líneas base dependen de la máquina: regenerarlas con --save-baseline
+en la misma máquina donde se comparan.
+
+Uso:
+    python benchmark_hot_paths.py
+    python benchmark_hot_paths.py --sizes 10 1000 --tolerance 0.5
+    python benchmark_hot_paths.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+# Sin red: los benchmarks no consultan la base de datos
+os.environ.setdefault("SUPABASE_BACKEND", "memory")
+
+import main
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+DEFAULT_SIZES = [10, 1_000, 100_000]
+# Tiempo mínimo medido por caso (se repite la función hasta alcanzarlo)
+MIN_SAMPLE_SECONDS = 0.2
+
+COMPETENCIAS = [
+    "Comunicación Efectiva", "Liderazgo", "Pensamiento Crítico",
+    "Programación Python", "Análisis de Datos", "Gestión del Tiempo",
+]
+CATEGORIAS = ["Alimentación", "Transporte", "Vivienda", "Servicios", "Salario", None]
+ESTADOS = ["pendiente", "en_progreso", "completada", "cancelada"]
+
+def print_header(text):
+    print("\n" + "="*78)
+    print(f"  {text}")
+    print("="*78)
+
+# ============================================
+# GENERADORES DE DATOS SINTÉTICOS
+# ============================================
+
+def make_plans(n):
+    """n planes mensuales con 4 competencias cada uno (los meses se repiten cada 100 años)"""
+    inicio = date(2015, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "mes": (inicio + timedelta(days=31 * (i % 1200))).replace(day=1).isoformat(),
+            "competencias": [
+                {
+                    "nombre": nombre,
+                    "progreso_inicio": random.randint(0, 50),
+                    "progreso_actual": random.randint(30, 90),
+                    "progreso_fin": random.choice([None, random.randint(50, 100)]),
+                }
+                for nombre in random.sample(COMPETENCIAS, 4)
+            ],
+        }
+        for i in range(n)
+    ]
+
+def make_competencias(n):
+    """n competencias de un plan"""
+    return [
+        {
+            "nombre": f"{random.choice(COMPETENCIAS)} {i}",
+            "progreso_inicio": random.randint(0, 50),
+            "progreso_actual": random.randint(30, 90),
+            "progreso_fin": random.choice([None, random.randint(50, 100)]),
+        }
+        for i in range(n)
+    ]
+
+def make_financial_records(n):
+    """n registros financieros de un mes"""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tipo": random.choice(["gasto", "gasto", "ingreso", "deuda"]),
+            "monto": f"{random.uniform(1, 500):.2f}",
+            "categoria_nombre": random.choice(CATEGORIAS),
+        }
+        for _ in range(n)
+    ]
+
+def make_tasks(n):
+    """n tareas repartidas en los últimos 90 días"""
+    hoy = date.today()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "fecha_inicio": (hoy - timedelta(days=random.randint(0, 90))).isoformat(),
+            "estado": random.choice(ESTADOS),
+        }
+        for _ in range(n)
+    ]
+
+def make_task_payloads(n):
+    """n cuerpos JSON de POST /api/tasks"""
+    hoy = date.today()
+    return [
+        {
+            "titulo": f"Tarea {i}",
+            "descripcion": "Revisar documentación",
+            "fecha_inicio": hoy.isoformat(),
+            "fecha_fin": (hoy + timedelta(days=3)).isoformat(),
+            "clasificacion": "desarrollo",
+            "prioridad": random.choice(["baja", "media", "alta"]),
+            "tags": ["python", "docs"],
+        }
+        for i in range(n)
+    ]
+
+def make_analytics_columns(n):
+    """Columnas de n tareas de los últimos 3 años y una bitácora por semana"""
+    hoy = date.today()
+    inicios = [hoy - timedelta(days=random.randint(0, 1095)) for _ in range(n)]
+    semanas = [hoy - timedelta(days=7 * i + hoy.weekday()) for i in range(156)]
+    tasks = {
+        "estado": [random.choice(ESTADOS) for _ in range(n)],
+        "clasificacion": [random.choice(["desarrollo", "estudio", "reunion", None]) for _ in range(n)],
+        "fecha_inicio": [d.isoformat() for d in inicios],
+        "fecha_fin": [(d + timedelta(days=random.randint(0, 5))).isoformat() for d in inicios],
+        "tiempo_estimado": [random.choice([None, 30, 60, 120]) for _ in range(n)],
+        "tiempo_real": [random.choice([None, 25, 50, 90, 150]) for _ in range(n)],
+        "completed_at": [None] * n,
+    }
+    logs = {
+        "semana_inicio": [s.isoformat() for s in semanas],
+        "semana_fin": [(s + timedelta(days=6)).isoformat() for s in semanas],
+        "nivel_energia": [random.randint(1, 5) for _ in semanas],
+        "nivel_satisfaccion": [random.randint(1, 5) for _ in semanas],
+    }
+    return tasks, logs
+
+# ============================================
+# CASOS
+# ============================================
+
+def analytics(columns):
+    """Métricas de /api/analytics sobre las columnas ya leídas"""
+    tasks, logs = columns
+    return main.compute_productivity_analytics(tasks, logs, 24, date.today())
+
+def model_rows(payloads):
+    """Patrón de las rutas de creación: validar, .dict() y fechas a ISO"""
+    rows = []
+    for payload in payloads:
+        data = main.DailyTask(**payload).dict()
+        for key in ("fecha_inicio", "fecha_fin"):
+            if isinstance(data.get(key), date):
+                data[key] = data[key].isoformat()
+        rows.append(data)
+    return rows
+
+CASES = {
+    "evolution": (make_plans, main.build_competencias_evolution),
+    "comparison": (make_competencias, main.compute_competencias_stats),
+    "financial": (make_financial_records, main.group_financial_records),
+    "tasks_by_day": (make_tasks, main.group_tasks_by_day),
+    "model_dict": (make_task_payloads, model_rows),
+    "analytics": (make_analytics_columns, analytics),
+}
+
+def measure(func, data):
+    """Menor tiempo por llamada (ms) repitiendo hasta MIN_SAMPLE_SECONDS
+
+    El mínimo es más estable que la mediana frente al ruido de la máquina
+    (otros procesos, GC), que solo puede sumar tiempo.
+    """
+    samples = []
+    total = 0.0
+    while total < MIN_SAMPLE_SECONDS or len(samples) < 3:
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed * 1000)
+        total += elapsed
+    return min(samples), len(samples)
+
+def main_benchmark():
+    """Función principal de los benchmarks"""
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de rutas")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fracción más lenta que la línea base permitida (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="diferencias absolutas menores no cuentan como regresión")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="guardar los resultados como nueva línea base")
+    args = parser.parse_args()
+
+    random.seed(42)
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    results = {}
+    regressions = []
+
+    print_header("MICRO-BENCHMARKS DE RUTAS")
+    print(f"{'Caso':<26}{'Filas':>9}{'Mínimo ms':>13}{'Base ms':>11}{'Cambio':>9}{'n':>6}")
+    print("-"*78)
+
+    for name in args.cases:
+        generator, func = CASES[name]
+        for size in args.sizes:
+            key = f"{name}/{size}"
+            data = generator(size)
+            best_ms, samples = measure(func, data)
+            results[key] = round(best_ms, 4)
+
+            base = baseline.get(key)
+            change = ""
+            if base:
+                ratio = best_ms / base - 1
+                change = f"{ratio:+.0%}"
+                if ratio > args.tolerance and best_ms - base > args.min_delta_ms:
+                    regressions.append((key, base, best_ms))
+                    change += " ❌"
+            base_text = f"{base:.3f}" if base else "-"
+            print(f"{name:<26}{size:>9}{best_ms:>13.3f}{base_text:>11}{change:>9}{samples:>6}")
+
+    print("-"*78)
+
+    if args.save_baseline:
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"✅ Línea base guardada en {BASELINE_PATH.name}")
+        return 0
+
+    if regressions:
+        print(f"❌ {len(regressions)} regresión(es) por encima de {args.tolerance:.0%}:")
+        for key, base, actual in regressions:
+            print(f"   - {key}: {base:.3f} ms -> {actual:.3f} ms")
+        return 1
+
+    print("✅ Sin regresiones" if baseline else "⚠️  Sin línea base: ejecutar con --save-baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
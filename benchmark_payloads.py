@@ -0,0 +1,176 @@
+"""
+Benchmark de Serialización y Compresión de Respuestas
+Mide el tiempo de serialización (json estándar vs orjson) y los bytes
+enviados por la red (sin comprimir, gzip y brotli) para payloads
+representativos de la API.
+
+Uso:
+    python benchmark_payloads.py
+    python benchmark_payloads.py --repeat 50
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPETENCIAS = [
+    "Comunicación Efectiva", "Liderazgo", "Pensamiento Crítico",
+    "Programación Python", "Análisis de Datos", "Gestión del Tiempo",
+]
+
+def print_header(text):
+    print("\n" + "="*78)
+    print(f"  {text}")
+    print("="*78)
+
+def make_monthly_plan(user_id, mes):
+    """Generar un plan mensual con competencias y actividades (JSONB)"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "mes": mes.isoformat(),
+        "competencias_trabajar": "Mejorar comunicación y análisis de datos",
+        "competencias": [
+            {
+                "nombre": nombre,
+                "progreso_inicio": random.randint(0, 50),
+                "progreso_actual": random.randint(30, 90),
+                "progreso_fin": random.choice([None, random.randint(50, 100)]),
+                "evidencias": [],
+                "notas": "Avance constante durante el mes",
+            }
+            for nombre in random.sample(COMPETENCIAS, 4)
+        ],
+        "que_quiero_lograr": "Completar el curso y presentar resultados al equipo " * 3,
+        "actividades_lograr": [
+            {"titulo": f"Actividad {i}", "completada": bool(i % 2), "fecha": mes.isoformat()}
+            for i in range(6)
+        ],
+        "mis_fortalezas": "Organización, constancia, curiosidad",
+        "mis_debilidades": "Procrastinación en tareas largas",
+        "objetivos": "Objetivo del mes " * 5,
+        "fortalezas": ["Proactivo", "Organizado"],
+        "debilidades": ["Timidez en presentaciones"],
+        "mejoras_hacer": "Practicar presentaciones cortas",
+        "herramientas_apoyo": ["Notion", "Coursera", "Anki"],
+        "created_at": "2026-01-12T10:00:00+00:00",
+        "updated_at": "2026-01-12T10:00:00+00:00",
+    }
+
+def make_task(user_id, fecha):
+    """Generar una tarea diaria"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "titulo": "Revisar documentación del proyecto",
+        "descripcion": "Leer y resumir la documentación técnica " * 2,
+        "fecha_inicio": fecha.isoformat(),
+        "fecha_fin": (fecha + timedelta(days=2)).isoformat(),
+        "clasificacion": "documentacion",
+        "categoria": "aprendizaje",
+        "estado": random.choice(["pendiente", "en_progreso", "completada"]),
+        "prioridad": "media",
+        "progreso": random.randint(0, 100),
+        "tiempo_estimado": 60,
+        "tiempo_real": 75,
+        "parent_task_id": None,
+        "es_macrotarea": False,
+        "orden": 0,
+        "tags": ["docs", "proyecto"],
+        "notas": None,
+        "observaciones": None,
+        "created_at": "2026-01-12T10:00:00+00:00",
+        "updated_at": "2026-01-12T10:00:00+00:00",
+        "completed_at": None,
+    }
+
+def evolution_payload(months):
+    """Payload equivalente a GET /api/monthly/evolution"""
+    user_id = str(uuid.uuid4())
+    today = date.today().replace(day=1)
+    plans = []
+    for i in range(months):
+        year, month = divmod(today.year * 12 + today.month - 1 - i, 12)
+        plans.append(make_monthly_plan(user_id, date(year, month + 1, 1)))
+
+    evolution = {}
+    for plan in plans:
+        for comp in plan["competencias"]:
+            evolution.setdefault(comp["nombre"], []).append({
+                "mes": plan["mes"],
+                "progreso_inicio": comp["progreso_inicio"],
+                "progreso_actual": comp["progreso_actual"],
+                "progreso_fin": comp["progreso_fin"],
+            })
+    return {"evolution": evolution, "plans": plans}
+
+def tasks_payload(count):
+    """Payload equivalente a GET /api/tasks"""
+    user_id = str(uuid.uuid4())
+    start = date.today() - timedelta(days=count)
+    return [make_task(user_id, start + timedelta(days=i % 365)) for i in range(count)]
+
+def time_call(func, repeat):
+    """Tiempo medio por llamada en milisegundos"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def bench(name, payload, repeat):
+    """Medir serialización y tamaño en la red de un payload"""
+    std_ms = time_call(lambda: json.dumps(payload, ensure_ascii=False).encode("utf-8"), repeat)
+    orjson_ms = time_call(lambda: orjson.dumps(payload), repeat)
+
+    body = orjson.dumps(payload)
+    gzip_body = gzip.compress(body, compresslevel=6)
+    br_body = brotli.compress(body, quality=4) if brotli else None
+
+    print(f"\n{name}")
+    print(f"  json.dumps:   {std_ms:9.3f} ms")
+    print(f"  orjson.dumps: {orjson_ms:9.3f} ms   ({std_ms / orjson_ms:5.1f}x)")
+    print(f"  sin comprimir:{len(body):10d} bytes")
+    print(f"  gzip (6):     {len(gzip_body):10d} bytes   ({len(gzip_body) / len(body):6.1%})")
+    if br_body is not None:
+        print(f"  brotli (4):   {len(br_body):10d} bytes   ({len(br_body) / len(body):6.1%})")
+    else:
+        print("  brotli:       no instalado (pip install brotli)")
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones por medición")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para datos sintéticos")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    print_header("BENCHMARK DE SERIALIZACIÓN Y COMPRESIÓN")
+
+    payloads = [
+        ("GET /api/monthly/evolution (6 meses)", evolution_payload(6)),
+        ("GET /api/monthly/evolution (36 meses)", evolution_payload(36)),
+        ("GET /api/tasks (100 tareas)", tasks_payload(100)),
+        ("GET /api/tasks (2000 tareas)", tasks_payload(2000)),
+    ]
+
+    for name, payload in payloads:
+        bench(name, payload, args.repeat)
+
+    print("\n" + "="*78 + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
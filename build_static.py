@@ -0,0 +1,124 @@
+"""
+Build de Assets Estáticos
+Genera en static/dist el CSS de Tailwind + DaisyUI precompilado y purgado
+(solo las clases usadas), el JS de la aplicación y las librerías de terceros,
+todos con el hash del contenido en el nombre, más un manifest.json que usa
+main.py para resolver las URLs en las plantillas.
+
+Requisitos:
+    npm install
+
+Uso:
+    python build_static.py
+"""
+
+import hashlib
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+SRC_DIR = ROOT / "static" / "src"
+DIST_DIR = ROOT / "static" / "dist"
+NODE_MODULES = ROOT / "node_modules"
+
+TAILWIND_CONFIG = ROOT / "frontend" / "tailwind.config.js"
+TAILWIND_INPUT = ROOT / "frontend" / "tailwind.css"
+
+# Librerías de terceros copiadas desde node_modules (nombre lógico -> archivo)
+VENDOR_FILES = {
+    "vendor/alpine.js": NODE_MODULES / "alpinejs" / "dist" / "cdn.min.js",
+    "vendor/apexcharts.js": NODE_MODULES / "apexcharts" / "dist" / "apexcharts.min.js",
+}
+
+HASH_LENGTH = 12
+
+def print_header(text):
+    print("\n" + "="*70)
+    print(f"  {text}")
+    print("="*70)
+
+def content_hash(data: bytes) -> str:
+    """Hash corto del contenido para el nombre del archivo"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def write_hashed(name: str, data: bytes, manifest: dict):
+    """Escribir un asset con hash en el nombre y registrarlo en el manifiesto"""
+    logical = Path(name)
+    hashed_name = f"{logical.stem}.{content_hash(data)}{logical.suffix}"
+    target = DIST_DIR / logical.parent / hashed_name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(data)
+
+    manifest[name] = (Path("dist") / logical.parent / hashed_name).as_posix()
+    print(f"✅ {name} -> {manifest[name]} ({len(data) / 1024:.1f} KB)")
+
+def build_css(manifest: dict):
+    """Compilar Tailwind + DaisyUI con purga de clases y añadir los estilos propios"""
+    npx = shutil.which("npx")
+    if npx is None:
+        raise RuntimeError("npx no encontrado. Instala Node.js y ejecuta 'npm install'")
+
+    output = DIST_DIR / "tailwind.tmp.css"
+    subprocess.run(
+        [
+            npx, "tailwindcss",
+            "--config", str(TAILWIND_CONFIG),
+            "--input", str(TAILWIND_INPUT),
+            "--output", str(output),
+            "--minify",
+        ],
+        cwd=ROOT,
+        check=True,
+    )
+
+    css = output.read_bytes()
+    output.unlink()
+
+    custom = SRC_DIR / "css" / "custom.css"
+    if custom.exists():
+        css += b"\n" + custom.read_bytes()
+
+    write_hashed("css/app.css", css, manifest)
+
+def build_js(manifest: dict):
+    """Copiar el JS de la aplicación con hash"""
+    for path in sorted((SRC_DIR / "js").glob("*.js")):
+        write_hashed(f"js/{path.name}", path.read_bytes(), manifest)
+
+def build_vendor(manifest: dict):
+    """Copiar las librerías de terceros desde node_modules con hash"""
+    for name, path in VENDOR_FILES.items():
+        if not path.exists():
+            raise RuntimeError(f"{path} no existe. Ejecuta 'npm install'")
+        write_hashed(name, path.read_bytes(), manifest)
+
+def main():
+    """Función principal del build"""
+    print_header("BUILD DE ASSETS ESTÁTICOS")
+
+    # Build limpio: los archivos con hash antiguos no se reutilizan
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    DIST_DIR.mkdir(parents=True)
+
+    manifest = {}
+    try:
+        build_css(manifest)
+        build_js(manifest)
+        build_vendor(manifest)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"❌ Error en el build: {e}")
+        shutil.rmtree(DIST_DIR, ignore_errors=True)
+        return 1
+
+    manifest_path = DIST_DIR / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    print(f"\n✅ Manifiesto: {manifest_path.relative_to(ROOT)} ({len(manifest)} assets)")
+    print("="*70 + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -58,6 +58,7 @@ def check_files():
         "main.py": True,
         "requirements.txt": True,
         "Procfile": True,
+        "serve.py": True,
         ".gitignore": True,
         "templates/dashboard.html": True,
         "templates/login.html": True,
@@ -155,6 +156,11 @@ def check_production_settings():
         print("❌ ALLOWED_ORIGINS: No configurado")
         checks.append(False)
 
+    # El backend en memoria es solo para desarrollo y pruebas de carga
+    if os.getenv("SUPABASE_BACKEND", "supabase") == "memory":
+        print("❌ SUPABASE_BACKEND: memory (los datos se pierden al reiniciar)")
+        checks.append(False)
+
     return all(checks)
 
 def check_requirements():
@@ -164,12 +170,14 @@ def check_requirements():
     required_packages = [
         "fastapi",
         "uvicorn",
+        "gunicorn",
         "supabase",
         "python-jose",
         "passlib",
         "pydantic",
         "python-multipart",
-        "python-dotenv"
+        "python-dotenv",
+        "numpy"
     ]
 
     try:
@@ -0,0 +1,12 @@
+/** Configuración de Tailwind para el build de producción (build_static.py) */
+module.exports = {
+  // Solo se generan las clases usadas en las plantillas y el JS de la app
+  content: [
+    "./templates/**/*.html",
+    "./static/src/js/**/*.js",
+  ],
+  plugins: [require("daisyui")],
+  daisyui: {
+    themes: ["light", "dark"],
+  },
+};
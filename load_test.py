@@ -0,0 +1,224 @@
+"""
+Prueba de Carga de la API
+Reproduce la sesión típica de un usuario (login -> resumen del dashboard ->
+tareas -> mover una tarea de columna -> plan mensual -> pestaña de finanzas)
+con N usuarios virtuales concurrentes y reporta el throughput y los
+percentiles p50/p95/p99 por ruta.
+
+Sin --url la API se ejecuta dentro del mismo proceso con el backend de
+Supabase en memoria (SUPABASE_BACKEND=memory), sin servidor ni red, y
+con LOG_LEVEL=WARNING para que los logs de la app no se mezclen con el
+reporte.
+Contra un servidor real, inícialo con un solo worker y
+SUPABASE_BACKEND=memory, o apúntalo a un proyecto de Supabase de pruebas.
+
+Uso:
+    python load_test.py --users 20 --sessions 5
+    python load_test.py --url http://localhost:8000 --users 50 --duration 60
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+# Segmentos de URL que son ids: se agrupan como {id} en el reporte
+ID_SEGMENT = re.compile(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+def print_header(text):
+    print("\n" + "="*70)
+    print(f"  {text}")
+    print("="*70)
+
+def percentile(values, p):
+    """Percentil por rango más cercano (values ordenados)"""
+    if not values:
+        return 0.0
+    index = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+class Stats:
+    """Latencias y errores por ruta"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route: str, elapsed_ms: float, ok: bool):
+        self.latencies.setdefault(route, []).append(elapsed_ms)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, elapsed_s: float):
+        total = sum(len(v) for v in self.latencies.values())
+        errors = sum(self.errors.values())
+
+        print_header("RESULTADOS")
+        print(f"{'Ruta':<44}{'n':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        print("-"*93)
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            print(
+                f"{route[:43]:<44}{len(values):>7}{self.errors.get(route, 0):>6}"
+                f"{percentile(values, 50):>9.1f}{percentile(values, 95):>9.1f}"
+                f"{percentile(values, 99):>9.1f}{values[-1]:>9.1f}"
+            )
+        print("-"*93)
+
+        all_values = sorted(v for values in self.latencies.values() for v in values)
+        print(f"Peticiones: {total}  Errores: {errors}  Duración: {elapsed_s:.1f} s")
+        print(f"Throughput: {total / elapsed_s if elapsed_s else 0:.1f} req/s")
+        print(
+            f"Global (ms): p50 {percentile(all_values, 50):.1f}  "
+            f"p95 {percentile(all_values, 95):.1f}  p99 {percentile(all_values, 99):.1f}"
+        )
+        print("="*70 + "\n")
+        return errors
+
+class VirtualUser:
+    """Usuario virtual: se registra una vez y repite la sesión"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, number: int):
+        self.client = client
+        self.stats = stats
+        self.email = f"carga_{number}_{uuid.uuid4().hex[:8]}@example.com"
+        self.password = "Carga-12345"
+        self.headers = {}
+
+    async def call(self, method: str, url: str, **kwargs):
+        """Petición cronometrada; el reporte agrupa por método + ruta sin ids"""
+        route = f"{method} {ID_SEGMENT.sub('/{id}', url.split('?')[0])}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.stats.record(route, (time.perf_counter() - start) * 1000, ok)
+        return response.json() if ok and response.content else None
+
+    async def register(self):
+        data = await self.call("POST", "/api/auth/register", json={
+            "email": self.email, "password": self.password, "nombre_completo": "Usuario de carga"
+        })
+        return data is not None
+
+    async def session(self):
+        """Una sesión completa como la hace el dashboard"""
+        hoy = date.today()
+        mes = hoy.replace(day=1).isoformat()
+
+        login = await self.call("POST", "/api/auth/login", json={"email": self.email, "password": self.password})
+        if not login:
+            return
+        self.headers = {"Authorization": f"Bearer {login['access_token']}"}
+
+        # Dashboard
+        await self.call("GET", "/api/dashboard/summary")
+        await self.call("GET", "/api/config")
+        await self.call("GET", "/api/tasks")
+
+        # Tareas: crear y moverlas de columna (drag & drop)
+        creadas = []
+        for i in range(3):
+            task = await self.call("POST", "/api/tasks", json={
+                "titulo": f"Tarea de carga {i}",
+                "descripcion": "Generada por load_test.py",
+                "fecha_inicio": hoy.isoformat(),
+                "fecha_fin": (hoy + timedelta(days=i)).isoformat(),
+                "clasificacion": "desarrollo",
+            })
+            if task:
+                creadas.append(task)
+        for task in creadas:
+            await self.call("PUT", f"/api/tasks/{task['id']}", json={"estado": "en_progreso"})
+        await self.call("GET", "/api/dashboard/tasks-by-day")
+
+        # Plan mensual (cada sesión guarda de nuevo el del mes: upsert)
+        await self.call("GET", "/api/monthly/plans")
+        plan = await self.call("POST", "/api/monthly/plans?upsert=true", json={
+            "mes": mes,
+            "que_quiero_lograr": "Mejorar la prueba de carga",
+            "competencias": [{"nombre": "Python", "progreso_inicio": 40, "progreso_actual": 55}],
+        })
+        await self.call("GET", "/api/monthly/evolution?months=6&include_plans=false")
+        if plan:
+            await self.call("GET", f"/api/monthly/plans/{plan['id']}/detail")
+
+        # Finanzas
+        categorias = await self.call("GET", "/api/financial/categories")
+        if not categorias:
+            await self.call("POST", "/api/financial/initialize")
+            categorias = await self.call("GET", "/api/financial/categories") or []
+        gasto = next((c for c in categorias if c["tipo"] == "gasto"), None)
+        await self.call("POST", "/api/financial/records", json={
+            "mes": mes,
+            "fecha_transaccion": hoy.isoformat(),
+            "tipo": "gasto",
+            "monto": 12.5,
+            "descripcion": "Café",
+            "category_id": gasto["id"] if gasto else None,
+        })
+        await self.call("GET", f"/api/financial/records?mes={mes}")
+        await self.call("GET", f"/api/financial/summary?mes={mes}")
+
+async def run_user(client, stats, number, sessions, deadline):
+    user = VirtualUser(client, stats, number)
+    if not await user.register():
+        return
+    done = 0
+    while (deadline is None and done < sessions) or (deadline is not None and time.monotonic() < deadline):
+        await user.session()
+        done += 1
+
+def build_client(url):
+    """Cliente HTTP contra un servidor o contra la app en el mismo proceso"""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=30, limits=limits)
+
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    # Sin el access log de cada petición (INFO) mezclado con el reporte;
+    # LOG_LEVEL=INFO lo vuelve a mostrar
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import main
+    transport = httpx.ASGITransport(app=main.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30)
+
+async def run(args):
+    stats = Stats()
+    async with build_client(args.url) as client:
+        deadline = time.monotonic() + args.duration if args.duration else None
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            run_user(client, stats, number, args.sessions, deadline)
+            for number in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+    return stats.report(elapsed)
+
+def main():
+    """Función principal de la prueba de carga"""
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--url", help="URL del servidor (por defecto la app en proceso con backend en memoria)")
+    parser.add_argument("--users", type=int, default=10, help="usuarios virtuales concurrentes")
+    parser.add_argument("--sessions", type=int, default=3, help="sesiones por usuario")
+    parser.add_argument("--duration", type=int, default=0, help="segundos de prueba (ignora --sessions)")
+    args = parser.parse_args()
+
+    print_header("PRUEBA DE CARGA")
+    print(f"Destino: {args.url or 'app en proceso (SUPABASE_BACKEND=memory)'}")
+    print(f"Usuarios: {args.users}  " +
+          (f"Duración: {args.duration} s" if args.duration else f"Sesiones por usuario: {args.sessions}"))
+
+    errors = asyncio.run(run(args))
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
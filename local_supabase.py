@@ -0,0 +1,783 @@
+"""
+Supabase Local en Memoria
+Sustituto sin red de los clientes de Supabase (PostgREST, Auth y Storage)
+para desarrollo sin proyecto y pruebas de carga. Se activa con
+SUPABASE_BACKEND=memory; los datos se pierden al reiniciar el proceso y no
+se comparten entre workers (usar un solo worker).
+
+Emula lo que main.py usa de la base de datos: filtros, orden, paginación,
+conteo, recursos embebidos (tabla_hija(*)), restricciones únicas
+(APIError 23505), upserts con on_conflict, valores por defecto, updated_at,
+tombstones de sync_deletions, la columna generada actividades.periodo, las
+tablas de archivo (sin particiones) y las funciones RPC de las migraciones.
+Los demás triggers (métricas, progreso de macrotareas, índice de búsqueda)
+no se emulan.
+"""
+
+import copy
+import hashlib
+import threading
+import unicodedata
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+# Restricciones únicas además de la clave primaria id
+UNIQUE_KEYS = {
+    "monthly_plans": [("user_id", "mes")],
+    "monthly_reviews": [("monthly_plan_id",)],
+    "weekly_logs": [("user_id", "semana_inicio")],
+    "user_config": [("user_id",)],
+    "financial_categories": [("user_id", "nombre", "tipo")],
+    "financial_monthly_summary": [("user_id", "mes")],
+    "competencias_progress": [("user_id", "mes", "competencia")],
+}
+
+# Valores por defecto de las columnas (database_setup.sql y migraciones)
+DEFAULTS = {
+    "user_config": {
+        "clasificaciones": [
+            "desarrollo", "investigacion", "documentacion", "reunion",
+            "estudio", "revision", "planificacion", "testing"
+        ],
+        "categorias": ["aprendizaje", "compromiso", "competencia", "personal"],
+    },
+    "daily_tasks": {"estado": "pendiente", "prioridad": "media", "progreso": 0, "orden": 0, "es_macrotarea": False},
+    "actividades": {"estado": "en_progreso", "prioridad": "media", "progreso": 0},
+}
+
+# Tablas cuyas eliminaciones se registran en sync_deletions (migraciones 006 y 008)
+TOMBSTONE_TABLES = {
+    "daily_tasks", "weekly_logs", "monthly_plans", "financial_categories",
+    "financial_records", "actividades",
+}
+
+DEFAULT_FINANCIAL_CATEGORIES = [
+    ("Salario", "ingreso", "#10b981"),
+    ("Freelance", "ingreso", "#06b6d4"),
+    ("Alimentación", "gasto", "#f59e0b"),
+    ("Transporte", "gasto", "#6366f1"),
+    ("Vivienda", "gasto", "#ef4444"),
+    ("Servicios", "gasto", "#8b5cf6"),
+    ("Entretenimiento", "gasto", "#ec4899"),
+    ("Tarjeta de crédito", "deuda", "#dc2626"),
+]
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def as_text(value) -> str:
+    """Valor como lo compara PostgREST en la URL (eq.true, eq.null...)"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def sort_key(value):
+    """Clave de orden: números como números, el resto como texto"""
+    if isinstance(value, bool):
+        return (0, int(value), "")
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    return (1, 0, as_text(value))
+
+def compare(value, other) -> int:
+    a, b = sort_key(value), sort_key(other)
+    if a[0] != b[0]:
+        # Filtro numérico contra texto: comparar el texto
+        a, b = (1, 0, as_text(value)), (1, 0, as_text(other))
+    return (a > b) - (a < b)
+
+def normalize(text: str) -> str:
+    """Minúsculas sin acentos (búsqueda)"""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def parse_date(value) -> date:
+    return date.fromisoformat(str(value)[:10])
+
+def closed_range(value):
+    """(inicio, fin) de un rango de fechas '[a,b]' o '[a,b)' (extremos vacíos = None)"""
+    text = value.strip()
+    lower, upper = text[1:-1].split(",")
+    inicio = parse_date(lower) if lower.strip() else None
+    fin = parse_date(upper) if upper.strip() else None
+    if fin and text.endswith(")"):
+        fin -= timedelta(days=1)
+    return inicio, fin
+
+def periodo(row: dict):
+    """Columna generada actividades.periodo (migración 009), forma canónica [a,b)"""
+    if not row.get("fecha_inicio"):
+        return None
+    inicio = parse_date(row["fecha_inicio"])
+    fin = parse_date(row.get("fecha_fin") or row["fecha_inicio"])
+    inicio, fin = min(inicio, fin), max(inicio, fin)
+    return f"[{inicio.isoformat()},{(fin + timedelta(days=1)).isoformat()})"
+
+def split_columns(columns: str):
+    """Separar 'a, b, tabla(c, d)' respetando los paréntesis"""
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += (char == "(") - (char == ")")
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+class LocalResponse:
+    """Misma forma que la respuesta de postgrest (data y count)"""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class LocalQuery:
+    """Constructor de consultas con la interfaz de postgrest-py"""
+
+    def __init__(self, db, table: str):
+        self.db = db
+        self.table = table
+        self.operation = "select"
+        self.columns = "*"
+        self.count = None
+        self.payload = None
+        self.options = {}
+        self.filters = []
+        # Filtros en formato de query string de PostgREST (para los logs)
+        self.filter_params = []
+        self.orders = []
+        self.limit_value = None
+        self.offset_value = 0
+        self.single_mode = None
+
+    # -- Operaciones --------------------------------------------------------
+
+    def select(self, *columns, count=None):
+        self.columns = ",".join(columns) if columns else "*"
+        self.count = count
+        return self
+
+    def insert(self, data, **options):
+        self.operation, self.payload, self.options = "insert", data, options
+        return self
+
+    def upsert(self, data, **options):
+        self.operation, self.payload, self.options = "upsert", data, options
+        return self
+
+    def update(self, data, **options):
+        self.operation, self.payload, self.options = "update", data, options
+        return self
+
+    def delete(self, **options):
+        self.operation, self.options = "delete", options
+        return self
+
+    # -- Filtros ------------------------------------------------------------
+
+    def _where(self, predicate, column, operator, value):
+        self.filters.append(predicate)
+        self.filter_params.append(f"{column}={operator}.{value}")
+        return self
+
+    def eq(self, column, value):
+        return self._where(
+            lambda row: as_text(row.get(column)) == as_text(value),
+            column, "eq", value
+        )
+
+    def neq(self, column, value):
+        return self._where(
+            lambda row: as_text(row.get(column)) != as_text(value),
+            column, "neq", value
+        )
+
+    def gt(self, column, value):
+        return self._where(
+            lambda row: row.get(column) is not None and compare(row[column], value) > 0,
+            column, "gt", value
+        )
+
+    def gte(self, column, value):
+        return self._where(
+            lambda row: row.get(column) is not None and compare(row[column], value) >= 0,
+            column, "gte", value
+        )
+
+    def lt(self, column, value):
+        return self._where(
+            lambda row: row.get(column) is not None and compare(row[column], value) < 0,
+            column, "lt", value
+        )
+
+    def lte(self, column, value):
+        return self._where(
+            lambda row: row.get(column) is not None and compare(row[column], value) <= 0,
+            column, "lte", value
+        )
+
+    def in_(self, column, values):
+        values = {as_text(v) for v in values}
+        return self._where(
+            lambda row: as_text(row.get(column)) in values,
+            column, "in", f"({','.join(sorted(values))})"
+        )
+
+    def is_(self, column, value):
+        return self._where(
+            lambda row: as_text(row.get(column)) == as_text(value),
+            column, "is", value
+        )
+
+    def ilike(self, column, pattern):
+        needle = normalize(pattern.strip("%*"))
+        return self._where(
+            lambda row: needle in normalize(as_text(row.get(column))),
+            column, "ilike", pattern
+        )
+
+    def filter(self, column, operator, value):
+        if operator == "ov":
+            inicio, fin = closed_range(value)
+
+            def overlaps(row):
+                if not row.get(column):
+                    return False
+                row_inicio, row_fin = closed_range(row[column])
+                return (fin is None or row_inicio <= fin) and (inicio is None or row_fin >= inicio)
+
+            return self._where(overlaps, column, "ov", value)
+        if operator in ("eq", "neq", "gt", "gte", "lt", "lte"):
+            return getattr(self, operator)(column, value)
+        raise NotImplementedError(f"Operador no soportado en el backend local: {operator}")
+
+    def describe_filters(self) -> str:
+        return "&".join(self.filter_params)
+
+    # -- Orden y paginación -------------------------------------------------
+
+    def order(self, column, desc=False, nullsfirst=None, foreign_table=None):
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        self.limit_value = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self.offset_value = start
+        self.limit_value = end - start + 1
+        return self
+
+    def single(self):
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_mode = "maybe"
+        return self
+
+    # -- Ejecución ----------------------------------------------------------
+
+    def execute(self):
+        with self.db.lock:
+            rows = getattr(self, f"_execute_{self.operation}")()
+            count = len(rows) if self.count else None
+
+            if self.operation == "select":
+                for column, desc, nulls_first in reversed(self.orders):
+                    present = [r for r in rows if r.get(column) is not None]
+                    missing = [r for r in rows if r.get(column) is None]
+                    present.sort(key=lambda r: sort_key(r[column]), reverse=desc)
+                    rows = missing + present if nulls_first else present + missing
+                end = None if self.limit_value is None else self.offset_value + self.limit_value
+                rows = rows[self.offset_value:end]
+                rows = [self.db.project(self.table, row, self.columns) for row in rows]
+            else:
+                rows = copy.deepcopy(rows)
+
+        if self.single_mode == "single":
+            if len(rows) != 1:
+                raise APIError({
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                })
+            return LocalResponse(rows[0], count)
+        if self.single_mode == "maybe":
+            return LocalResponse(rows[0], count) if rows else None
+        return LocalResponse(rows, count)
+
+    def _matching(self):
+        return [row for row in self.db.rows(self.table) if all(f(row) for f in self.filters)]
+
+    def _execute_select(self):
+        return self._matching()
+
+    def _execute_insert(self):
+        items = self.payload if isinstance(self.payload, list) else [self.payload]
+        prepared = [self.db.prepare_insert(self.table, item) for item in items]
+        for row in prepared:
+            self.db.check_unique(self.table, row)
+        self.db.rows(self.table).extend(prepared)
+        return prepared
+
+    def _execute_upsert(self):
+        items = self.payload if isinstance(self.payload, list) else [self.payload]
+        conflict = tuple(c.strip() for c in (self.options.get("on_conflict") or "id").split(","))
+        ignore = self.options.get("ignore_duplicates", False)
+        result = []
+
+        for item in items:
+            existing = None
+            if all(item.get(c) is not None for c in conflict):
+                existing = self.db.find(self.table, {c: item[c] for c in conflict})
+            if existing is None:
+                row = self.db.prepare_insert(self.table, item)
+                self.db.check_unique(self.table, row)
+                self.db.rows(self.table).append(row)
+                result.append(row)
+            elif not ignore:
+                self.db.apply_update(self.table, existing, item)
+                result.append(existing)
+        return result
+
+    def _execute_update(self):
+        rows = self._matching()
+        for row in rows:
+            self.db.apply_update(self.table, row, self.payload)
+        return rows
+
+    def _execute_delete(self):
+        rows = self._matching()
+        ids = {id(row) for row in rows}
+        self.db.tables[self.table] = [r for r in self.db.rows(self.table) if id(r) not in ids]
+        self.db.log_deletions(self.table, rows)
+        return rows
+
+class LocalAuth:
+    """Supabase Auth mínimo: registro (admin) e inicio de sesión con contraseña"""
+
+    def __init__(self, db):
+        self.db = db
+        self.admin = self
+
+    @staticmethod
+    def _hash(password: str) -> str:
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def create_user(self, attributes: dict):
+        email = attributes["email"].lower()
+        with self.db.lock:
+            if email in self.db.users:
+                raise Exception("A user with this email address has already been registered")
+            user = SimpleNamespace(id=str(uuid.uuid4()), email=email)
+            self.db.users[email] = (user, self._hash(attributes["password"]))
+        return SimpleNamespace(user=user)
+
+    def sign_in_with_password(self, credentials: dict):
+        entry = self.db.users.get(credentials["email"].lower())
+        if entry is None or entry[1] != self._hash(credentials["password"]):
+            raise Exception("Invalid login credentials")
+        return SimpleNamespace(user=entry[0], session=None)
+
+class LocalBucket:
+    """Bucket de Storage en memoria"""
+
+    def __init__(self, files: dict, name: str, created: dict):
+        self.files = files
+        self.name = name
+        self.created = created
+
+    def upload(self, path: str, file, file_options=None):
+        self.files[(self.name, path)] = bytes(file)
+        self.created[(self.name, path)] = now_iso()
+        return SimpleNamespace(path=path)
+
+    def list(self, path=None, options=None):
+        options = options or {}
+        offset = options.get("offset", 0)
+        names = sorted(p for bucket, p in self.files if bucket == self.name)
+        return [
+            {
+                "name": name,
+                "created_at": self.created.get((self.name, name)),
+                "metadata": {"size": len(self.files[(self.name, name)])},
+            }
+            for name in names[offset:offset + options.get("limit", 100)]
+        ]
+
+    def get_public_url(self, path: str) -> str:
+        # main.py también guarda el archivo en UPLOAD_DIR (se descarga en
+        # /api/evidencias/{id}/archivo)
+        return f"/uploads/{path}"
+
+    def download(self, path: str) -> bytes:
+        return self.files[(self.name, path)]
+
+    def remove(self, paths):
+        for path in paths:
+            self.files.pop((self.name, path), None)
+            self.created.pop((self.name, path), None)
+        return []
+
+class LocalStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket: str) -> LocalBucket:
+        return LocalBucket(self.db.files, bucket, self.db.file_created)
+
+class LocalRpc:
+    def __init__(self, db, name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        handler = getattr(self.db, f"rpc_{self.name}", None)
+        if handler is None:
+            raise APIError({
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{self.name}",
+                "details": None,
+                "hint": None,
+            })
+        with self.db.lock:
+            return LocalResponse(copy.deepcopy(handler(**self.params)))
+
+class LocalSupabase:
+    """Cliente con la interfaz de supabase.Client sobre tablas en memoria"""
+
+    def __init__(self):
+        self.tables = {}
+        self.users = {}
+        self.files = {}
+        self.file_created = {}
+        self.lock = threading.RLock()
+        self.auth = LocalAuth(self)
+        self.storage = LocalStorage(self)
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: dict = None) -> LocalRpc:
+        return LocalRpc(self, name, params or {})
+
+    # -- Filas --------------------------------------------------------------
+
+    def rows(self, table: str) -> list:
+        return self.tables.setdefault(table, [])
+
+    def find(self, table: str, values: dict):
+        for row in self.rows(table):
+            if all(as_text(row.get(k)) == as_text(v) for k, v in values.items()):
+                return row
+        return None
+
+    def prepare_insert(self, table: str, item: dict) -> dict:
+        row = copy.deepcopy(DEFAULTS.get(table, {}))
+        row.update(copy.deepcopy(item))
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", now_iso())
+        row.setdefault("updated_at", row["created_at"])
+        if table == "actividades":
+            row["periodo"] = periodo(row)
+        return row
+
+    def apply_update(self, table: str, row: dict, changes: dict):
+        row.update(copy.deepcopy(changes))
+        row["updated_at"] = now_iso()
+        if table == "actividades":
+            row["periodo"] = periodo(row)
+
+    def check_unique(self, table: str, row: dict):
+        for key in [("id",)] + UNIQUE_KEYS.get(table, []):
+            if any(row.get(c) is None for c in key):
+                continue
+            for other in self.rows(table):
+                if other is not row and all(as_text(other.get(c)) == as_text(row[c]) for c in key):
+                    raise APIError({
+                        "code": "23505",
+                        "message": f'duplicate key value violates unique constraint "{table}_{"_".join(key)}_key"',
+                        "details": None,
+                        "hint": None,
+                    })
+
+    def project(self, table: str, row: dict, columns: str) -> dict:
+        """Aplicar el select: columnas, '*' y recursos embebidos hijo(*)"""
+        result = {}
+        for column in split_columns(columns):
+            if "(" in column:
+                child, child_columns = column[:-1].split("(", 1)
+                child = child.strip()
+                # Convención de claves foráneas: monthly_plans -> monthly_plan_id
+                foreign_key = f"{table[:-1]}_id"
+                result[child] = [
+                    self.project(child, r, child_columns)
+                    for r in self.rows(child)
+                    if as_text(r.get(foreign_key)) == as_text(row.get("id"))
+                ]
+            elif column == "*":
+                result.update(copy.deepcopy(row))
+            else:
+                result[column] = copy.deepcopy(row.get(column))
+        return result
+
+    # -- Funciones RPC (migraciones) ----------------------------------------
+
+    def rpc_user_config_array_patch(self, p_user_id, p_campo, p_agregar=None, p_quitar=None):
+        if p_campo not in ("clasificaciones", "categorias"):
+            raise APIError({"code": "P0001", "message": f"Campo no permitido: {p_campo}", "details": None, "hint": None})
+
+        config = self.find("user_config", {"user_id": p_user_id})
+        if config is None:
+            config = self.prepare_insert("user_config", {"user_id": p_user_id})
+            self.rows("user_config").append(config)
+
+        valores = list(config.get(p_campo) or [])
+        agregados, eliminados = [], []
+        for valor in p_quitar or []:
+            if valor in valores:
+                valores.remove(valor)
+                eliminados.append(valor)
+        for valor in p_agregar or []:
+            if valor not in valores:
+                valores.append(valor)
+                agregados.append(valor)
+        if agregados or eliminados:
+            self.apply_update("user_config", config, {p_campo: valores})
+        return [{"valores": valores, "agregados": agregados, "eliminados": eliminados}]
+
+    def rpc_create_default_financial_categories(self, p_user_id):
+        for nombre, tipo, color in DEFAULT_FINANCIAL_CATEGORIES:
+            if self.find("financial_categories", {"user_id": p_user_id, "nombre": nombre, "tipo": tipo}) is None:
+                self.rows("financial_categories").append(self.prepare_insert("financial_categories", {
+                    "user_id": p_user_id, "nombre": nombre, "tipo": tipo,
+                    "color": color, "es_predeterminada": True
+                }))
+        return None
+
+    def rpc_delete_task_cascade(self, p_user_id, p_task_id):
+        tareas = []
+        pendientes = [p_task_id] if self.find("daily_tasks", {"id": p_task_id, "user_id": p_user_id}) else []
+        while pendientes:
+            tareas.extend(pendientes)
+            pendientes = [
+                row["id"] for row in self.rows("daily_tasks")
+                if row.get("user_id") == p_user_id and row["id"] not in tareas
+                and as_text(row.get("parent_task_id")) in pendientes
+            ]
+        if not tareas:
+            return None
+
+        evidencias = self.table("evidencias").delete().in_("task_id", tareas).execute().data
+        self.table("daily_tasks").delete().in_("id", tareas).execute()
+        return {
+            "tareas": tareas,
+            "evidencias": [
+                {"id": e["id"], "archivo_url": e["archivo_url"], "tamanio_kb": e.get("tamanio_kb")}
+                for e in evidencias
+            ],
+        }
+
+    def rpc_orphan_evidencias(self, p_after=None, p_limit=500):
+        tareas = {as_text(row["id"]) for row in self.rows("daily_tasks")}
+        huerfanas = sorted(
+            (
+                row for row in self.rows("evidencias")
+                if row.get("task_id") and as_text(row["task_id"]) not in tareas
+                and (p_after is None or row["id"] > p_after)
+            ),
+            key=lambda row: row["id"]
+        )
+        return [
+            {"id": row["id"], "user_id": row["user_id"], "archivo_url": row["archivo_url"], "tamanio_kb": row.get("tamanio_kb")}
+            for row in huerfanas[:p_limit]
+        ]
+
+    def log_deletions(self, table, rows):
+        """Tombstones de sync_deletions (trigger log_sync_deletion)"""
+        if table not in TOMBSTONE_TABLES:
+            return
+        for row in rows:
+            self.rows("sync_deletions").append({
+                "id": len(self.rows("sync_deletions")) + 1,
+                "user_id": row.get("user_id"),
+                "tabla": table,
+                "row_id": row.get("id"),
+                "deleted_at": now_iso(),
+            })
+
+    def rpc_archive_batch(self, p_tabla, p_before, p_limit=500):
+        """Migración 012: mover un lote a {tabla}_archive (con tombstones)"""
+        terminadas = ("completada", "cancelada")
+
+        def fin(row):
+            return as_text(row.get("fecha_fin") or row.get("fecha_inicio"))
+
+        if p_tabla == "daily_tasks":
+            hijas = {}
+            for row in self.rows("daily_tasks"):
+                if row.get("parent_task_id"):
+                    hijas.setdefault(as_text(row["parent_task_id"]), []).append(row)
+            con_evidencias = {as_text(e.get("task_id")) for e in self.rows("evidencias")}
+
+            def arbol(raiz):
+                filas, pendientes = [], [raiz]
+                while pendientes:
+                    row = pendientes.pop()
+                    filas.append(row)
+                    pendientes.extend(hijas.get(as_text(row["id"]), []))
+                return filas
+
+            lote = []
+            raices = sorted(
+                (row for row in self.rows("daily_tasks") if not row.get("parent_task_id") and fin(row)),
+                key=fin
+            )
+            for raiz in raices:
+                filas = arbol(raiz)
+                if all(
+                    row.get("estado") in terminadas and fin(row) and fin(row) < p_before
+                    and as_text(row["id"]) not in con_evidencias
+                    for row in filas
+                ):
+                    lote.extend(filas)
+                    p_limit -= 1
+                    if p_limit == 0:
+                        break
+            referencia = fin
+        elif p_tabla == "weekly_logs":
+            lote = sorted(
+                (row for row in self.rows("weekly_logs") if as_text(row.get("semana_fin")) < p_before),
+                key=lambda row: as_text(row.get("semana_fin"))
+            )[:p_limit]
+            def referencia(row):
+                return as_text(row["semana_inicio"])
+        elif p_tabla == "financial_records":
+            lote = sorted(
+                (
+                    row for row in self.rows("financial_records")
+                    if as_text(row.get("mes")) < p_before
+                    and not (row.get("tipo") == "deuda" and not row.get("deuda_pagada"))
+                ),
+                key=lambda row: as_text(row.get("mes"))
+            )[:p_limit]
+            def referencia(row):
+                return as_text(row["mes"])
+        else:
+            raise APIError({"code": "P0001", "message": f"Tabla no archivable: {p_tabla}", "details": None, "hint": None})
+
+        ids = {id(row) for row in lote}
+        archivadas = now_iso()
+        self.rows(f"{p_tabla}_archive").extend(
+            {**row, "archivo_mes": referencia(row)[:7] + "-01", "archived_at": archivadas} for row in lote
+        )
+        self.tables[p_tabla] = [row for row in self.rows(p_tabla) if id(row) not in ids]
+        self.log_deletions(p_tabla, lote)
+        return len(lote)
+
+    def rpc_actividades_grupos(self, p_user_id):
+        grupos = {
+            row["grupo"] for row in self.rows("actividades")
+            if row.get("user_id") == p_user_id and row.get("grupo")
+        }
+        return [{"grupo": grupo} for grupo in sorted(grupos)]
+
+    def rpc_search_content(self, p_user_id, p_query, p_tipos=None, p_limit=20, p_offset=0):
+        """Búsqueda por subcadena sin acentos (no hay ranking de tsvector)"""
+        fuentes = [
+            ("tarea", "daily_tasks", "titulo", ("titulo", "descripcion", "notas", "observaciones"), "fecha_inicio"),
+            ("bitacora", "weekly_logs", None, ("aprendizajes", "reflexiones", "logros", "desafios"), "semana_inicio"),
+            ("plan", "monthly_plans", None, ("competencias_trabajar", "que_quiero_lograr", "objetivos"), "mes"),
+            ("actividad", "actividades", "titulo", ("titulo", "descripcion", "notas"), "fecha_inicio"),
+        ]
+        terminos = normalize(p_query).split()
+        matches = []
+        for tipo, table, titulo, campos, fecha in fuentes:
+            if p_tipos and tipo not in p_tipos:
+                continue
+            for row in self.rows(table):
+                if row.get("user_id") != p_user_id:
+                    continue
+                texto = " ".join(as_text(row.get(c)) for c in campos if row.get(c) is not None)
+                normalizado = normalize(texto)
+                if all(t in normalizado for t in terminos):
+                    matches.append({
+                        "tipo": tipo,
+                        "entity_id": row["id"],
+                        "titulo": row.get(titulo) if titulo else f"{tipo.capitalize()} {row.get(fecha)}",
+                        "fecha": row.get(fecha),
+                        "rank": float(sum(normalizado.count(t) for t in terminos)),
+                        "snippet": texto[:160],
+                    })
+        matches.sort(key=lambda m: (-m["rank"], as_text(m["fecha"])))
+        page = matches[p_offset:p_offset + p_limit]
+        for match in page:
+            match["total"] = len(matches)
+        return page
+
+    def rpc_timeline_buckets(self, p_user_id, p_from, p_to, p_bucket="month"):
+        desde, hasta = parse_date(p_from), parse_date(p_to)
+
+        elementos = []
+        for row in self.rows("actividades"):
+            if row.get("user_id") != p_user_id or not row.get("periodo"):
+                continue
+            inicio, fin = closed_range(row["periodo"])
+            grupo = row.get("grupo") or "Sin grupo"
+            elementos.append(("grupo", grupo, grupo, inicio, fin, row.get("progreso") or 0))
+
+        tareas = [r for r in self.rows("daily_tasks") if r.get("user_id") == p_user_id and r.get("fecha_inicio")]
+        por_id = {t["id"]: t for t in tareas}
+        con_hijas = {t.get("parent_task_id") for t in tareas}
+        for tarea in tareas:
+            macro = por_id.get(tarea.get("parent_task_id")) or (tarea if tarea["id"] not in con_hijas else None)
+            if not macro or not macro.get("es_macrotarea"):
+                continue
+            inicio = parse_date(tarea["fecha_inicio"])
+            fin = parse_date(tarea.get("fecha_fin") or tarea["fecha_inicio"])
+            elementos.append(("macrotarea", macro["id"], macro.get("titulo"), min(inicio, fin), max(inicio, fin),
+                              tarea.get("progreso") or 0))
+
+        actual = desde - timedelta(days=desde.weekday()) if p_bucket == "week" else desde.replace(day=1)
+        periodos = []
+        while actual <= hasta:
+            siguiente = actual + timedelta(days=7) if p_bucket == "week" \
+                else (actual.replace(day=28) + timedelta(days=4)).replace(day=1)
+            periodos.append((actual, siguiente - timedelta(days=1)))
+            actual = siguiente
+
+        grupos = {}
+        for lane_tipo, lane_id, lane_nombre, inicio, fin, progreso in elementos:
+            for bucket_inicio, bucket_fin in periodos:
+                dias = (min(fin, bucket_fin, hasta) - max(inicio, bucket_inicio, desde)).days + 1
+                if dias <= 0:
+                    continue
+                item = grupos.setdefault((lane_tipo, lane_nombre, lane_id, bucket_inicio), [0, 0, 0])
+                item[0] += 1
+                item[1] += dias
+                item[2] += progreso * dias
+
+        return [
+            {
+                "lane_tipo": lane_tipo, "lane_id": lane_id, "lane_nombre": lane_nombre,
+                "bucket": bucket.isoformat(), "items": items, "carga_dias": carga,
+                "progreso": round(suma / carga, 1) if carga else None,
+            }
+            for (lane_tipo, lane_nombre, lane_id, bucket), (items, carga, suma) in sorted(grupos.items(), key=lambda g: as_text(g[0]))
+        ]
@@ -3,24 +3,69 @@ Plan de Desarrollo Profesional - Aplicación FastAPI
 Versión: 1.0.0
 """
 
-from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, Request, Depends, HTTPException, status, UploadFile, File, Form, Header, Query
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, ORJSONResponse, Response, StreamingResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.background import BackgroundTask
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from supabase import create_client, Client
+from postgrest.exceptions import APIError
 import os
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
+import re
 import json
+import csv
+import io
+import zipfile
+import tempfile
+import uuid
+import time
+import secrets
+import cProfile
+import pstats
+import stat
+import logging
+import logging.handlers
+import queue
+import random
+import atexit
+import functools
+import itertools
+from contextvars import ContextVar
+from urllib.parse import quote, unquote
+from email.utils import formatdate, parsedate_to_datetime
+from collections import OrderedDict
+import orjson
+import gzip
+import numpy as np
+import hashlib
 from pathlib import Path
 import aiofiles
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+# Broker Redis opcional para notificaciones entre workers
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Compresión Brotli opcional (si no está instalada se usa solo gzip)
+try:
+    import brotli
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    brotli = None
+    BrotliMiddleware = None
+
 # ============================================
 # CONFIGURACIÓN
 # ============================================
@@ -35,73 +80,787 @@ ALLOWED_ORIGINS_LIST = os.getenv("ALLOWED_ORIGINS", "http://localhost:8000").spl
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", SUPABASE_KEY)
+# "supabase" o "memory" (local_supabase.py: sin red, para desarrollo y pruebas
+# de carga; los datos se pierden al reiniciar y no se comparten entre workers)
+SUPABASE_BACKEND = os.getenv("SUPABASE_BACKEND", "supabase")
 
 # Configuración JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "tu-secret-key-super-segura")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+# Tokens de ?token= (EventSource, descargas): viajan en la URL y acaban en logs
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "300"))
 
 # Configuración de archivos
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
 SUPABASE_BUCKET_NAME = os.getenv("SUPABASE_BUCKET_NAME", "evidencias")
 
+# Configuración de compresión de respuestas
+# Respuestas más pequeñas que este umbral (bytes) se envían sin comprimir
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Configuración de notificaciones en tiempo real (/api/events)
+# Sin EVENTS_BROKER_URL el pub/sub es en memoria (un solo proceso)
+EVENTS_BROKER_URL = os.getenv("EVENTS_BROKER_URL", "")
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_CONNECTIONS_PER_USER = int(os.getenv("SSE_MAX_CONNECTIONS_PER_USER", "5"))
+
+# Rutas de streaming que no deben pasar por la compresión (la bufferiza).
+# /api/evidencias/ cubre la descarga de archivos (respuestas parciales con Range)
+UNCOMPRESSED_PATH_PREFIXES = ("/api/events", "/api/export", "/api/import", "/api/evidencias/")
+
+# Configuración de idempotencia (header Idempotency-Key en rutas de creación)
+# Tiempo durante el que un reintento recibe la respuesta guardada
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Claves guardadas en memoria por worker (se descarta la más antigua)
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Una petición en curso bloquea su clave como máximo este tiempo
+IDEMPOTENCY_LOCK_SECONDS = 60
+# Con Redis las claves se comparten entre workers (por defecto el del broker)
+IDEMPOTENCY_REDIS_URL = os.getenv("IDEMPOTENCY_REDIS_URL", EVENTS_BROKER_URL)
+
+# Descarga de evidencias (/api/evidencias/{id}/archivo)
+# Con un proxy delante (nginx), prefijo de la location interna que sirve
+# UPLOAD_DIR: la API solo autoriza y el proxy envía el archivo
+EVIDENCE_ACCEL_REDIRECT_PREFIX = os.getenv("EVIDENCE_ACCEL_REDIRECT_PREFIX", "")
+# Validez de la URL firmada de Storage para evidencias sin copia local
+EVIDENCE_SIGNED_URL_SECONDS = int(os.getenv("EVIDENCE_SIGNED_URL_SECONDS", "300"))
+EVIDENCE_CHUNK_SIZE = 256 * 1024
+
+# Limpieza periódica de evidencias y archivos huérfanos (0 = desactivada)
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "21600"))
+# Filas/objetos por consulta al recorrer evidencias, Storage y /uploads
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", "500"))
+# Archivos más recientes no se tocan (una subida puede estar en curso)
+GC_MIN_AGE_SECONDS = int(os.getenv("GC_MIN_AGE_SECONDS", "3600"))
+
+# Archivo de datos antiguos (migración 012): tareas, bitácoras y registros
+# financieros anteriores al horizonte pasan a tablas particionadas por mes
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))  # 0 = desactivado
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "200"))
+# Pausa entre lotes para no competir con las peticiones por la base de datos
+ARCHIVE_THROTTLE_SECONDS = float(os.getenv("ARCHIVE_THROTTLE_SECONDS", "0.5"))
+
+# Configuración de sincronización incremental (/api/sync)
+# Margen para no perder filas confirmadas con un updated_at ligeramente anterior al cursor
+SYNC_CURSOR_OVERLAP_SECONDS = int(os.getenv("SYNC_CURSOR_OVERLAP_SECONDS", "5"))
+# Debe coincidir con la retención usada en purge_sync_deletions()
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+# Filas por consulta: no superar el max-rows de PostgREST (1000 por defecto)
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+
+# Configuración de exportación (/api/export)
+# Filas leídas por consulta: la memoria usada no depende del tamaño del historial
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+EXPORT_FORMAT_VERSION = 1
+
+# Configuración de importación (/api/import)
+# Filas por upsert en bloque
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "200"))
+# Tamaño máximo del ZIP subido (cada archivo de evidencia: MAX_FILE_SIZE_MB)
+IMPORT_MAX_SIZE_MB = int(os.getenv("IMPORT_MAX_SIZE_MB", "500"))
+# Máximo de errores de validación detallados en la respuesta
+IMPORT_MAX_ERRORS = 100
+
+# Configuración del feed de calendario (/calendar/{token}.ics)
+# Segundos durante los que se sirve el feed cacheado sin consultar cambios
+CALENDAR_REFRESH_SECONDS = int(os.getenv("CALENDAR_REFRESH_SECONDS", "60"))
+# Usuarios con feed en memoria (se descarta el usado hace más tiempo)
+CALENDAR_CACHE_MAX_USERS = int(os.getenv("CALENDAR_CACHE_MAX_USERS", "500"))
+
+# Configuración de analítica (/api/analytics)
+# Los resultados se invalidan con cada escritura de tareas o bitácoras; el
+# TTL solo acota cambios hechos fuera de la API
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600"))
+ANALYTICS_CACHE_MAX_USERS = int(os.getenv("ANALYTICS_CACHE_MAX_USERS", "1000"))
+# Workers del servidor (serve.py lo exporta): con varios y sin broker
+# externo la invalidación no llega a los demás y la caché no se usa
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or "1")
+# Filas por consulta al leer las columnas (max-rows de PostgREST)
+ANALYTICS_PAGE_SIZE = int(os.getenv("ANALYTICS_PAGE_SIZE", "1000"))
+ANALYTICS_MAX_MONTHS = 120
+
+# Configuración del timeline (/api/timeline)
+TIMELINE_BUCKETS = ("week", "month")
+# Límite de periodos por consulta (10 años por mes, 5 años por semana)
+TIMELINE_MAX_BUCKETS = 260
+
+# Configuración de búsqueda de texto completo (/api/search)
+SEARCH_MIN_QUERY_LENGTH = 2
+SEARCH_MAX_PAGE_SIZE = 50
+# Tipos de documento indexados por search_documents (migración 007)
+SEARCH_TIPOS = ("tarea", "bitacora", "plan", "actividad")
+
+# Perfilado opcional de peticiones (header X-Profile: 1 o ?__profile=1)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# En producción solo pueden perfilar estos emails (separados por comas)
+PROFILING_ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("PROFILING_ADMIN_EMAILS", "").split(",") if e.strip()}
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Perfiles guardados (se borran los más antiguos)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Configuración de logging (JSON por línea o texto legible)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json" if IS_PRODUCTION else "text")
+# Fracción de peticiones cuyo log INFO se escribe (WARNING y ERROR siempre)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+# Registros pendientes de escribir; si se llena se descartan (no bloquea)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Consultas a Supabase más lentas que esto (ms) se registran como WARNING
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "300"))
+
+# Código de error de PostgreSQL para violación de restricción única
+PG_UNIQUE_VIOLATION = "23505"
+
 # Crear directorio de uploads
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Configuración de archivos estáticos
+STATIC_DIR = Path("static")
+# Manifiesto generado por build_static.py (nombre lógico -> archivo con hash)
+ASSET_MANIFEST_PATH = STATIC_DIR / "dist" / "manifest.json"
+STATIC_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # 1 año
+
+# ============================================
+# LOGGING ESTRUCTURADO
+# ============================================
+
+# Id de la petición en curso (X-Request-ID) y si su log INFO se escribe
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+log_sampled_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+# Atributos estándar de LogRecord: el resto viene de extra={...}
+LOG_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def log_fields(record: logging.LogRecord) -> dict:
+    """Campos pasados con extra={...}"""
+    return {k: v for k, v in vars(record).items() if k not in LOG_RECORD_ATTRS}
+
+class JsonLogFormatter(logging.Formatter):
+    """Un objeto JSON por línea (para el agregador de logs de la plataforma)"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **log_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+class TextLogFormatter(logging.Formatter):
+    """Formato legible para desarrollo: mensaje seguido de clave=valor"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = " ".join(f"{k}={v}" for k, v in log_fields(record).items())
+        if not fields:
+            return text
+        head, sep, tail = text.partition("\n")
+        return f"{head}  {fields}{sep}{tail}"
+
+class ContextFilter(logging.Filter):
+    """Agrega el request_id y aplica el muestreo de la petición"""
+
+    def filter(self, record):
+        request_id = request_id_var.get()
+        if request_id != "-":
+            record.request_id = request_id
+        return record.levelno >= logging.WARNING or log_sampled_var.get()
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Encola sin esperar; con la cola llena descarta y cuenta los registros"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def setup_logging() -> logging.Logger:
+    """Logger de la app: los registros se escriben en un hilo aparte (QueueListener)"""
+    app_logger = logging.getLogger("pdp")
+    if app_logger.handlers:
+        return app_logger
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonLogFormatter() if LOG_FORMAT == "json" else TextLogFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    app_logger.addHandler(handler)
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.propagate = False
+    return app_logger
+
+logger = setup_logging()
+
+class RequestContextMiddleware:
+    """Id de correlación y log de acceso por petición
+
+    Usa el X-Request-ID recibido (p. ej. del proxy) o genera uno, lo
+    devuelve en la respuesta y lo agrega a todos los logs de la petición.
+    El muestreo se decide una vez por petición, así una petición muestreada
+    conserva todas sus líneas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex
+        id_token = request_id_var.set(request_id)
+        sampled_token = log_sampled_var.set(LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        except Exception:
+            logger.exception("Error no controlado", extra={"metodo": scope["method"], "ruta": scope["path"]})
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            level = logging.WARNING if status_code >= 500 else logging.INFO
+            logger.log(level, "Petición", extra={
+                "metodo": scope["method"],
+                "ruta": scope["path"],
+                "status": status_code,
+                "ms": round(elapsed_ms, 1),
+            })
+            request_id_var.reset(id_token)
+            log_sampled_var.reset(sampled_token)
+
+def describe_query(builder) -> dict:
+    """Tabla/función, método y filtros de un builder de postgrest o del backend local"""
+    if hasattr(builder, "path"):
+        return {
+            "tabla": builder.path.strip("/"),
+            "metodo": getattr(builder.http_method, "value", builder.http_method),
+            "filtros": unquote(str(builder.params)),
+        }
+    return {
+        "tabla": getattr(builder, "table", None) or f"rpc/{builder.name}",
+        "metodo": getattr(builder, "operation", "rpc"),
+        "filtros": builder.describe_filters() if hasattr(builder, "describe_filters") else "",
+    }
+
+def timed_execute(execute):
+    """Envolver execute() para registrar las llamadas más lentas que SLOW_QUERY_MS"""
+
+    @functools.wraps(execute)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        response = None
+        try:
+            response = execute(self, *args, **kwargs)
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= SLOW_QUERY_MS:
+                data = getattr(response, "data", None)
+                rows = len(data) if isinstance(data, list) else int(data is not None)
+                logger.warning("Consulta lenta a Supabase", extra={
+                    **describe_query(self), "filas": rows, "ms": round(elapsed_ms, 1)
+                })
+
+    wrapper.timed = True
+    return wrapper
+
+def instrument_queries(*builder_classes):
+    """Medir execute() de los builders (postgrest no tiene hooks por consulta)"""
+    for cls in builder_classes:
+        if not getattr(cls.execute, "timed", False):
+            cls.execute = timed_execute(cls.execute)
+
 # Advertencia de seguridad en producción
 if IS_PRODUCTION and SECRET_KEY == "tu-secret-key-super-segura":
-    print("\n" + "="*70)
-    print("⚠️  ADVERTENCIA DE SEGURIDAD")
-    print("="*70)
-    print("Estás usando el SECRET_KEY por defecto en producción.")
-    print("Por favor, genera un SECRET_KEY seguro y configúralo en las")
-    print("variables de entorno de tu plataforma de hosting.")
-    print("="*70 + "\n")
+    logger.warning(
+        "Estás usando el SECRET_KEY por defecto en producción. Genera un SECRET_KEY "
+        "seguro y configúralo en las variables de entorno de tu plataforma de hosting."
+    )
 
 # Cliente Supabase
 try:
-    if not SUPABASE_URL or not SUPABASE_KEY or "tuproyecto" in SUPABASE_URL:
-        print("\n" + "="*70)
-        print("ADVERTENCIA: Configuracion de Supabase no encontrada")
-        print("="*70)
-        print("Por favor, configura las credenciales de Supabase en el archivo .env")
-        print("\n1. Visita: https://supabase.com")
-        print("2. Crea un proyecto (es gratis)")
-        print("3. Ve a Settings > API y copia tus credenciales")
-        print("4. Actualiza el archivo .env con tus credenciales")
-        print("5. Ejecuta el script database_setup.sql en el SQL Editor")
-        print("="*70 + "\n")
+    if SUPABASE_BACKEND == "memory":
+        from local_supabase import LocalSupabase, LocalQuery, LocalRpc
+        supabase = supabase_admin = LocalSupabase()
+        instrument_queries(LocalQuery, LocalRpc)
+        logger.warning("Usando el backend de Supabase en memoria (SUPABASE_BACKEND=memory)")
+        if IS_PRODUCTION:
+            logger.warning("Backend en memoria en producción: los datos se perderán al reiniciar")
+    elif not SUPABASE_URL or not SUPABASE_KEY or "tuproyecto" in SUPABASE_URL:
+        logger.warning(
+            "Configuración de Supabase no encontrada. Crea un proyecto en https://supabase.com, "
+            "copia las credenciales de Settings > API en el archivo .env y ejecuta "
+            "database_setup.sql en el SQL Editor"
+        )
         # Crear clientes dummy para que la app no crashee
         supabase = None
         supabase_admin = None
     else:
+        from postgrest._sync.request_builder import SyncQueryRequestBuilder, SyncSingleRequestBuilder
         supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
         supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        print("OK - Conexion a Supabase establecida correctamente")
+        # SyncMaybeSingleRequestBuilder delega en SyncSingleRequestBuilder.execute
+        instrument_queries(SyncQueryRequestBuilder, SyncSingleRequestBuilder)
+        logger.info("Conexión a Supabase establecida correctamente")
 except Exception as e:
-    print(f"\nERROR al conectar con Supabase: {str(e)}")
-    print("La aplicacion se iniciara pero las funcionalidades de base de datos no estaran disponibles.\n")
+    logger.error(
+        "Error al conectar con Supabase; la aplicación se iniciará sin base de datos",
+        extra={"error": str(e)}
+    )
     supabase = None
     supabase_admin = None
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# ============================================
+# NOTIFICACIONES DE CAMBIOS (PUB/SUB)
+# ============================================
+
+class ChangeBroker:
+    """Pub/sub de notificaciones de cambios por usuario
+
+    Cada conexión SSE tiene una cola acotada. Si un cliente lento la llena,
+    se descartan sus eventos pendientes y recibe un único evento `resync`
+    (debe llamar a /api/sync) en lugar de acumular memoria sin límite.
+    Con EVENTS_BROKER_URL (Redis) los eventos se reenvían entre workers.
+    """
+
+    CHANNEL = "pdp:changes"
+
+    def __init__(self, queue_size: int, max_connections: int, broker_url: str = ""):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.broker_url = broker_url
+        self._subscribers = {}
+        self._callbacks = []
+        self._redis = None
+        self._listener = None
+
+    async def start(self):
+        """Conectar al broker externo (si está configurado)"""
+        if not self.broker_url:
+            return
+        if aioredis is None:
+            logger.warning("EVENTS_BROKER_URL configurado pero 'redis' no está instalado; "
+                           "las notificaciones solo llegan a este proceso")
+            return
+        self._redis = aioredis.from_url(self.broker_url)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Detener el listener y cerrar la conexión al broker"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _listen(self):
+        """Reenviar a las conexiones locales los eventos publicados por cualquier worker"""
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = orjson.loads(message["data"])
+                    self._run_callbacks(payload["user_id"], payload["event"])
+                    self._deliver(payload["user_id"], payload["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Error en el broker de eventos; reintentando en 5s", extra={"error": str(e)})
+                await asyncio.sleep(5)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Registrar una conexión y devolver su cola de eventos"""
+        queues = self._subscribers.setdefault(user_id, set())
+        if len(queues) >= self.max_connections:
+            raise HTTPException(429, "Demasiadas conexiones de eventos abiertas")
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        queues.add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        """Eliminar una conexión"""
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    @property
+    def shared(self) -> bool:
+        """Si los eventos llegan a todos los workers (broker externo conectado)"""
+        return self._redis is not None
+
+    def on_change(self, callback):
+        """Registrar callback(user_id, event) para los cambios de cualquier worker
+
+        Se llama al publicar (antes de responder la petición que escribió) y,
+        con broker externo, también al recibir los eventos de otros workers.
+        """
+        self._callbacks.append(callback)
+
+    def _run_callbacks(self, user_id: str, event: dict):
+        for callback in self._callbacks:
+            try:
+                callback(user_id, event)
+            except Exception:
+                logger.exception("Error en un callback de cambios")
+
+    def _deliver(self, user_id: str, event: dict):
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Cliente lento: descartar lo pendiente y pedir resincronización
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"tipo": "resync"})
+
+    async def publish(self, user_id: str, event: dict):
+        """Publicar un evento para todas las conexiones del usuario (en cualquier worker)"""
+        self._run_callbacks(user_id, event)
+        if self._redis is not None:
+            try:
+                # El listener de este mismo worker también lo recibe y lo entrega
+                await self._redis.publish(self.CHANNEL, orjson.dumps({"user_id": user_id, "event": event}))
+                return
+            except Exception as e:
+                logger.error("Error al publicar evento en el broker", extra={"error": str(e)})
+        self._deliver(user_id, event)
+
+change_broker = ChangeBroker(SSE_QUEUE_SIZE, SSE_MAX_CONNECTIONS_PER_USER, EVENTS_BROKER_URL)
+
+async def notify_change(user_id: str, tabla: str, accion: str, row_id: Optional[str] = None):
+    """Notificar a las pestañas/dispositivos del usuario que una tabla cambió"""
+    await change_broker.publish(user_id, {
+        "tipo": "change",
+        "tabla": tabla,
+        "accion": accion,
+        "id": row_id
+    })
+
+# ============================================
+# IDEMPOTENCIA DE RUTAS DE CREACIÓN
+# ============================================
+
+# POST que insertan filas: un reintento con la misma Idempotency-Key
+# recibe la respuesta guardada sin volver a insertar (ni disparar triggers)
+IDEMPOTENT_PATHS = {
+    "/api/tasks",
+    "/api/weekly/logs",
+    "/api/monthly/plans",
+    "/api/monthly/reviews",
+    "/api/actividades",
+    "/api/evidencias/upload",
+    "/api/financial/categories",
+    "/api/financial/records",
+}
+
+class IdempotencyStore:
+    """Respuestas por (usuario, Idempotency-Key) con TTL
+
+    En memoria es un LRU acotado a IDEMPOTENCY_MAX_KEYS por worker; con
+    IDEMPOTENCY_REDIS_URL se guarda en Redis y un reintento que llega a
+    otro worker también recibe la respuesta guardada. Sin Redis y con varios
+    workers la garantía es solo dentro de cada worker (serve.py lo advierte).
+    Mientras la primera petición está en curso la clave queda marcada como
+    pendiente.
+    """
+
+    PREFIX = "pdp:idem:"
+    PENDING = {"estado": "pendiente"}
+
+    def __init__(self, ttl: int, max_keys: int, redis_url: str = ""):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.redis_url = redis_url
+        self._entries = OrderedDict()  # clave -> (expira, registro)
+        self._redis = None
+
+    async def start(self):
+        if not self.redis_url:
+            return
+        if aioredis is None:
+            logger.warning("IDEMPOTENCY_REDIS_URL configurado pero 'redis' no está instalado; "
+                           "las claves de idempotencia no se comparten entre workers")
+            return
+        self._redis = aioredis.from_url(self.redis_url)
+
+    async def stop(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def get(self, key: str) -> Optional[dict]:
+        if self._redis is not None:
+            value = await self._redis.get(self.PREFIX + key)
+            return orjson.loads(value) if value else None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    async def claim(self, key: str) -> bool:
+        """Marcar la clave como pendiente (False si otra petición la tiene)"""
+        if self._redis is not None:
+            return bool(await self._redis.set(
+                self.PREFIX + key, orjson.dumps(self.PENDING), nx=True, ex=IDEMPOTENCY_LOCK_SECONDS
+            ))
+
+        if await self.get(key) is not None:
+            return False
+        self._put(key, self.PENDING, IDEMPOTENCY_LOCK_SECONDS)
+        return True
+
+    async def complete(self, key: str, record: dict):
+        if self._redis is not None:
+            await self._redis.set(self.PREFIX + key, orjson.dumps(record), ex=self.ttl)
+            return
+        self._put(key, record, self.ttl)
+
+    async def release(self, key: str):
+        """Liberar la clave de una petición fallida (se puede reintentar)"""
+        if self._redis is not None:
+            await self._redis.delete(self.PREFIX + key)
+            return
+        self._entries.pop(key, None)
+
+    def _put(self, key: str, record: dict, ttl: int):
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + ttl, record)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_REDIS_URL)
+
+def token_user_id(headers: dict) -> Optional[str]:
+    """user_id del Bearer token sin lanzar errores (None si falta o no es válido)"""
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+class IdempotencyMiddleware:
+    """Honrar Idempotency-Key en los POST de IDEMPOTENT_PATHS
+
+    - Primera petición: se ejecuta y, si responde 2xx, se guarda la respuesta
+    - Reintento con el mismo contenido: se devuelve la respuesta guardada
+      (header Idempotent-Replayed: true) sin ejecutar la ruta
+    - Misma clave con otro contenido: 422
+    - Misma clave mientras la primera sigue en curso: 409
+    Las respuestas de error no se guardan: no insertaron nada y el cliente
+    puede reintentar.
+    """
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key", b"").decode("latin-1")
+        user_id = token_user_id(headers)
+        if not idempotency_key or user_id is None:
+            # Sin clave no hay idempotencia; sin token la ruta responde 401
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > 255 or not idempotency_key.isprintable():
+            await self.reply(send, 400, {"detail": "Idempotency-Key inválida"})
+            return
+
+        key = f"{user_id}:{idempotency_key}"
+        fingerprint = hashlib.sha256(f"{scope['method']} {scope['path']}?".encode())
+        fingerprint.update(scope.get("query_string", b""))
+        # El boundary de multipart cambia en cada reintento: solo se compara la ruta
+        hash_body = not headers.get(b"content-type", b"").startswith(b"multipart/")
+
+        stored = await self.store.get(key)
+        if stored is not None:
+            if stored["estado"] == "pendiente":
+                await self.reply(send, 409, {"detail": "Una petición con esta Idempotency-Key está en proceso"})
+                return
+            while True:
+                message = await receive()
+                if hash_body:
+                    fingerprint.update(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            if fingerprint.hexdigest() != stored["fingerprint"]:
+                await self.reply(send, 422, {"detail": "Idempotency-Key ya usada con otro contenido"})
+                return
+            await send({
+                "type": "http.response.start",
+                "status": stored["status"],
+                "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored["headers"]]
+                           + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored["body"].encode("latin-1")})
+            return
+
+        if not await self.store.claim(key):
+            await self.reply(send, 409, {"detail": "Una petición con esta Idempotency-Key está en proceso"})
+            return
+
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def hashing_receive():
+            message = await receive()
+            if message["type"] == "http.request" and hash_body:
+                fingerprint.update(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, hashing_receive, recording_send)
+        except Exception:
+            await self.store.release(key)
+            raise
+
+        if 200 <= response["status"] < 300:
+            await self.store.complete(key, {
+                "estado": "completada",
+                "fingerprint": fingerprint.hexdigest(),
+                "status": response["status"],
+                "headers": response["headers"],
+                "body": b"".join(response["body"]).decode("latin-1"),
+            })
+        else:
+            await self.store.release(key)
+
+    @staticmethod
+    async def reply(send, status_code: int, content: dict):
+        body = orjson.dumps(content)
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
 
 # ============================================
 # APLICACIÓN FASTAPI
 # ============================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y parada de servicios en segundo plano"""
+    await change_broker.start()
+    await idempotency_store.start()
+    await storage_gc.start()
+    await data_archiver.start()
+    yield
+    await data_archiver.stop()
+    await storage_gc.stop()
+    await idempotency_store.stop()
+    await change_broker.stop()
+
 app = FastAPI(
     title="Plan de Desarrollo Profesional",
     description="API para gestión de planes de desarrollo profesional",
     version="1.0.0",
     docs_url=None if IS_PRODUCTION else "/docs",  # Desactivar docs en producción
     redoc_url=None if IS_PRODUCTION else "/redoc",  # Desactivar redoc en producción
-    openapi_url=None if IS_PRODUCTION else "/openapi.json"  # Desactivar OpenAPI en producción
+    openapi_url=None if IS_PRODUCTION else "/openapi.json",  # Desactivar OpenAPI en producción
+    default_response_class=ORJSONResponse,  # Serialización JSON rápida con orjson
+    lifespan=lifespan
 )
 
+# Idempotency-Key: dentro de la compresión para guardar la respuesta sin comprimir
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+# Compresión de respuestas (brotli con fallback a gzip según Accept-Encoding)
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=COMPRESSION_BROTLI_QUALITY,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+        excluded_handlers=[f"^{prefix}" for prefix in UNCOMPRESSED_PATH_PREFIXES],
+    )
+else:
+    class SelectiveGZipMiddleware(GZipMiddleware):
+        """GZip que no comprime las rutas de streaming"""
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] == "http" and scope["path"].startswith(UNCOMPRESSED_PATH_PREFIXES):
+                await self.app(scope, receive, send)
+                return
+            await super().__call__(scope, receive, send)
+
+    app.add_middleware(
+        SelectiveGZipMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        compresslevel=COMPRESSION_GZIP_LEVEL,
+    )
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -111,10 +870,304 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============================================
+# PERFILADO DE PETICIONES (OPCIONAL)
+# ============================================
+
+# Categorías del desglose de tiempo (por módulo de cada función)
+PROFILE_CATEGORIES = [
+    ("validacion", ("pydantic", "pydantic_core")),
+    ("supabase", ("postgrest", "supabase", "gotrue", "storage3", "httpx", "httpcore", "h2", "ssl", "socket")),
+    ("framework", ("fastapi", "starlette", "anyio", "asyncio")),
+]
+
+def profile_category(filename: str) -> str:
+    """Categoría de una función según el archivo donde está definida"""
+    if filename == "~":
+        # Funciones en C (builtins): se cuentan como aplicación
+        return "aplicacion"
+    parts = Path(filename).parts
+    for category, modules in PROFILE_CATEGORIES:
+        if any(module in parts or Path(filename).stem == module for module in modules):
+            return category
+    return "aplicacion"
+
+def profile_breakdown(profiler: cProfile.Profile) -> dict:
+    """Tiempo propio (ms) por categoría"""
+    breakdown = {"validacion": 0.0, "supabase": 0.0, "framework": 0.0, "aplicacion": 0.0}
+    for (filename, _, _), (_, _, tottime, _, _) in pstats.Stats(profiler).stats.items():
+        breakdown[profile_category(filename)] += tottime * 1000
+    return breakdown
+
+class ProfiledCoroutine:
+    """Activa el profiler solo mientras avanza esta corrutina
+
+    Las demás peticiones que corren en el mismo event loop entre un paso y
+    otro quedan fuera del perfil. Con `active = False` la corrutina sigue
+    sin perfilar (el resto de una respuesta en streaming).
+    """
+
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+        self.active = True
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def send(self, value):
+        if not self.active:
+            return self.coro.send(value)
+        self.profiler.enable()
+        try:
+            return self.coro.send(value)
+        finally:
+            self.profiler.disable()
+
+    def throw(self, *args):
+        if not self.active:
+            return self.coro.throw(*args)
+        self.profiler.enable()
+        try:
+            return self.coro.throw(*args)
+        finally:
+            self.profiler.disable()
+
+    def close(self):
+        self.coro.close()
+
+def profiling_allowed(headers: dict) -> bool:
+    """Fuera de producción siempre; en producción solo para PROFILING_ADMIN_EMAILS"""
+    if not IS_PRODUCTION:
+        return True
+    auth = headers.get(b"authorization", b"").decode()
+    if not auth.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return (payload.get("email") or "").lower() in PROFILING_ADMIN_EMAILS
+
+class ProfilingMiddleware:
+    """Perfilar con cProfile las peticiones marcadas
+
+    El perfil se guarda en PROFILE_DIR (formato pstats: snakeviz,
+    `python -m pstats`) y la respuesta incluye X-Profile-Id y un header
+    Server-Timing con el desglose, visible en las DevTools del navegador.
+    El perfil termina con el primer fragmento del cuerpo: solo se retiene
+    el inicio de la respuesta, así SSE y las descargas en streaming siguen
+    fluyendo (se mide hasta que empiezan a enviarse).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not profiling_allowed(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        # Inicio de la respuesta retenido hasta tener el perfil (para agregar headers)
+        response_start = None
+
+        async def send_start():
+            nonlocal response_start
+            profiled.active = False
+            profiler.disable()
+            total_ms = (time.perf_counter() - start) * 1000
+            profile_id = self.save(scope, profiler)
+            breakdown = profile_breakdown(profiler)
+
+            timing = ", ".join(f"{name};dur={ms:.1f}" for name, ms in breakdown.items())
+            timing += f", total;dur={total_ms:.1f}"
+            if response_start is not None:
+                response_start["headers"] = list(response_start.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                    (b"server-timing", timing.encode()),
+                ]
+                await send(response_start)
+                response_start = None
+
+        async def profiled_send(message):
+            nonlocal response_start
+            if not profiled.active:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                response_start = message
+            else:
+                # Primer fragmento del cuerpo: el resto se envía sin perfilar
+                await send_start()
+                await send(message)
+
+        profiled = ProfiledCoroutine(self.app(scope, receive, profiled_send), profiler)
+        try:
+            await profiled
+        finally:
+            if profiled.active:
+                await send_start()
+
+    @staticmethod
+    def requested(scope) -> bool:
+        if scope.get("query_string") and b"__profile=1" in scope["query_string"]:
+            return True
+        return any(k == b"x-profile" and v == b"1" for k, v in scope["headers"])
+
+    @staticmethod
+    def save(scope, profiler: cProfile.Profile) -> str:
+        """Guardar el perfil y borrar los más antiguos"""
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        slug = "".join(c if c.isalnum() else "_" for c in scope["path"].strip("/"))[:60] or "root"
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{scope['method']}_{slug}"
+        profiler.dump_stats(PROFILE_DIR / f"{profile_id}.prof")
+
+        profiles = sorted(PROFILE_DIR.glob("*.prof"))
+        for old in profiles[:-PROFILE_KEEP]:
+            old.unlink(missing_ok=True)
+        return profile_id
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Último en agregarse = el más externo: el request_id cubre toda la petición
+app.add_middleware(RequestContextMiddleware)
+
+# ============================================
+# ARCHIVOS ESTÁTICOS Y ASSETS
+# ============================================
+
+# Dependencias de terceros servidas desde CDN mientras no exista el build
+ASSET_CDN_FALLBACK = {
+    "vendor/alpine.js": "https://cdn.jsdelivr.net/npm/alpinejs@3.13.3/dist/cdn.min.js",
+    "vendor/apexcharts.js": "https://cdn.jsdelivr.net/npm/apexcharts@3.45.1/dist/apexcharts.min.js",
+}
+
+def load_asset_manifest():
+    """Cargar el manifiesto de assets con hash (vacío si no se ha ejecutado build_static.py)"""
+    try:
+        with open(ASSET_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+asset_manifest = load_asset_manifest()
+
+def asset_url(name: str) -> str:
+    """URL de un asset: versión con hash si existe el build, si no la fuente o el CDN"""
+    if name in asset_manifest:
+        return f"/static/{asset_manifest[name]}"
+    if name in ASSET_CDN_FALLBACK:
+        return ASSET_CDN_FALLBACK[name]
+    return f"/static/src/{name}"
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles con cabeceras de caché
+
+    Los archivos de static/dist llevan el hash del contenido en el nombre, así
+    que se pueden cachear para siempre. El resto se revalida con ETag.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if Path(self.get_path(scope)).parts[:1] == ("dist",):
+            response.headers["Cache-Control"] = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
 # Templates y archivos estáticos
 templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+templates.env.globals["asset"] = asset_url
+templates.env.globals["assets_built"] = bool(asset_manifest)
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+
+# ============================================
+# CACHÉ DE PÁGINAS HTML
+# ============================================
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Verificar si el cliente acepta una codificación (respetando q=0)"""
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip() in (encoding, "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+class PageCache:
+    """Caché en memoria de páginas HTML sin datos por petición
+
+    Cada plantilla se renderiza una sola vez (y de nuevo solo si el archivo
+    cambia) y se guarda junto con sus variantes gzip y brotli y su ETag, de
+    modo que servir una página es copiar bytes ya preparados.
+    """
+
+    def __init__(self, templates: Jinja2Templates, directory: str = "templates"):
+        self.templates = templates
+        self.directory = Path(directory)
+        self._pages = {}
+
+    def _render(self, name: str, mtime: int) -> dict:
+        html = self.templates.get_template(name).render().encode("utf-8")
+        page = {
+            "mtime": mtime,
+            "etag": '"' + hashlib.sha256(html).hexdigest()[:32] + '"',
+            "identity": html,
+            "gzip": gzip.compress(html, compresslevel=9),
+        }
+        if brotli is not None:
+            page["br"] = brotli.compress(html, quality=11)
+        return page
+
+    def get(self, name: str) -> dict:
+        """Obtener la página renderizada, re-renderizando si la plantilla cambió"""
+        mtime = (self.directory / name).stat().st_mtime_ns
+        page = self._pages.get(name)
+        if page is None or page["mtime"] != mtime:
+            page = self._render(name, mtime)
+            self._pages[name] = page
+        return page
+
+    def response(self, request: Request, name: str) -> Response:
+        """Respuesta HTML con ETag, Cache-Control y la variante comprimida adecuada"""
+        page = self.get(name)
+        headers = {
+            "ETag": page["etag"],
+            # La página referencia assets con hash: se revalida siempre (304 si no cambió)
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if request.headers.get("if-none-match") == page["etag"]:
+            return Response(status_code=304, headers=headers)
+
+        accept_encoding = request.headers.get("accept-encoding", "")
+        if "br" in page and accepts_encoding(accept_encoding, "br"):
+            body = page["br"]
+            headers["Content-Encoding"] = "br"
+        elif accepts_encoding(accept_encoding, "gzip"):
+            body = page["gzip"]
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = page["identity"]
+
+        return Response(content=body, media_type="text/html; charset=utf-8", headers=headers)
+
+page_cache = PageCache(templates)
+# UPLOAD_DIR no se publica: las evidencias se descargan con autorización
+# en /api/evidencias/{id}/archivo
 
 # ============================================
 # MODELOS PYDANTIC
@@ -276,6 +1329,10 @@ class UserConfigUpdate(BaseModel):
     clasificaciones: Optional[List[str]] = None
     categorias: Optional[List[str]] = None
 
+class ConfigArrayPatch(BaseModel):
+    agregar: Optional[List[str]] = []
+    quitar: Optional[List[str]] = []
+
 # ============================================
 # FINANCIAL MODELS
 # ============================================
@@ -312,18 +1369,46 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verificar token JWT"""
+def create_stream_token(user_id: str) -> str:
+    """Crear token de corta duración que solo sirve en las rutas de streaming"""
+    expire = datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    return jwt.encode({"sub": user_id, "purpose": "stream", "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_access_token(token: str, purpose: Optional[str] = None) -> str:
+    """Decodificar el token JWT y devolver el user_id
+
+    `purpose` separa los tokens de sesión (None) de los de streaming: un token
+    de un tipo no es válido donde se espera el otro.
+    """
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("purpose") != purpose:
             raise HTTPException(status_code=401, detail="Token inválido")
         return user_id
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido o expirado")
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verificar token JWT"""
+    return decode_access_token(credentials.credentials)
+
+def verify_stream_token(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Verificar token JWT del header o del query param `token`
+
+    EventSource no permite enviar headers, por eso las rutas de streaming
+    aceptan también ?token=. La URL queda en los logs de acceso: en el query
+    solo se acepta un token de streaming (POST /api/auth/stream-token).
+    """
+    if credentials is not None:
+        return decode_access_token(credentials.credentials)
+    if token:
+        return decode_access_token(token, purpose="stream")
+    raise HTTPException(status_code=401, detail="Token requerido")
+
 # ============================================
 # RUTAS - AUTENTICACIÓN
 # ============================================
@@ -381,6 +1466,7 @@ async def login(user: UserLogin):
             "email": response.user.email
         }
     except Exception as e:
+        logger.info("Inicio de sesión fallido", extra={"error": str(e)})
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
 @app.get("/api/auth/me")
@@ -389,31 +1475,27 @@ async def get_current_user(user_id: str = Depends(verify_token)):
     try:
         profile = supabase.table("user_profiles").select("*").eq("id", user_id).single().execute()
         return profile.data
-    except:
+    except Exception as e:
+        logger.warning("Perfil de usuario no disponible", extra={"user_id": user_id, "error": str(e)})
         return {"id": user_id, "nombre_completo": None}
 
+@app.post("/api/auth/stream-token")
+async def get_stream_token(user_id: str = Depends(verify_token)):
+    """Token de corta duración para ?token= (EventSource, enlaces de evidencias)"""
+    return {"token": create_stream_token(user_id), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
 # ============================================
 # RUTAS - PLANES MENSUALES
 # ============================================
 
 @app.post("/api/monthly/plans")
-async def create_monthly_plan(plan: MonthlyPlan, user_id: str = Depends(verify_token)):
-    """Crear plan mensual"""
-
-    # Verificar si ya existe un plan para este mes
-    mes_str = plan.mes.isoformat() if isinstance(plan.mes, date) else plan.mes
-    existing = supabase_admin.table("monthly_plans") \
-        .select("id") \
-        .eq("user_id", user_id) \
-        .eq("mes", mes_str) \
-        .execute()
-
-    if existing.data:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Ya existe un plan para el mes {plan.mes}"
-        )
+async def create_monthly_plan(plan: MonthlyPlan, user_id: str = Depends(verify_token), upsert: bool = False):
+    """Crear plan mensual
 
+    Si ya existe un plan para ese mes responde 409 (la restricción única
+    (user_id, mes) detecta el duplicado). Con `upsert=true` lo reemplaza en
+    un solo upsert atómico.
+    """
     data = plan.dict()
     data["user_id"] = user_id
 
@@ -421,8 +1503,28 @@ async def create_monthly_plan(plan: MonthlyPlan, user_id: str = Depends(verify_t
     if isinstance(data.get("mes"), date):
         data["mes"] = data["mes"].isoformat()
 
-    response = supabase_admin.table("monthly_plans").insert(data).execute()
-    return response.data[0]
+    if upsert:
+        response = supabase_admin.table("monthly_plans") \
+            .upsert(data, on_conflict="user_id,mes") \
+            .execute()
+        row = response.data[0]
+        # Fila nueva: created_at y updated_at son el mismo NOW()
+        accion = "insert" if row.get("created_at") == row.get("updated_at") else "update"
+    else:
+        try:
+            response = supabase_admin.table("monthly_plans").insert(data).execute()
+        except APIError as e:
+            if e.code == PG_UNIQUE_VIOLATION:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Ya existe un plan para el mes {plan.mes}"
+                )
+            raise
+        row = response.data[0]
+        accion = "insert"
+
+    await notify_change(user_id, "monthly_plans", accion, row["id"])
+    return row
 
 @app.get("/api/monthly/plans")
 async def get_monthly_plans(user_id: str = Depends(verify_token), limit: int = 12):
@@ -465,6 +1567,7 @@ async def update_monthly_plan(plan_id: str, plan: MonthlyPlan, user_id: str = De
         .eq("id", plan_id) \
         .eq("user_id", user_id) \
         .execute()
+    await notify_change(user_id, "monthly_plans", "update", plan_id)
     return response.data[0]
 
 @app.post("/api/monthly/reviews")
@@ -474,6 +1577,7 @@ async def create_monthly_review(review: MonthlyReview, user_id: str = Depends(ve
     data["user_id"] = user_id
     
     response = supabase_admin.table("monthly_reviews").insert(data).execute()
+    await notify_change(user_id, "monthly_reviews", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/monthly/reviews/{plan_id}")
@@ -499,80 +1603,142 @@ async def update_competencias_progress(
         .eq("id", plan_id) \
         .eq("user_id", user_id) \
         .execute()
+    await notify_change(user_id, "monthly_plans", "update", plan_id)
     return response.data[0]
 
+def build_competencias_evolution(plans):
+    """Agrupar el progreso de competencias de cada plan en series por competencia"""
+    evolution = {}
+    for plan in plans:
+        competencias = plan.get("competencias")
+        if not competencias:
+            continue
+        mes = plan["mes"]
+        for comp in competencias:
+            nombre = comp.get("nombre")
+            if nombre:
+                evolution.setdefault(nombre, []).append({
+                    "mes": mes,
+                    "progreso_inicio": comp.get("progreso_inicio", 0),
+                    "progreso_actual": comp.get("progreso_actual", 0),
+                    "progreso_fin": comp.get("progreso_fin")
+                })
+    return evolution
+
+def first_month_of_range(months: int) -> date:
+    """Primer día del mes de hace N-1 meses (N meses de calendario con el actual)"""
+    today = date.today()
+    year, month = divmod(today.year * 12 + today.month - months, 12)
+    return date(year, month + 1, 1)
+
 @app.get("/api/monthly/evolution")
-async def get_competencias_evolution(user_id: str = Depends(verify_token), months: int = 6):
-    """Obtener evolución de competencias en los últimos N meses"""
+async def get_competencias_evolution(
+    user_id: str = Depends(verify_token),
+    months: int = Query(6, ge=1, le=ANALYTICS_MAX_MONTHS),
+    include_plans: bool = True,
+    slim: bool = False,
+    source: str = "plans"
+):
+    """Obtener evolución de competencias en los últimos N meses
+
+    N son meses de calendario, incluido el actual, en ambos orígenes.
+    - include_plans=false: no devolver los planes completos, solo la evolución
+    - slim=true: proyectar solo mes y competencias de cada plan
+    - source=series: leer la tabla precalculada competencias_progress
+      (un solo rango indexado por usuario y mes)
+    """
+    desde = first_month_of_range(months)
+
+    if source == "series":
+        response = supabase_admin.table("competencias_progress") \
+            .select("competencia, mes, progreso_inicio, progreso_actual, progreso_fin") \
+            .eq("user_id", user_id) \
+            .gte("mes", desde.isoformat()) \
+            .order("mes", desc=True) \
+            .execute()
+
+        evolution = {}
+        for row in response.data:
+            evolution.setdefault(row["competencia"], []).append({
+                "mes": row["mes"],
+                "progreso_inicio": row["progreso_inicio"],
+                "progreso_actual": row["progreso_actual"],
+                "progreso_fin": row["progreso_fin"]
+            })
+        return {"evolution": evolution}
+
+    if source != "plans":
+        raise HTTPException(400, "source debe ser 'plans' o 'series'")
+
+    # Sin planes en la respuesta solo se necesitan mes y competencias
+    columns = "id, mes, competencias" if slim or not include_plans else "*"
+
     # Obtener planes de los últimos N meses
     response = supabase_admin.table("monthly_plans") \
-        .select("*") \
+        .select(columns) \
         .eq("user_id", user_id) \
+        .gte("mes", desde.isoformat()) \
         .order("mes", desc=True) \
-        .limit(months) \
         .execute()
 
     plans = response.data
-
-    # Compilar evolución de competencias
-    evolution = {}
-    for plan in plans:
-        if plan.get("competencias"):
-            mes = plan["mes"]
-            for comp in plan["competencias"]:
-                nombre = comp.get("nombre")
-                if nombre:
-                    if nombre not in evolution:
-                        evolution[nombre] = []
-                    evolution[nombre].append({
-                        "mes": mes,
-                        "progreso_inicio": comp.get("progreso_inicio", 0),
-                        "progreso_actual": comp.get("progreso_actual", 0),
-                        "progreso_fin": comp.get("progreso_fin")
-                    })
+    result = {"evolution": build_competencias_evolution(plans)}
+    if include_plans:
+        result["plans"] = plans
+    return result
+
+def compute_competencias_stats(competencias):
+    """Calcular métricas inicio vs fin de las competencias en una sola pasada"""
+    total = 0
+    suma_inicio = 0
+    con_progreso = 0
+    suma_fin = 0
+    for c in competencias:
+        total += 1
+        suma_inicio += c.get("progreso_inicio", 0)
+        progreso_fin = c.get("progreso_fin")
+        if progreso_fin is not None:
+            con_progreso += 1
+            suma_fin += progreso_fin
 
     return {
-        "evolution": evolution,
-        "plans": plans
+        "total": total,
+        "con_progreso": con_progreso,
+        "promedio_progreso_inicio": suma_inicio / total if total else 0,
+        "promedio_progreso_fin": suma_fin / con_progreso if con_progreso else 0,
+        "competencias": competencias
     }
 
-@app.get("/api/monthly/comparison/{plan_id}")
-async def get_plan_comparison(plan_id: str, user_id: str = Depends(verify_token)):
-    """Obtener comparación inicio vs fin de mes para un plan específico"""
-    # Obtener el plan
-    plan_response = supabase_admin.table("monthly_plans") \
-        .select("*") \
+def fetch_plan_with_review(plan_id: str, user_id: str):
+    """Obtener plan, evaluación y métricas en una sola consulta (recurso embebido de PostgREST)"""
+    response = supabase_admin.table("monthly_plans") \
+        .select("*, monthly_reviews(*)") \
         .eq("id", plan_id) \
         .eq("user_id", user_id) \
         .single() \
         .execute()
 
-    plan = plan_response.data
-
-    # Obtener la review
-    review_response = supabase_admin.table("monthly_reviews") \
-        .select("*") \
-        .eq("monthly_plan_id", plan_id) \
-        .eq("user_id", user_id) \
-        .execute()
-
-    review = review_response.data[0] if review_response.data else None
+    plan = response.data
+    # PostgREST devuelve la relación 1 a 1 como objeto o como lista según la versión
+    review = plan.pop("monthly_reviews", None)
+    if isinstance(review, list):
+        review = review[0] if review else None
 
-    # Calcular métricas de comparación
-    competencias = plan.get("competencias", [])
-    comparison = {
+    return {
         "plan": plan,
         "review": review,
-        "competencias_stats": {
-            "total": len(competencias),
-            "con_progreso": len([c for c in competencias if c.get("progreso_fin") is not None]),
-            "promedio_progreso_inicio": sum([c.get("progreso_inicio", 0) for c in competencias]) / len(competencias) if competencias else 0,
-            "promedio_progreso_fin": sum([c.get("progreso_fin", 0) for c in competencias if c.get("progreso_fin") is not None]) / len([c for c in competencias if c.get("progreso_fin") is not None]) if [c for c in competencias if c.get("progreso_fin") is not None] else 0,
-            "competencias": competencias
-        }
+        "competencias_stats": compute_competencias_stats(plan.get("competencias") or [])
     }
 
-    return comparison
+@app.get("/api/monthly/plans/{plan_id}/detail")
+async def get_monthly_plan_detail(plan_id: str, user_id: str = Depends(verify_token)):
+    """Obtener plan mensual con su evaluación y métricas en una sola petición"""
+    return fetch_plan_with_review(plan_id, user_id)
+
+@app.get("/api/monthly/comparison/{plan_id}")
+async def get_plan_comparison(plan_id: str, user_id: str = Depends(verify_token)):
+    """Obtener comparación inicio vs fin de mes para un plan específico"""
+    return fetch_plan_with_review(plan_id, user_id)
 
 # ============================================
 # RUTAS - BITÁCORAS SEMANALES
@@ -591,28 +1757,36 @@ async def create_weekly_log(log: WeeklyLog, user_id: str = Depends(verify_token)
         data["semana_fin"] = data["semana_fin"].isoformat()
 
     response = supabase_admin.table("weekly_logs").insert(data).execute()
+    await notify_change(user_id, "weekly_logs", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/weekly/logs")
-async def get_weekly_logs(user_id: str = Depends(verify_token), limit: int = 20):
-    """Obtener bitácoras semanales"""
-    response = supabase_admin.table("weekly_logs") \
-        .select("*") \
-        .eq("user_id", user_id) \
-        .order("semana_inicio", desc=True) \
-        .limit(limit) \
-        .execute()
-    return response.data
+async def get_weekly_logs(
+    user_id: str = Depends(verify_token),
+    limit: int = 20,
+    include_archived: bool = False
+):
+    """Obtener bitácoras semanales (include_archived: también las archivadas)"""
+    return select_with_archive(
+        "weekly_logs",
+        lambda table: table.select("*").eq("user_id", user_id).order("semana_inicio", desc=True).limit(limit),
+        include_archived,
+        order_by="semana_inicio",
+        desc=True,
+        limit=limit
+    )
 
 @app.get("/api/weekly/logs/{log_id}")
 async def get_weekly_log(log_id: str, user_id: str = Depends(verify_token)):
-    """Obtener bitácora semanal específica"""
+    """Obtener bitácora semanal específica (las archivadas no: 404)"""
     response = supabase_admin.table("weekly_logs") \
         .select("*") \
         .eq("id", log_id) \
         .eq("user_id", user_id) \
-        .single() \
+        .maybe_single() \
         .execute()
+    if response is None:
+        raise HTTPException(404, "Bitácora no encontrada")
     return response.data
 
 @app.put("/api/weekly/logs/{log_id}")
@@ -631,6 +1805,10 @@ async def update_weekly_log(log_id: str, log: WeeklyLog, user_id: str = Depends(
         .eq("id", log_id) \
         .eq("user_id", user_id) \
         .execute()
+    # Inexistente o ya archivada (el archivo es de solo lectura)
+    if not response.data:
+        raise HTTPException(404, "Bitácora no encontrada")
+    await notify_change(user_id, "weekly_logs", "update", log_id)
     return response.data[0]
 
 # ============================================
@@ -658,6 +1836,7 @@ async def create_task(task: DailyTask, user_id: str = Depends(verify_token)):
         data["clasificacion"] = None
 
     response = supabase_admin.table("daily_tasks").insert(data).execute()
+    await notify_change(user_id, "daily_tasks", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/tasks")
@@ -665,30 +1844,33 @@ async def get_tasks(
     user_id: str = Depends(verify_token),
     estado: Optional[str] = None,
     categoria: Optional[str] = None,
-    clasificacion: Optional[str] = None
+    clasificacion: Optional[str] = None,
+    include_archived: bool = False
 ):
-    """Obtener tareas con filtros"""
-    query = supabase_admin.table("daily_tasks").select("*").eq("user_id", user_id)
-
-    if estado:
-        query = query.eq("estado", estado)
-    if categoria:
-        query = query.eq("categoria", categoria)
-    if clasificacion:
-        query = query.eq("clasificacion", clasificacion)
-
-    response = query.order("orden").order("created_at").execute()
-    return response.data
+    """Obtener tareas con filtros (include_archived: también las archivadas, al final)"""
+    def build(table):
+        query = table.select("*").eq("user_id", user_id)
+        if estado:
+            query = query.eq("estado", estado)
+        if categoria:
+            query = query.eq("categoria", categoria)
+        if clasificacion:
+            query = query.eq("clasificacion", clasificacion)
+        return query.order("orden").order("created_at")
+
+    return select_with_archive("daily_tasks", build, include_archived)
 
 @app.get("/api/tasks/{task_id}")
 async def get_task(task_id: str, user_id: str = Depends(verify_token)):
-    """Obtener tarea específica"""
+    """Obtener tarea específica (las archivadas no: 404)"""
     response = supabase_admin.table("daily_tasks") \
         .select("*") \
         .eq("id", task_id) \
         .eq("user_id", user_id) \
-        .single() \
+        .maybe_single() \
         .execute()
+    if response is None:
+        raise HTTPException(404, "Tarea no encontrada")
     return response.data
 
 @app.put("/api/tasks/{task_id}")
@@ -712,6 +1894,10 @@ async def update_task(task_id: str, task: TaskUpdate, user_id: str = Depends(ver
         .eq("id", task_id) \
         .eq("user_id", user_id) \
         .execute()
+    # Inexistente o ya archivada (el archivo es de solo lectura)
+    if not response.data:
+        raise HTTPException(404, "Tarea no encontrada")
+    await notify_change(user_id, "daily_tasks", "update", task_id)
     return response.data[0]
 
 @app.get("/api/tasks/{task_id}/subtareas")
@@ -722,10 +1908,10 @@ async def get_subtareas(task_id: str, user_id: str = Depends(verify_token)):
         .select("*") \
         .eq("id", task_id) \
         .eq("user_id", user_id) \
-        .single() \
+        .maybe_single() \
         .execute()
 
-    if not parent_task.data:
+    if parent_task is None:
         raise HTTPException(404, "Tarea no encontrada")
 
     # Obtener subtareas
@@ -746,10 +1932,10 @@ async def recalcular_progreso(task_id: str, user_id: str = Depends(verify_token)
         .select("*") \
         .eq("id", task_id) \
         .eq("user_id", user_id) \
-        .single() \
+        .maybe_single() \
         .execute()
 
-    if not task.data:
+    if task is None:
         raise HTTPException(404, "Tarea no encontrada")
 
     if not task.data.get("es_macrotarea"):
@@ -774,6 +1960,7 @@ async def recalcular_progreso(task_id: str, user_id: str = Depends(verify_token)
         .eq("id", task_id) \
         .execute()
 
+    await notify_change(user_id, "daily_tasks", "update", task_id)
     return {"message": "Progreso recalculado", "progreso": promedio}
 
 @app.put("/api/tasks/{task_id}/recalcular-fechas")
@@ -784,10 +1971,10 @@ async def recalcular_fechas(task_id: str, user_id: str = Depends(verify_token)):
         .select("*") \
         .eq("id", task_id) \
         .eq("user_id", user_id) \
-        .single() \
+        .maybe_single() \
         .execute()
 
-    if not task.data:
+    if task is None:
         raise HTTPException(404, "Tarea no encontrada")
 
     if not task.data.get("es_macrotarea"):
@@ -822,6 +2009,7 @@ async def recalcular_fechas(task_id: str, user_id: str = Depends(verify_token)):
         .eq("id", task_id) \
         .execute()
 
+    await notify_change(user_id, "daily_tasks", "update", task_id)
     return {
         "message": "Fechas recalculadas",
         "fecha_inicio": fecha_inicio_min,
@@ -830,13 +2018,30 @@ async def recalcular_fechas(task_id: str, user_id: str = Depends(verify_token)):
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str, user_id: str = Depends(verify_token)):
-    """Eliminar tarea"""
-    supabase_admin.table("daily_tasks") \
-        .delete() \
-        .eq("id", task_id) \
-        .eq("user_id", user_id) \
-        .execute()
-    return {"message": "Tarea eliminada"}
+    """Eliminar tarea con sus subtareas y evidencias (requiere migrations/011_task_cascade.sql)"""
+    # Filas en una transacción (función SQL); los archivos después
+    result = supabase_admin.rpc("delete_task_cascade", {
+        "p_user_id": user_id,
+        "p_task_id": task_id
+    }).execute().data
+
+    if not result:
+        raise HTTPException(404, "Tarea no encontrada")
+
+    evidencias = result["evidencias"]
+    bytes_liberados = remove_evidencia_files(user_id, [e["archivo_url"] for e in evidencias])
+
+    for tarea_id in result["tareas"]:
+        await notify_change(user_id, "daily_tasks", "delete", tarea_id)
+    for evidencia in evidencias:
+        await notify_change(user_id, "evidencias", "delete", evidencia["id"])
+
+    return {
+        "message": "Tarea eliminada",
+        "tareas_eliminadas": len(result["tareas"]),
+        "evidencias_eliminadas": len(evidencias),
+        "bytes_liberados": bytes_liberados
+    }
 
 # ============================================
 # RUTAS - ACTIVIDADES
@@ -855,17 +2060,33 @@ async def create_actividad(actividad: Actividad, user_id: str = Depends(verify_t
         data["fecha_fin"] = data["fecha_fin"].isoformat()
 
     response = supabase_admin.table("actividades").insert(data).execute()
+    await notify_change(user_id, "actividades", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/actividades")
 async def get_actividades(
+    response: Response,
     user_id: str = Depends(verify_token),
     estado: Optional[str] = None,
     clasificacion: Optional[str] = None,
-    grupo: Optional[str] = None
+    grupo: Optional[str] = None,
+    desde: Optional[date] = Query(None, alias="from"),
+    hasta: Optional[date] = Query(None, alias="to"),
+    limit: Optional[int] = None,
+    offset: int = 0
 ):
-    """Obtener actividades con filtros opcionales"""
-    query = supabase_admin.table("actividades").select("*").eq("user_id", user_id)
+    """Obtener actividades con filtros opcionales
+
+    `from`/`to` devuelven las actividades cuyo periodo se solapa con el
+    rango (índice GiST de migrations/009_actividades_periodo.sql). Con
+    `limit` se pagina y el total va en el header X-Total-Count.
+    """
+    if desde and hasta and desde > hasta:
+        raise HTTPException(400, "'from' debe ser anterior o igual a 'to'")
+
+    query = supabase_admin.table("actividades") \
+        .select("*", count="exact" if limit else None) \
+        .eq("user_id", user_id)
 
     if estado:
         query = query.eq("estado", estado)
@@ -873,9 +2094,19 @@ async def get_actividades(
         query = query.eq("clasificacion", clasificacion)
     if grupo:
         query = query.eq("grupo", grupo)
+    if desde or hasta:
+        # Rango cerrado; un extremo vacío queda abierto
+        rango = f"[{desde.isoformat() if desde else ''},{hasta.isoformat() if hasta else ''}]"
+        query = query.filter("periodo", "ov", rango)
 
-    response = query.order("fecha_inicio", desc=True).execute()
-    return response.data
+    query = query.order("fecha_inicio", desc=True).order("id")
+    if limit:
+        query = query.range(offset, offset + limit - 1)
+
+    result = query.execute()
+    if limit:
+        response.headers["X-Total-Count"] = str(result.count or 0)
+    return result.data
 
 @app.get("/api/actividades/{actividad_id}")
 async def get_actividad(actividad_id: str, user_id: str = Depends(verify_token)):
@@ -908,6 +2139,7 @@ async def update_actividad(
         .eq("id", actividad_id) \
         .eq("user_id", user_id) \
         .execute()
+    await notify_change(user_id, "actividades", "update", actividad_id)
     return response.data[0]
 
 @app.delete("/api/actividades/{actividad_id}")
@@ -918,28 +2150,187 @@ async def delete_actividad(actividad_id: str, user_id: str = Depends(verify_toke
         .eq("id", actividad_id) \
         .eq("user_id", user_id) \
         .execute()
+    await notify_change(user_id, "actividades", "delete", actividad_id)
     return {"message": "Actividad eliminada"}
 
 @app.get("/api/actividades/grupos/list")
 async def get_grupos_actividades(user_id: str = Depends(verify_token)):
     """Obtener lista de grupos únicos de actividades del usuario"""
-    response = supabase_admin.table("actividades") \
-        .select("grupo") \
-        .eq("user_id", user_id) \
-        .execute()
+    response = supabase_admin.rpc("actividades_grupos", {"p_user_id": user_id}).execute()
+    return {"grupos": [item["grupo"] for item in response.data or []]}
+
+# ============================================
+# RUTAS - TIMELINE
+# ============================================
+
+def timeline_bucket_starts(desde: date, hasta: date, bucket: str) -> List[date]:
+    """Inicio de cada periodo (lunes o día 1) entre dos fechas"""
+    if bucket == "week":
+        actual = desde - timedelta(days=desde.weekday())
+    else:
+        actual = desde.replace(day=1)
+
+    starts = []
+    while actual <= hasta:
+        starts.append(actual)
+        if bucket == "week":
+            actual += timedelta(days=7)
+        else:
+            actual = (actual.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return starts
 
-    # Extraer grupos únicos (sin None/null)
-    grupos = set()
-    for item in response.data:
-        if item.get("grupo"):
-            grupos.add(item["grupo"])
+@app.get("/api/timeline")
+async def get_timeline(
+    user_id: str = Depends(verify_token),
+    desde: Optional[date] = Query(None, alias="from"),
+    hasta: Optional[date] = Query(None, alias="to"),
+    bucket: str = "month"
+):
+    """Obtener carriles del timeline agrupados por semana o mes
+
+    Un carril por grupo de actividades y por macrotarea. `valores` trae,
+    por cada periodo con actividad, [índice en `buckets`, items,
+    carga_dias, progreso]. La agregación se hace en la base de datos
+    (timeline_buckets() de migrations/010_timeline.sql), que devuelve un
+    solo arreglo JSON para no quedar truncada por el max-rows de PostgREST.
+    """
+    if bucket not in TIMELINE_BUCKETS:
+        raise HTTPException(400, "bucket debe ser 'week' o 'month'")
+
+    hoy = date.today()
+    desde = desde or hoy.replace(month=1, day=1)
+    hasta = hasta or hoy.replace(month=12, day=31)
+    if desde > hasta:
+        raise HTTPException(400, "'from' debe ser anterior o igual a 'to'")
+
+    buckets = timeline_bucket_starts(desde, hasta, bucket)
+    if len(buckets) > TIMELINE_MAX_BUCKETS:
+        raise HTTPException(400, f"Rango demasiado amplio: máximo {TIMELINE_MAX_BUCKETS} periodos")
+
+    result = supabase_admin.rpc("timeline_buckets", {
+        "p_user_id": user_id,
+        "p_from": desde.isoformat(),
+        "p_to": hasta.isoformat(),
+        "p_bucket": bucket
+    }).execute()
+
+    index = {b.isoformat(): i for i, b in enumerate(buckets)}
+    lanes = {}
+    for row in result.data or []:
+        posicion = index.get(row["bucket"][:10])
+        if posicion is None:
+            continue
 
-    return {"grupos": sorted(list(grupos))}
+        key = (row["lane_tipo"], row["lane_id"])
+        lane = lanes.get(key)
+        if lane is None:
+            lane = lanes[key] = {
+                "tipo": row["lane_tipo"],
+                "id": row["lane_id"],
+                "nombre": row["lane_nombre"],
+                "carga_dias": 0,
+                "progreso": 0,
+                "valores": []
+            }
+
+        progreso = float(row["progreso"] or 0)
+        lane["valores"].append([posicion, row["items"], row["carga_dias"], progreso])
+        # Progreso del carril ponderado por carga (se normaliza abajo)
+        lane["progreso"] += progreso * row["carga_dias"]
+        lane["carga_dias"] += row["carga_dias"]
+
+    for lane in lanes.values():
+        if lane["carga_dias"]:
+            lane["progreso"] = round(lane["progreso"] / lane["carga_dias"], 1)
+        lane["inicio"] = buckets[lane["valores"][0][0]].isoformat()
+        ultimo = lane["valores"][-1][0]
+        fin = buckets[ultimo + 1] - timedelta(days=1) if ultimo + 1 < len(buckets) else hasta
+        lane["fin"] = fin.isoformat()
+
+    return {
+        "from": desde.isoformat(),
+        "to": hasta.isoformat(),
+        "bucket": bucket,
+        "buckets": [b.isoformat() for b in buckets],
+        "lanes": list(lanes.values())
+    }
 
 # ============================================
 # RUTAS - EVIDENCIAS (ARCHIVOS)
 # ============================================
 
+def safe_filename(name: Optional[str]) -> str:
+    """Nombre de archivo enviado por el cliente reducido a un componente plano"""
+    name = unquote(name or "").replace("\\", "/").rsplit("/", 1)[-1]
+    name = re.sub(r"[\x00-\x1f]", "", name).replace("..", ".").strip(" .")
+    return name[:150] or "archivo"
+
+def evidencia_filename(archivo_url: str, user_id: str) -> Optional[str]:
+    """Nombre del archivo en Storage y en UPLOAD_DIR a partir de archivo_url
+
+    archivo_url viene de la base de datos (y de importaciones): solo se
+    acepta un nombre plano, sin separadores ni '..', que empiece por
+    {user_id}_. Si no, None y el archivo no se sirve, firma ni borra.
+    """
+    name = unquote(archivo_url.split("?")[0]).rsplit("/", 1)[-1]
+    if "/" in name or "\\" in name or ".." in name or "\x00" in name:
+        return None
+    if not name.startswith(f"{user_id}_"):
+        return None
+    path = UPLOAD_DIR / name
+    if not path.resolve().is_relative_to(UPLOAD_DIR.resolve()):
+        return None
+    return name
+
+def remove_evidencia_files(user_id: str, archivo_urls: List[str]) -> int:
+    """Borrar de Storage y de UPLOAD_DIR los archivos de evidencias eliminadas
+
+    Devuelve los bytes liberados en disco local. Los fallos solo se
+    registran: el GC periódico vuelve a intentarlo con los huérfanos.
+    """
+    filenames = [evidencia_filename(url, user_id) for url in archivo_urls if url]
+    filenames = [name for name in filenames if name]
+    if not filenames:
+        return 0
+
+    for start in range(0, len(filenames), GC_BATCH_SIZE):
+        batch = filenames[start:start + GC_BATCH_SIZE]
+        try:
+            supabase_admin.storage.from_(SUPABASE_BUCKET_NAME).remove(batch)
+        except Exception as e:
+            logger.warning("No se pudieron eliminar archivos de storage", extra={
+                "archivos": len(batch), "error": str(e)
+            })
+
+    freed = 0
+    for filename in filenames:
+        path = UPLOAD_DIR / filename
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            freed += size
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("No se pudo eliminar el archivo local", extra={"archivo": filename, "error": str(e)})
+    return freed
+
+def upload_to_storage(filename: str, contents: bytes, content_type: Optional[str]) -> str:
+    """Subir un archivo (ya guardado en UPLOAD_DIR) a Supabase Storage y devolver su URL"""
+    try:
+        supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
+            filename,
+            contents,
+            {"content-type": content_type or "application/octet-stream"}
+        )
+
+        # Obtener URL pública
+        return supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(filename)
+    except Exception as e:
+        # Si falla Supabase, usar archivo local
+        logger.warning("Storage no disponible, se usa el archivo local", extra={"archivo": filename, "error": str(e)})
+        return f"/uploads/{filename}"
+
 @app.post("/api/evidencias/upload")
 async def upload_evidencia(
     file: UploadFile = File(...),
@@ -956,7 +2347,7 @@ async def upload_evidencia(
         
         # Generar nombre único
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{user_id}_{timestamp}_{file.filename}"
+        filename = f"{user_id}_{timestamp}_{safe_filename(file.filename)}"
         
         # Guardar localmente (temporal)
         file_path = UPLOAD_DIR / filename
@@ -964,19 +2355,7 @@ async def upload_evidencia(
             await f.write(contents)
         
         # Subir a Supabase Storage
-        try:
-            storage_response = supabase.storage.from_(SUPABASE_BUCKET_NAME).upload(
-                filename,
-                contents,
-                {"content-type": file.content_type}
-            )
-            
-            # Obtener URL pública
-            public_url = supabase.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(filename)
-            archivo_url = public_url
-        except:
-            # Si falla Supabase, usar archivo local
-            archivo_url = f"/uploads/{filename}"
+        archivo_url = upload_to_storage(filename, contents, file.content_type)
         
         # Determinar tipo de archivo
         tipo_archivo = "otro"
@@ -1000,7 +2379,8 @@ async def upload_evidencia(
         }
         
         response = supabase_admin.table("evidencias").insert(evidencia_data).execute()
-        
+
+        await notify_change(user_id, "evidencias", "insert", response.data[0]["id"])
         return response.data[0]
     
     except Exception as e:
@@ -1031,18 +2411,487 @@ async def delete_evidencia(evidencia_id: str, user_id: str = Depends(verify_toke
         .single() \
         .execute()
     
-    # Intentar eliminar de Supabase Storage
-    try:
-        filename = evidencia.data["archivo_url"].split("/")[-1]
-        supabase.storage.from_(SUPABASE_BUCKET_NAME).remove([filename])
-    except:
-        pass
-    
-    # Eliminar de BD
+    # Eliminar de BD y después de Supabase Storage y de UPLOAD_DIR
     supabase_admin.table("evidencias").delete().eq("id", evidencia_id).execute()
-    
+    remove_evidencia_files(user_id, [evidencia.data["archivo_url"]])
+
+    await notify_change(user_id, "evidencias", "delete", evidencia_id)
     return {"message": "Evidencia eliminada"}
 
+def content_disposition(disposition: str, filename: str) -> str:
+    """Header Content-Disposition con nombre de archivo (RFC 5987 si no es ASCII)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+def parse_byte_range(range_header: str, size: int):
+    """(inicio, fin) inclusivo de un header Range de un solo rango
+
+    None si no es un rango de bytes único (se responde el archivo completo);
+    ValueError si el rango no se puede satisfacer (416).
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if not start_text:
+            # bytes=-N: los últimos N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError("Rango vacío")
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        if not start_text and not end_text:
+            return None
+        raise
+    if start >= size or end < start:
+        raise ValueError("Rango fuera del archivo")
+    return start, min(end, size - 1)
+
+class EvidenceFileResponse(Response):
+    """Archivo local con Range, peticiones condicionales y envío sin copias
+
+    - ETag/Last-Modified: If-None-Match / If-Modified-Since responden 304
+    - Range de un solo rango (206) con If-Range; 416 si no se puede satisfacer
+    - Si el servidor ASGI soporta http.response.zerocopysend o
+      http.response.pathsend, el archivo se envía con sendfile() sin pasar
+      por buffers de Python; si no, por bloques de EVIDENCE_CHUNK_SIZE
+    """
+
+    def __init__(self, path: Path, stat_result: os.stat_result, request: Request,
+                 media_type: str, disposition: str):
+        super().__init__(media_type=media_type, headers={
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": disposition,
+            "ETag": f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"',
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "Cache-Control": "private, no-cache",
+        })
+        self.path = path
+        self.size = stat_result.st_size
+        self.mtime = int(stat_result.st_mtime)
+        self.request_headers = request.headers
+        self.range = None
+
+        etag = self.headers["etag"]
+        if self.not_modified(etag):
+            self.status_code = 304
+            return
+
+        range_header = self.request_headers.get("range")
+        if_range = self.request_headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() in (etag, self.headers["last-modified"])):
+            try:
+                self.range = parse_byte_range(range_header, self.size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["Content-Range"] = f"bytes */{self.size}"
+                self.headers["Content-Length"] = "0"
+                return
+
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["Content-Range"] = f"bytes {start}-{end}/{self.size}"
+            self.headers["Content-Length"] = str(end - start + 1)
+        else:
+            self.headers["Content-Length"] = str(self.size)
+
+    def not_modified(self, etag: str) -> bool:
+        if_none_match = self.request_headers.get("if-none-match")
+        if if_none_match:
+            return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = self.request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.status_code in (304, 416) or scope["method"] == "HEAD" or self.size == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start, end = self.range or (0, self.size - 1)
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+
+        if self.range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(), "offset": start, "count": count})
+                return
+
+            f.seek(start)
+            while count > 0:
+                chunk = await asyncio.to_thread(f.read, min(EVIDENCE_CHUNK_SIZE, count))
+                if not chunk:
+                    break
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+            if count > 0:
+                # El archivo se truncó mientras se enviaba
+                await send({"type": "http.response.body", "body": b""})
+
+@app.api_route("/api/evidencias/{evidencia_id}/archivo", methods=["GET", "HEAD"])
+async def download_evidencia(
+    evidencia_id: str,
+    request: Request,
+    descargar: bool = False,
+    user_id: str = Depends(verify_stream_token)
+):
+    """Descargar el archivo de una evidencia del usuario
+
+    Acepta ?token= (como /api/events) para poder usarse en <a>, <img> y
+    <video>. `descargar=true` fuerza la descarga en lugar de mostrarlo.
+    """
+    response = supabase_admin.table("evidencias") \
+        .select("archivo_url, archivo_nombre, mime_type") \
+        .eq("id", evidencia_id) \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
+
+    if not response.data:
+        raise HTTPException(404, "Evidencia no encontrada")
+
+    evidencia = response.data[0]
+    filename = evidencia_filename(evidencia["archivo_url"], user_id)
+    if filename is None:
+        raise HTTPException(404, "Archivo no encontrado")
+    media_type = evidencia.get("mime_type") or "application/octet-stream"
+    disposition = content_disposition(
+        "attachment" if descargar else "inline",
+        evidencia.get("archivo_nombre") or filename
+    )
+
+    path = UPLOAD_DIR / filename
+    try:
+        stat_result = path.stat()
+    except (OSError, ValueError):
+        stat_result = None
+    if stat_result is not None and not stat.S_ISREG(stat_result.st_mode):
+        stat_result = None
+
+    if stat_result is None:
+        if evidencia["archivo_url"].startswith("/uploads/"):
+            raise HTTPException(404, "Archivo no encontrado")
+        # Sin copia local: URL firmada de Storage (Storage también soporta
+        # Range); si no se puede firmar, la URL pública guardada
+        url = evidencia["archivo_url"]
+        try:
+            signed = supabase_admin.storage.from_(SUPABASE_BUCKET_NAME) \
+                .create_signed_url(filename, EVIDENCE_SIGNED_URL_SECONDS)
+            url = signed.get("signedURL") or signed.get("signedUrl") or url
+        except Exception as e:
+            logger.warning("No se pudo firmar la URL de la evidencia", extra={"evidencia_id": evidencia_id, "error": str(e)})
+        return RedirectResponse(url, status_code=307)
+
+    if EVIDENCE_ACCEL_REDIRECT_PREFIX:
+        # El proxy envía el archivo (sendfile, Range y condicionales incluidos)
+        return Response(media_type=media_type, headers={
+            "X-Accel-Redirect": EVIDENCE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(filename),
+            "Content-Disposition": disposition,
+            "Cache-Control": "private, no-cache",
+        })
+
+    return EvidenceFileResponse(path, stat_result, request, media_type, disposition)
+
+# ============================================
+# LIMPIEZA DE ARCHIVOS HUÉRFANOS (GC)
+# ============================================
+
+class StorageGC:
+    """Limpieza periódica de evidencias y archivos huérfanos
+
+    Cada pasada (en un hilo, para no bloquear el event loop):
+    1. Elimina evidencias cuya tarea ya no existe (y sus archivos)
+    2. Reúne los nombres de archivo referenciados por evidencias
+    3. Borra los objetos de Storage y los archivos de UPLOAD_DIR sin
+       evidencia y con más de GC_MIN_AGE_SECONDS
+    Todo se recorre por lotes de GC_BATCH_SIZE. Con varios workers en la
+    misma máquina solo uno ejecuta cada pasada (lock en UPLOAD_DIR).
+    """
+
+    LOCK_NAME = ".gc.lock"
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self.interval <= 0 or supabase_admin is None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        # Desfase aleatorio: los workers no arrancan la pasada a la vez
+        await asyncio.sleep(random.uniform(60, 300))
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error en la limpieza de archivos huérfanos")
+            await asyncio.sleep(self.interval)
+
+    def run_once(self) -> Optional[dict]:
+        """Una pasada completa; devuelve el reporte (None si otro worker la está haciendo)"""
+        with self._lock() as acquired:
+            if not acquired:
+                return None
+
+            start = time.perf_counter()
+            report = {"evidencias_huerfanas": 0, "objetos_storage": 0, "archivos_locales": 0, "bytes_liberados": 0}
+
+            self._collect_orphan_rows(report)
+            referenced = self._referenced_filenames()
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=GC_MIN_AGE_SECONDS)
+            self._collect_storage(referenced, cutoff, report)
+            self._collect_uploads(referenced, cutoff, report)
+
+            report["ms"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info("Limpieza de archivos huérfanos", extra=report)
+            return report
+
+    @contextmanager
+    def _lock(self):
+        """Lock exclusivo no bloqueante sobre UPLOAD_DIR/.gc.lock (sin fcntl, siempre se obtiene)"""
+        try:
+            import fcntl
+        except ImportError:
+            yield True
+            return
+        with open(UPLOAD_DIR / self.LOCK_NAME, "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _collect_orphan_rows(self, report: dict):
+        """Evidencias de tareas inexistentes (migración 011: orphan_evidencias)"""
+        after = None
+        while True:
+            rows = supabase_admin.rpc("orphan_evidencias", {
+                "p_after": after,
+                "p_limit": GC_BATCH_SIZE
+            }).execute().data or []
+            if not rows:
+                return
+
+            supabase_admin.table("evidencias").delete().in_("id", [r["id"] for r in rows]).execute()
+            report["evidencias_huerfanas"] += len(rows)
+            # Locales: tamaño exacto; en Storage: tamanio_kb de la evidencia
+            for r in rows:
+                report["bytes_liberados"] += remove_evidencia_files(r["user_id"], [r["archivo_url"]])
+            report["bytes_liberados"] += sum(
+                (r.get("tamanio_kb") or 0) * 1024
+                for r in rows if not r["archivo_url"].startswith("/uploads/")
+            )
+
+            if len(rows) < GC_BATCH_SIZE:
+                return
+            after = rows[-1]["id"]
+
+    def _referenced_filenames(self) -> set:
+        """Nombres de archivo de todas las evidencias (keyset sobre id)"""
+        referenced = set()
+        last_id = None
+        while True:
+            query = supabase_admin.table("evidencias").select("id, user_id, archivo_url")
+            if last_id:
+                query = query.gt("id", last_id)
+            rows = query.order("id").limit(GC_BATCH_SIZE).execute().data
+            referenced.update(
+                evidencia_filename(r["archivo_url"], r["user_id"]) for r in rows if r.get("archivo_url")
+            )
+            if len(rows) < GC_BATCH_SIZE:
+                return referenced
+            last_id = rows[-1]["id"]
+
+    def _collect_storage(self, referenced: set, cutoff: datetime, report: dict):
+        """Objetos del bucket sin evidencia"""
+        bucket = supabase_admin.storage.from_(SUPABASE_BUCKET_NAME)
+        orphans = []
+        offset = 0
+        try:
+            while True:
+                objects = bucket.list(None, {"limit": GC_BATCH_SIZE, "offset": offset})
+                for obj in objects:
+                    created_at = parse_sync_cursor(obj["created_at"]) if obj.get("created_at") else None
+                    if obj["name"].startswith(".") or obj["name"] in referenced \
+                            or created_at is None or created_at > cutoff:
+                        continue
+                    orphans.append((obj["name"], (obj.get("metadata") or {}).get("size") or 0))
+                if len(objects) < GC_BATCH_SIZE:
+                    break
+                offset += GC_BATCH_SIZE
+
+            # Se borra después de listar para no desplazar las páginas
+            for start in range(0, len(orphans), GC_BATCH_SIZE):
+                batch = orphans[start:start + GC_BATCH_SIZE]
+                bucket.remove([name for name, _ in batch])
+                report["objetos_storage"] += len(batch)
+                report["bytes_liberados"] += sum(size for _, size in batch)
+        except Exception as e:
+            logger.warning("No se pudo revisar Supabase Storage", extra={"error": str(e)})
+
+    def _collect_uploads(self, referenced: set, cutoff: datetime, report: dict):
+        """Archivos de UPLOAD_DIR sin evidencia"""
+        cutoff_ts = cutoff.timestamp()
+        with os.scandir(UPLOAD_DIR) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith(".") or entry.name in referenced:
+                    continue
+                info = entry.stat()
+                if info.st_mtime > cutoff_ts:
+                    continue
+                try:
+                    os.unlink(entry.path)
+                except OSError as e:
+                    logger.warning("No se pudo eliminar el archivo local", extra={"archivo": entry.name, "error": str(e)})
+                    continue
+                report["archivos_locales"] += 1
+                report["bytes_liberados"] += info.st_size
+
+storage_gc = StorageGC(GC_INTERVAL_SECONDS)
+
+# ============================================
+# ARCHIVO DE DATOS ANTIGUOS
+# ============================================
+
+# Tabla activa -> tabla de archivo (migración 012)
+ARCHIVE_TABLES = {
+    "daily_tasks": "daily_tasks_archive",
+    "weekly_logs": "weekly_logs_archive",
+    "financial_records": "financial_records_archive",
+}
+
+def archive_cutoff() -> date:
+    """Primer día del mes desde el que los datos siguen en las tablas activas"""
+    return (date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)).replace(day=1)
+
+def select_with_archive(tabla: str, build, include_archived: bool,
+                        order_by: Optional[str] = None, desc: bool = False,
+                        limit: Optional[int] = None) -> list:
+    """Filas de la tabla activa y, con include_archived, también del archivo
+
+    build(query) aplica el select, los filtros y el orden a cada tabla. Las
+    filas archivadas traen archived_at; se agregan al final o, con order_by,
+    se mezclan ordenadas y se vuelve a aplicar limit.
+    """
+    rows = build(supabase_admin.table(tabla)).execute().data
+    if not include_archived:
+        return rows
+
+    try:
+        archived = build(supabase_admin.table(ARCHIVE_TABLES[tabla])).execute().data
+    except APIError as e:
+        logger.warning("Archivo no disponible (migración 012)", extra={"tabla": tabla, "error": e.message})
+        return rows
+
+    rows = rows + archived
+    if order_by:
+        rows.sort(key=lambda row: row.get(order_by) or "", reverse=desc)
+    if limit is not None:
+        rows = rows[:limit]
+    return rows
+
+class DataArchiver:
+    """Mueve periódicamente los datos antiguos a las tablas de archivo
+
+    Cada pasada (en un hilo) llama a archive_batch() por tabla con lotes de
+    ARCHIVE_BATCH_SIZE hasta que no queda nada anterior a archive_cutoff(),
+    con una pausa de ARCHIVE_THROTTLE_SECONDS entre lotes. Cada lote es una
+    transacción corta con SKIP LOCKED: varios workers pueden archivar a la
+    vez sin bloquearse entre sí ni a las peticiones.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self.interval <= 0 or supabase_admin is None:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        # Desfase aleatorio: los workers no arrancan la pasada a la vez
+        await asyncio.sleep(random.uniform(60, 300))
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except APIError as e:
+                if e.code != "PGRST202":
+                    raise
+                logger.warning("Archivo desactivado: falta migrations/012_archive.sql")
+                return
+            except Exception:
+                logger.exception("Error al archivar datos antiguos")
+            await asyncio.sleep(self.interval)
+
+    def run_once(self) -> dict:
+        """Una pasada completa; devuelve las filas movidas por tabla"""
+        start = time.perf_counter()
+        cutoff = archive_cutoff().isoformat()
+        report = {tabla: 0 for tabla in ARCHIVE_TABLES}
+
+        for tabla in ARCHIVE_TABLES:
+            while True:
+                moved = supabase_admin.rpc("archive_batch", {
+                    "p_tabla": tabla,
+                    "p_before": cutoff,
+                    "p_limit": ARCHIVE_BATCH_SIZE
+                }).execute().data or 0
+                report[tabla] += moved
+                if moved == 0:
+                    break
+                time.sleep(ARCHIVE_THROTTLE_SECONDS)
+
+        report["antes_de"] = cutoff
+        report["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("Archivo de datos antiguos", extra=report)
+        return report
+
+data_archiver = DataArchiver(ARCHIVE_INTERVAL_SECONDS)
+
 # ============================================
 # RUTAS - CONFIGURACIÓN DE USUARIO
 # ============================================
@@ -1050,53 +2899,70 @@ async def delete_evidencia(evidencia_id: str, user_id: str = Depends(verify_toke
 @app.get("/api/config")
 async def get_user_config(user_id: str = Depends(verify_token)):
     """Obtener configuración del usuario (clasificaciones y categorías personalizadas)"""
-    try:
-        # Intentar obtener configuración existente
-        response = supabase_admin.table("user_config") \
-            .select("*") \
-            .eq("user_id", user_id) \
-            .single() \
-            .execute()
+    response = supabase_admin.table("user_config") \
+        .select("*") \
+        .eq("user_id", user_id) \
+        .limit(1) \
+        .execute()
 
-        return response.data
-    except Exception as e:
-        # Si no existe, crear con valores por defecto
-        default_config = {
-            "user_id": user_id,
-            "clasificaciones": [
-                'desarrollo', 'investigacion', 'documentacion', 'reunion',
-                'estudio', 'revision', 'planificacion', 'testing'
-            ],
-            "categorias": [
-                'aprendizaje', 'compromiso', 'competencia', 'personal'
-            ]
-        }
+    if response.data:
+        return response.data[0]
+
+    # Si no existe, crear con valores por defecto. ignore_duplicates evita
+    # el error si otra petición concurrente la creó primero.
+    default_config = UserConfig().dict()
+    default_config["user_id"] = user_id
+
+    response = supabase_admin.table("user_config") \
+        .upsert(default_config, on_conflict="user_id", ignore_duplicates=True) \
+        .execute()
 
-        response = supabase_admin.table("user_config").insert(default_config).execute()
+    if response.data:
         return response.data[0]
 
+    # Otra petición ganó la carrera: devolver la fila que creó
+    response = supabase_admin.table("user_config") \
+        .select("*") \
+        .eq("user_id", user_id) \
+        .single() \
+        .execute()
+    return response.data
+
 @app.put("/api/config")
 async def update_user_config(config: UserConfigUpdate, user_id: str = Depends(verify_token)):
     """Actualizar configuración del usuario"""
     data = config.dict(exclude_unset=True)
+    data["user_id"] = user_id
 
-    # Intentar actualizar
+    # Upsert atómico: actualiza solo los campos enviados o crea la fila
+    # (los campos no enviados toman el valor por defecto de la tabla)
     try:
         response = supabase_admin.table("user_config") \
-            .update(data) \
-            .eq("user_id", user_id) \
+            .upsert(data, on_conflict="user_id", default_to_null=False) \
             .execute()
-
-        if response.data:
-            return response.data[0]
-        else:
-            # Si no existe, crear
-            data["user_id"] = user_id
-            response = supabase_admin.table("user_config").insert(data).execute()
-            return response.data[0]
     except Exception as e:
         raise HTTPException(500, f"Error al actualizar configuración: {str(e)}")
 
+    await notify_change(user_id, "user_config", "update")
+    return response.data[0]
+
+async def patch_config_array(user_id: str, campo: str, agregar: List[str], quitar: List[str]):
+    """Agregar (si no existe) y quitar valores de un arreglo de user_config de forma atómica"""
+    agregar = [v.strip() for v in agregar or [] if v and v.strip()]
+    quitar = [v.strip() for v in quitar or [] if v and v.strip()]
+
+    response = supabase_admin.rpc("user_config_array_patch", {
+        "p_user_id": user_id,
+        "p_campo": campo,
+        "p_agregar": agregar,
+        "p_quitar": quitar
+    }).execute()
+
+    result = response.data[0]
+    if result["agregados"] or result["eliminados"]:
+        await notify_change(user_id, "user_config", "update")
+    return result
+
 @app.post("/api/config/clasificaciones")
 async def add_clasificacion(clasificacion: dict, user_id: str = Depends(verify_token)):
     """Agregar una nueva clasificación personalizada"""
@@ -1105,22 +2971,22 @@ async def add_clasificacion(clasificacion: dict, user_id: str = Depends(verify_t
     if not nueva_clasificacion:
         raise HTTPException(400, "Nombre de clasificación requerido")
 
-    # Obtener configuración actual
-    config = await get_user_config(user_id)
-    clasificaciones_actuales = config.get("clasificaciones", [])
-
-    # Agregar si no existe
-    if nueva_clasificacion not in clasificaciones_actuales:
-        clasificaciones_actuales.append(nueva_clasificacion)
+    result = await patch_config_array(user_id, "clasificaciones", [nueva_clasificacion], [])
 
-        response = supabase_admin.table("user_config") \
-            .update({"clasificaciones": clasificaciones_actuales}) \
-            .eq("user_id", user_id) \
-            .execute()
+    if result["agregados"]:
+        return {"message": "Clasificación agregada", "clasificaciones": result["valores"]}
 
-        return {"message": "Clasificación agregada", "clasificaciones": clasificaciones_actuales}
+    return {"message": "Clasificación ya existe", "clasificaciones": result["valores"]}
 
-    return {"message": "Clasificación ya existe", "clasificaciones": clasificaciones_actuales}
+@app.patch("/api/config/clasificaciones")
+async def patch_clasificaciones(cambios: ConfigArrayPatch, user_id: str = Depends(verify_token)):
+    """Agregar y quitar varias clasificaciones en una sola llamada"""
+    result = await patch_config_array(user_id, "clasificaciones", cambios.agregar, cambios.quitar)
+    return {
+        "clasificaciones": result["valores"],
+        "agregadas": result["agregados"],
+        "eliminadas": result["eliminados"]
+    }
 
 @app.post("/api/config/categorias")
 async def add_categoria(categoria: dict, user_id: str = Depends(verify_token)):
@@ -1130,22 +2996,22 @@ async def add_categoria(categoria: dict, user_id: str = Depends(verify_token)):
     if not nueva_categoria:
         raise HTTPException(400, "Nombre de categoría requerido")
 
-    # Obtener configuración actual
-    config = await get_user_config(user_id)
-    categorias_actuales = config.get("categorias", [])
+    result = await patch_config_array(user_id, "categorias", [nueva_categoria], [])
 
-    # Agregar si no existe
-    if nueva_categoria not in categorias_actuales:
-        categorias_actuales.append(nueva_categoria)
+    if result["agregados"]:
+        return {"message": "Categoría agregada", "categorias": result["valores"]}
 
-        response = supabase_admin.table("user_config") \
-            .update({"categorias": categorias_actuales}) \
-            .eq("user_id", user_id) \
-            .execute()
+    return {"message": "Categoría ya existe", "categorias": result["valores"]}
 
-        return {"message": "Categoría agregada", "categorias": categorias_actuales}
-
-    return {"message": "Categoría ya existe", "categorias": categorias_actuales}
+@app.patch("/api/config/categorias")
+async def patch_categorias(cambios: ConfigArrayPatch, user_id: str = Depends(verify_token)):
+    """Agregar y quitar varias categorías en una sola llamada"""
+    result = await patch_config_array(user_id, "categorias", cambios.agregar, cambios.quitar)
+    return {
+        "categorias": result["valores"],
+        "agregadas": result["agregados"],
+        "eliminadas": result["eliminados"]
+    }
 
 # ============================================
 # RUTAS - DASHBOARD Y MÉTRICAS
@@ -1194,20 +3060,10 @@ async def get_dashboard_summary(user_id: str = Depends(verify_token)):
         "today": today.isoformat()
     }
 
-@app.get("/api/dashboard/tasks-by-day")
-async def get_tasks_by_day(user_id: str = Depends(verify_token), days: int = 7):
-    """Obtener tareas agrupadas por día de inicio (últimos N días)"""
-    start_date = date.today() - timedelta(days=days)
-
-    tasks = supabase_admin.table("daily_tasks") \
-        .select("*") \
-        .eq("user_id", user_id) \
-        .gte("fecha_inicio", start_date.isoformat()) \
-        .execute()
-
-    # Agrupar por fecha_inicio
+def group_tasks_by_day(tasks):
+    """Contar tareas totales, completadas y pendientes por fecha_inicio"""
     tasks_by_day = {}
-    for task in tasks.data:
+    for task in tasks:
         task_date = task.get("fecha_inicio")
         if not task_date:
             continue
@@ -1220,9 +3076,310 @@ async def get_tasks_by_day(user_id: str = Depends(verify_token), days: int = 7):
             tasks_by_day[task_date]["completadas"] += 1
         elif task["estado"] == "pendiente":
             tasks_by_day[task_date]["pendientes"] += 1
-    
+
     return tasks_by_day
 
+@app.get("/api/dashboard/tasks-by-day")
+async def get_tasks_by_day(user_id: str = Depends(verify_token), days: int = 7):
+    """Obtener tareas agrupadas por día de inicio (últimos N días)"""
+    start_date = date.today() - timedelta(days=days)
+
+    tasks = supabase_admin.table("daily_tasks") \
+        .select("*") \
+        .eq("user_id", user_id) \
+        .gte("fecha_inicio", start_date.isoformat()) \
+        .execute()
+
+    return group_tasks_by_day(tasks.data)
+
+# ============================================
+# ANALÍTICA DE PRODUCTIVIDAD
+# ============================================
+
+ANALYTICS_TASK_COLUMNS = [
+    "estado", "clasificacion", "fecha_inicio", "fecha_fin",
+    "tiempo_estimado", "tiempo_real", "completed_at",
+]
+ANALYTICS_LOG_COLUMNS = ["semana_inicio", "semana_fin", "nivel_energia", "nivel_satisfaccion"]
+
+def fetch_columns(tabla: str, user_id: str, columns: List[str]) -> dict:
+    """Columnas del usuario (tabla activa y archivo) como listas por columna
+
+    Solo se piden las columnas usadas: la transferencia no depende de los
+    textos largos (descripciones, notas, reflexiones).
+    """
+    data = {column: [] for column in columns}
+    select = ", ".join(["id"] + columns)
+    tablas = [tabla] + ([ARCHIVE_TABLES[tabla]] if tabla in ARCHIVE_TABLES else [])
+    for nombre in tablas:
+        try:
+            for rows in iter_user_pages(nombre, user_id, select, ANALYTICS_PAGE_SIZE):
+                for column in columns:
+                    data[column].extend(row.get(column) for row in rows)
+        except APIError as e:
+            if nombre == tabla:
+                raise
+            logger.warning("Archivo no disponible (migración 012)", extra={"tabla": tabla, "error": e.message})
+    return data
+
+def to_dates(values: list) -> np.ndarray:
+    """Fechas ISO (YYYY-MM-DD) -> datetime64[D] (None -> NaT)"""
+    return np.array(values, dtype="datetime64[D]")
+
+def timestamps_to_dates(values: list) -> np.ndarray:
+    """Timestamps ISO con zona horaria -> día (datetime64[D], None -> NaT)
+
+    Solo se convierten los no nulos: los primeros 10 caracteres (U10) son la
+    fecha y se evita que NumPy interprete la zona horaria.
+    """
+    values = np.array(values, dtype=object)
+    present = values != None  # noqa: E711 (comparación elemento a elemento)
+    dates = np.full(len(values), np.datetime64("NaT", "D"))
+    dates[present] = values[present].astype("U10").astype("datetime64[D]")
+    return dates
+
+def to_numbers(values: list) -> np.ndarray:
+    """Enteros opcionales -> float64 (None -> NaN)"""
+    return np.array(values, dtype=np.float64)
+
+def finite_or_none(value, digits: int = 2):
+    """Escalar de NumPy -> float de Python redondeado (NaN/inf -> None)"""
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+def pearson(x: np.ndarray, y: np.ndarray):
+    """Correlación de Pearson (None con menos de 3 puntos o sin variación)"""
+    if len(x) < 3 or np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return finite_or_none(np.corrcoef(x, y)[0, 1], 3)
+
+def compute_productivity_analytics(tasks: dict, logs: dict, months: int, today: date) -> dict:
+    """Métricas de productividad de los últimos `months` meses
+
+    tasks/logs son columnas (fetch_columns); todo el cálculo es vectorizado.
+    - tendencia: tasa de completado por mes (sin canceladas) y su pendiente
+    - estimaciones: tiempo_real frente a tiempo_estimado de las completadas
+    - energia: correlación de nivel_energia/nivel_satisfaccion de cada
+      bitácora con las tareas completadas esa semana
+    - velocidad: completadas por semana y duración por clasificación
+    """
+    current_month = np.datetime64(today, "M")
+    first_month = current_month - (months - 1)
+    window_start = first_month.astype("datetime64[D]")
+    today_d = np.datetime64(today, "D")
+    weeks = max(float((today_d - window_start).astype(int) + 1) / 7, 1 / 7)
+
+    estado = np.array(tasks["estado"], dtype=object)
+    inicio = to_dates(tasks["fecha_inicio"])
+    fin = to_dates(tasks["fecha_fin"])
+    referencia = np.where(np.isnat(fin), inicio, fin)
+    completada = estado == "completada"
+    # Fecha de completado: completed_at o, si falta, fecha_fin
+    completado_en = timestamps_to_dates(tasks["completed_at"])
+    completado_en = np.where(np.isnat(completado_en), referencia, completado_en)
+
+    window_end = (current_month + 1).astype("datetime64[D]")
+    in_window = ~np.isnat(referencia) & (referencia >= window_start) & (referencia < window_end)
+    done = completada & in_window & ~np.isnat(completado_en)
+
+    # -- Tendencia mensual ---------------------------------------------------
+    counted = in_window & (estado != "cancelada")
+    month_index = (referencia[counted].astype("datetime64[M]") - first_month).astype(np.int64)
+    totales = np.bincount(month_index, minlength=months)
+    completadas = np.bincount(month_index, weights=completada[counted], minlength=months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tasas = np.where(totales > 0, completadas / totales * 100, np.nan)
+
+    con_datos = ~np.isnan(tasas)
+    pendiente = None
+    if con_datos.sum() >= 2:
+        pendiente = finite_or_none(np.polyfit(np.arange(months)[con_datos], tasas[con_datos], 1)[0])
+
+    tendencia = [
+        {
+            "mes": str(first_month + i) + "-01",
+            "total": int(totales[i]),
+            "completadas": int(completadas[i]),
+            "tasa": finite_or_none(tasas[i], 1),
+        }
+        for i in range(months)
+    ]
+
+    # -- Precisión de las estimaciones ---------------------------------------
+    estimado = to_numbers(tasks["tiempo_estimado"])
+    real = to_numbers(tasks["tiempo_real"])
+    with np.errstate(invalid="ignore"):
+        medibles = done & (estimado > 0) & (real > 0)
+    estimado, real = estimado[medibles], real[medibles]
+    ratio = real / estimado
+    estimaciones = {
+        "tareas": int(medibles.sum()),
+        "minutos_estimados": int(estimado.sum()),
+        "minutos_reales": int(real.sum()),
+        "ratio_mediana": finite_or_none(np.median(ratio)) if len(ratio) else None,
+        "error_medio_pct": finite_or_none(np.mean(np.abs(ratio - 1)) * 100, 1) if len(ratio) else None,
+        "dentro_20_pct": finite_or_none(np.mean(np.abs(ratio - 1) <= 0.2) * 100, 1) if len(ratio) else None,
+        "subestimadas_pct": finite_or_none(np.mean(ratio > 1) * 100, 1) if len(ratio) else None,
+    }
+
+    # -- Energía y satisfacción frente a tareas completadas ------------------
+    semana_inicio = to_dates(logs["semana_inicio"])
+    semana_fin = to_dates(logs["semana_fin"])
+    energia = to_numbers(logs["nivel_energia"])
+    satisfaccion = to_numbers(logs["nivel_satisfaccion"])
+    semanas = ~np.isnat(semana_inicio) & ~np.isnat(semana_fin) & (semana_inicio >= window_start)
+
+    fechas_completado = np.sort(completado_en[done])
+    tareas_semana = (
+        np.searchsorted(fechas_completado, semana_fin[semanas], side="right")
+        - np.searchsorted(fechas_completado, semana_inicio[semanas], side="left")
+    ).astype(np.float64)
+    energia, satisfaccion = energia[semanas], satisfaccion[semanas]
+    con_energia = ~np.isnan(energia)
+    con_satisfaccion = ~np.isnan(satisfaccion)
+
+    niveles = np.arange(1, 6)
+    en_escala = con_energia & (energia >= 1) & (energia <= 5)
+    nivel = energia[en_escala].astype(np.int64)
+    semanas_nivel = np.bincount(nivel, minlength=6)[1:6]
+    tareas_nivel = np.bincount(nivel, weights=tareas_semana[en_escala], minlength=6)[1:6]
+    energia_resultado = {
+        "semanas": int(semanas.sum()),
+        "tareas_por_semana": finite_or_none(tareas_semana.mean()) if len(tareas_semana) else None,
+        "correlacion_energia": pearson(energia[con_energia], tareas_semana[con_energia]),
+        "correlacion_satisfaccion": pearson(satisfaccion[con_satisfaccion], tareas_semana[con_satisfaccion]),
+        "por_nivel_energia": [
+            {
+                "nivel": int(niveles[i]),
+                "semanas": int(semanas_nivel[i]),
+                "tareas_promedio": finite_or_none(tareas_nivel[i] / semanas_nivel[i]) if semanas_nivel[i] else None,
+            }
+            for i in range(5)
+        ],
+    }
+
+    # -- Velocidad por clasificación -----------------------------------------
+    clasificacion = np.array(tasks["clasificacion"], dtype=object)[done]
+    clasificacion[clasificacion == None] = "Sin clasificación"  # noqa: E711 (comparación elemento a elemento)
+    nombres, grupo = np.unique(clasificacion, return_inverse=True)
+    cantidad = np.bincount(grupo, minlength=len(nombres))
+    real_done = to_numbers(tasks["tiempo_real"])[done]
+    con_real = ~np.isnan(real_done)
+    minutos = np.bincount(grupo[con_real], weights=real_done[con_real], minlength=len(nombres))
+    con_minutos = np.bincount(grupo[con_real], minlength=len(nombres))
+    con_fechas = ~np.isnat(inicio[done]) & ~np.isnat(fin[done])
+    duracion = (fin[done] - inicio[done]).astype(np.int64) + 1
+    con_duracion = con_fechas & (duracion > 0)
+    dias = np.bincount(grupo[con_duracion], weights=duracion[con_duracion], minlength=len(nombres))
+    con_dias = np.bincount(grupo[con_duracion], minlength=len(nombres))
+
+    velocidad = sorted(
+        (
+            {
+                "clasificacion": str(nombres[i]),
+                "completadas": int(cantidad[i]),
+                "por_semana": finite_or_none(cantidad[i] / weeks),
+                "tiempo_real_promedio": finite_or_none(minutos[i] / con_minutos[i], 1) if con_minutos[i] else None,
+                "dias_promedio": finite_or_none(dias[i] / con_dias[i], 1) if con_dias[i] else None,
+            }
+            for i in range(len(nombres))
+        ),
+        key=lambda item: item["completadas"],
+        reverse=True
+    )
+
+    return {
+        "desde": str(window_start),
+        "hasta": today.isoformat(),
+        "meses": months,
+        "tareas_analizadas": int(in_window.sum()),
+        "tendencia": tendencia,
+        "tendencia_pendiente": pendiente,
+        "estimaciones": estimaciones,
+        "energia": energia_resultado,
+        "velocidad": velocidad,
+    }
+
+class AnalyticsCache:
+    """Resultados de /api/analytics por usuario (LRU)
+
+    Se invalidan con los eventos de cambios de tareas y bitácoras (de
+    cualquier worker con EVENTS_BROKER_URL). La generación evita guardar un
+    resultado calculado antes de una escritura que llegó durante el cálculo.
+    Con varios workers y sin broker externo no se guarda nada: una escritura
+    atendida por otro worker no invalidaría la copia de este.
+    """
+
+    TABLES = {"daily_tasks", "weekly_logs"}
+
+    def __init__(self, ttl: int, max_users: int, broker: ChangeBroker, workers: int = 1):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.broker = broker
+        self.workers = workers
+        self.entries = OrderedDict()  # user_id -> {"generation": int, "results": {months: (expira, datos)}}
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers <= 1 or self.broker.shared
+
+    def _entry(self, user_id: str) -> dict:
+        entry = self.entries.pop(user_id, None) or {"generation": 0, "results": {}}
+        self.entries[user_id] = entry
+        while len(self.entries) > self.max_users:
+            self.entries.popitem(last=False)
+        return entry
+
+    def get(self, user_id: str, months: int):
+        """(resultado o None, generación actual)"""
+        if not self.enabled:
+            return None, 0
+        entry = self._entry(user_id)
+        cached = entry["results"].get(months)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], entry["generation"]
+        return None, entry["generation"]
+
+    def put(self, user_id: str, months: int, generation: int, result: dict):
+        if not self.enabled:
+            return
+        entry = self._entry(user_id)
+        if entry["generation"] == generation:
+            entry["results"][months] = (time.monotonic() + self.ttl, result)
+
+    def invalidate(self, user_id: str):
+        entry = self.entries.get(user_id)
+        if entry is not None:
+            entry["generation"] += 1
+            entry["results"].clear()
+
+    def on_change(self, user_id: str, event: dict):
+        if event.get("tabla") in self.TABLES:
+            self.invalidate(user_id)
+
+analytics_cache = AnalyticsCache(
+    ANALYTICS_CACHE_TTL_SECONDS, ANALYTICS_CACHE_MAX_USERS, change_broker, WEB_CONCURRENCY
+)
+change_broker.on_change(analytics_cache.on_change)
+
+def build_analytics(user_id: str, months: int) -> dict:
+    """Leer las columnas necesarias (con el archivo) y calcular las métricas"""
+    tasks = fetch_columns("daily_tasks", user_id, ANALYTICS_TASK_COLUMNS)
+    logs = fetch_columns("weekly_logs", user_id, ANALYTICS_LOG_COLUMNS)
+    return compute_productivity_analytics(tasks, logs, months, date.today())
+
+@app.get("/api/analytics")
+async def get_analytics(
+    user_id: str = Depends(verify_token),
+    months: int = Query(12, ge=1, le=ANALYTICS_MAX_MONTHS)
+):
+    """Analítica de productividad (tendencias, estimaciones, energía y velocidad)"""
+    result, generation = analytics_cache.get(user_id, months)
+    if result is None:
+        result = await asyncio.to_thread(build_analytics, user_id, months)
+        analytics_cache.put(user_id, months, generation, result)
+    return result
+
 @app.get("/api/competencias")
 async def get_competencias():
     """Obtener catálogo de competencias"""
@@ -1239,6 +3396,7 @@ async def create_financial_category(category: FinancialCategory, user_id: str =
     data = category.dict()
     data["user_id"] = user_id
     response = supabase_admin.table("financial_categories").insert(data).execute()
+    await notify_change(user_id, "financial_categories", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/financial/categories")
@@ -1267,10 +3425,13 @@ async def create_financial_record(record: FinancialRecord, user_id: str = Depend
             cat = supabase_admin.table("financial_categories") \
                 .select("nombre").eq("id", data["category_id"]).single().execute()
             data["categoria_nombre"] = cat.data["nombre"]
-        except:
-            pass
+        except Exception as e:
+            logger.warning("Categoría financiera no encontrada", extra={
+                "category_id": data["category_id"], "error": str(e)
+            })
 
     response = supabase_admin.table("financial_records").insert(data).execute()
+    await notify_change(user_id, "financial_records", "insert", response.data[0]["id"])
     return response.data[0]
 
 @app.get("/api/financial/records")
@@ -1278,34 +3439,72 @@ async def get_financial_records(
     user_id: str = Depends(verify_token),
     mes: Optional[str] = None,
     tipo: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    include_archived: bool = False
 ):
-    """Obtener registros financieros"""
-    query = supabase_admin.table("financial_records").select("*").eq("user_id", user_id)
-    if mes:
-        query = query.eq("mes", mes)
-    if tipo:
-        query = query.eq("tipo", tipo)
-    response = query.order("fecha_transaccion", desc=True).limit(limit).execute()
-    return response.data
+    """Obtener registros financieros (include_archived: también los archivados)"""
+    def build(table):
+        query = table.select("*").eq("user_id", user_id)
+        if mes:
+            query = query.eq("mes", mes)
+        if tipo:
+            query = query.eq("tipo", tipo)
+        return query.order("fecha_transaccion", desc=True).limit(limit)
+
+    return select_with_archive(
+        "financial_records", build, include_archived,
+        order_by="fecha_transaccion", desc=True, limit=limit
+    )
 
 @app.delete("/api/financial/records/{record_id}")
 async def delete_financial_record(record_id: str, user_id: str = Depends(verify_token)):
     """Eliminar registro financiero"""
-    supabase_admin.table("financial_records").delete().eq("id", record_id).eq("user_id", user_id).execute()
+    response = supabase_admin.table("financial_records").delete().eq("id", record_id).eq("user_id", user_id).execute()
+    # Inexistente o ya archivado (el archivo es de solo lectura)
+    if not response.data:
+        raise HTTPException(404, "Registro no encontrado")
+    await notify_change(user_id, "financial_records", "delete", record_id)
     return {"message": "Registro eliminado"}
 
+def group_financial_records(records):
+    """Sumar montos por categoría para gastos, ingresos y deudas"""
+    gastos_por_categoria = {}
+    ingresos_por_categoria = {}
+    deudas_por_categoria = {}
+
+    for record in records:
+        cat_name = record.get("categoria_nombre") or "Sin categoría"
+        monto = float(record.get("monto", 0))
+
+        if record["tipo"] == "gasto":
+            gastos_por_categoria[cat_name] = gastos_por_categoria.get(cat_name, 0) + monto
+        elif record["tipo"] == "ingreso":
+            ingresos_por_categoria[cat_name] = ingresos_por_categoria.get(cat_name, 0) + monto
+        elif record["tipo"] == "deuda":
+            deudas_por_categoria[cat_name] = deudas_por_categoria.get(cat_name, 0) + monto
+
+    return {
+        "gastos_por_categoria": [{"categoria": k, "monto": v} for k, v in gastos_por_categoria.items()],
+        "ingresos_por_categoria": [{"categoria": k, "monto": v} for k, v in ingresos_por_categoria.items()],
+        "deudas_por_categoria": [{"categoria": k, "monto": v} for k, v in deudas_por_categoria.items()]
+    }
+
 @app.get("/api/financial/summary")
 async def get_financial_summary(user_id: str = Depends(verify_token), mes: Optional[str] = None):
     """Obtener resumen financiero del mes"""
     if not mes:
         mes = date.today().replace(day=1).isoformat()
 
+    # Sin registros en el mes la vista no tiene fila (maybe_single -> None)
     try:
         summary = supabase_admin.table("financial_monthly_summary") \
-            .select("*").eq("user_id", user_id).eq("mes", mes).single().execute()
+            .select("*").eq("user_id", user_id).eq("mes", mes).maybe_single().execute()
+    except APIError as e:
+        logger.warning("Resumen financiero no disponible", extra={"mes": mes, "error": e.message})
+        summary = None
+    if summary is not None:
         summary_data = summary.data
-    except:
+    else:
         summary_data = {
             "user_id": user_id,
             "mes": mes,
@@ -1316,37 +3515,1035 @@ async def get_financial_summary(user_id: str = Depends(verify_token), mes: Optio
             "tasa_ahorro": 0
         }
 
-    # Obtener desglose por categoría
-    records = supabase_admin.table("financial_records") \
-        .select("*").eq("user_id", user_id).eq("mes", mes).execute()
-
-    gastos_por_categoria = {}
-    ingresos_por_categoria = {}
-    deudas_por_categoria = {}
-
-    for record in records.data:
-        cat_name = record.get("categoria_nombre") or "Sin categoría"
-        monto = float(record.get("monto", 0))
-
-        if record["tipo"] == "gasto":
-            gastos_por_categoria[cat_name] = gastos_por_categoria.get(cat_name, 0) + monto
-        elif record["tipo"] == "ingreso":
-            ingresos_por_categoria[cat_name] = ingresos_por_categoria.get(cat_name, 0) + monto
-        elif record["tipo"] == "deuda":
-            deudas_por_categoria[cat_name] = deudas_por_categoria.get(cat_name, 0) + monto
-
-    summary_data["gastos_por_categoria"] = [{"categoria": k, "monto": v} for k, v in gastos_por_categoria.items()]
-    summary_data["ingresos_por_categoria"] = [{"categoria": k, "monto": v} for k, v in ingresos_por_categoria.items()]
-    summary_data["deudas_por_categoria"] = [{"categoria": k, "monto": v} for k, v in deudas_por_categoria.items()]
+    # Obtener desglose por categoría (los meses anteriores al horizonte
+    # pueden estar en el archivo)
+    records = select_with_archive(
+        "financial_records",
+        lambda table: table.select("*").eq("user_id", user_id).eq("mes", mes),
+        mes < archive_cutoff().isoformat()
+    )
 
+    summary_data.update(group_financial_records(records))
     return summary_data
 
 @app.post("/api/financial/initialize")
 async def initialize_financial_categories(user_id: str = Depends(verify_token)):
     """Inicializar categorías predeterminadas"""
     supabase_admin.rpc("create_default_financial_categories", {"p_user_id": user_id}).execute()
+    await notify_change(user_id, "financial_categories", "insert")
     return {"message": "Categorías inicializadas"}
 
+# ============================================
+# RUTAS - EXPORTACIÓN
+# ============================================
+
+# Tablas del usuario incluidas en la exportación (todas con id y user_id)
+EXPORT_TABLES = [
+    "user_config",
+    "monthly_plans",
+    "monthly_reviews",
+    "weekly_logs",
+    "daily_tasks",
+    "actividades",
+    "evidencias",
+    "financial_categories",
+    "financial_records",
+    "financial_monthly_summary",
+]
+
+class ZipStream:
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se lee"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def iter_table_pages(tabla: str, user_id: str):
+    """Recorrer las filas del usuario por páginas (keyset sobre id)
+
+    Las tablas con archivo (ARCHIVE_TABLES) incluyen después las filas
+    archivadas, sin las columnas propias del archivo: el ZIP se importa igual.
+    """
+    yield from iter_user_pages(tabla, user_id)
+    if tabla in ARCHIVE_TABLES:
+        try:
+            for rows in iter_user_pages(ARCHIVE_TABLES[tabla], user_id):
+                yield [
+                    {k: v for k, v in row.items() if k not in ("archivo_mes", "archived_at")}
+                    for row in rows
+                ]
+        except APIError as e:
+            logger.warning("Archivo no exportado (migración 012)", extra={"tabla": tabla, "error": e.message})
+
+def iter_user_pages(tabla: str, user_id: str, columns: str = "*", page_size: int = EXPORT_PAGE_SIZE):
+    """Filas del usuario en una tabla, por páginas (columns debe incluir id)"""
+    last_id = None
+    while True:
+        query = supabase_admin.table(tabla).select(columns).eq("user_id", user_id)
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(page_size).execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+def csv_value(value):
+    """Valor de celda CSV: listas y objetos como JSON"""
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode()
+    return value
+
+def evidencia_file_chunks(evidencia: dict):
+    """Contenido de un archivo de evidencia (local o en Supabase Storage)"""
+    filename = evidencia_filename(evidencia["archivo_url"], evidencia["user_id"])
+    if filename is None:
+        raise ValueError("Nombre de archivo de evidencia no válido")
+    local_path = UPLOAD_DIR / filename
+    if local_path.exists():
+        with open(local_path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+        return
+    yield supabase_admin.storage.from_(SUPABASE_BUCKET_NAME).download(filename)
+
+def evidencia_archive_name(evidencia: dict) -> str:
+    """Ruta del archivo de una evidencia dentro del ZIP de exportación"""
+    return f"evidencias/{evidencia['id']}_{safe_filename(evidencia.get('archivo_nombre'))}"
+
+def generate_export(user_id: str, formato: str, include_files: bool):
+    """Generar el ZIP de exportación por partes (una página de filas a la vez)"""
+    stream = ZipStream()
+    counts = {}
+
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for tabla in EXPORT_TABLES:
+            counts[tabla] = 0
+            with zf.open(f"{tabla}.{formato}", "w") as entry:
+                text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+                writer = None
+                for rows in iter_table_pages(tabla, user_id):
+                    if formato == "csv":
+                        if writer is None:
+                            writer = csv.DictWriter(text, fieldnames=list(rows[0].keys()), extrasaction="ignore")
+                            writer.writeheader()
+                        writer.writerows({k: csv_value(v) for k, v in row.items()} for row in rows)
+                    else:
+                        for row in rows:
+                            text.write(orjson.dumps(row).decode())
+                            text.write("\n")
+                    text.flush()
+                    counts[tabla] += len(rows)
+
+                    chunk = stream.drain()
+                    if chunk:
+                        yield chunk
+                text.detach()
+
+        # Segunda pasada por evidencias (solo una entrada del ZIP abierta a la
+        # vez): los archivos se escriben página a página
+        if include_files:
+            columns = "id, user_id, archivo_url, archivo_nombre"
+            for rows in iter_user_pages("evidencias", user_id, columns):
+                for evidencia in rows:
+                    try:
+                        chunks = evidencia_file_chunks(evidencia)
+                        first = next(chunks, b"")
+                        with zf.open(evidencia_archive_name(evidencia), "w") as entry:
+                            for data in itertools.chain([first], chunks):
+                                entry.write(data)
+                                chunk = stream.drain()
+                                if chunk:
+                                    yield chunk
+                    except Exception as e:
+                        logger.warning("Evidencia no exportada", extra={"evidencia_id": evidencia["id"], "error": str(e)})
+
+        zf.writestr("manifest.json", orjson.dumps({
+            "version": EXPORT_FORMAT_VERSION,
+            "formato": formato,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "user_id": user_id,
+            "tablas": counts,
+            "archivos": include_files
+        }, option=orjson.OPT_INDENT_2))
+
+    yield stream.drain()
+
+@app.get("/api/export")
+async def export_data(
+    user_id: str = Depends(verify_token),
+    formato: str = "ndjson",
+    include_files: bool = False
+):
+    """Descargar todo el historial del usuario como ZIP
+
+    Un archivo por tabla (`ndjson` o `csv`) más manifest.json; con
+    `include_files=true` se agregan los archivos de evidencias. Se genera
+    y envía por partes, sin cargar el historial completo en memoria.
+    """
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(400, "Formato inválido. Use 'ndjson' o 'csv'")
+
+    filename = f"pdp_export_{date.today().strftime('%Y%m%d')}.zip"
+    return StreamingResponse(
+        generate_export(user_id, formato, include_files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ============================================
+# RUTAS - IMPORTACIÓN
+# ============================================
+
+# Orden de importación (las referencias apuntan a tablas anteriores).
+# Clave natural: se usa como on_conflict y el id existente se conserva;
+# sin clave natural se conserva el id si la fila ya es de la cuenta y, si
+# no, el id nuevo es determinista (uuid5 del id original), así reimportar
+# el mismo archivo actualiza en lugar de duplicar.
+IMPORT_TABLES = [
+    # (tabla, modelo de validación, clave natural)
+    ("financial_categories", FinancialCategory, ("user_id", "nombre", "tipo")),
+    ("monthly_plans", MonthlyPlan, ("user_id", "mes")),
+    ("monthly_reviews", None, ("monthly_plan_id",)),
+    ("weekly_logs", WeeklyLog, ("user_id", "semana_inicio")),
+    ("daily_tasks", DailyTask, None),
+    ("actividades", Actividad, None),
+    ("financial_records", FinancialRecord, None),
+    ("evidencias", None, None),
+]
+
+# Columnas con ids de otras filas del archivo
+IMPORT_REFERENCES = {
+    "monthly_reviews": ["monthly_plan_id"],
+    "daily_tasks": ["parent_task_id"],
+    "financial_records": ["category_id"],
+    "evidencias": ["task_id"],
+}
+
+# Columnas que asigna la base de datos (periodo: columna generada de actividades)
+IMPORT_SYSTEM_COLUMNS = {"id", "user_id", "updated_at", "periodo"}
+
+IMPORT_NAMESPACE = uuid.UUID("6f1d3c1e-3b0a-4c7e-9a43-2d9b5f0e8a71")
+
+def import_id(user_id: str, old_id: str) -> str:
+    """Id nuevo (estable) para una fila importada"""
+    return str(uuid.uuid5(IMPORT_NAMESPACE, f"{user_id}:{old_id}"))
+
+def is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+def owned_ids(tabla: str, user_id: str, ids: List[str]) -> set:
+    """Ids de la lista que ya existen en la tabla para el usuario"""
+    ids = [i for i in ids if is_uuid(i)]
+    if not ids:
+        return set()
+    return {
+        r["id"] for r in supabase_admin.table(tabla)
+        .select("id").eq("user_id", user_id).in_("id", ids)
+        .execute().data
+    }
+
+def import_ids(tabla: str, user_id: str, old_ids: List[str]):
+    """Id con el que se escribe cada fila de un bloque sin clave natural
+
+    Si la fila ya existe en la cuenta (restaurar la propia exportación)
+    conserva su id y el upsert la actualiza; si no, el uuid5 estable, así
+    reimportar el mismo archivo nunca duplica. Nunca se reutiliza el id de
+    una fila de otro usuario. Devuelve (ids, ids ya archivados): las filas
+    que están en el archivo no se vuelven a escribir en la tabla activa.
+    """
+    existentes = owned_ids(tabla, user_id, old_ids)
+    archivados = set()
+    if tabla in ARCHIVE_TABLES:
+        archivados = owned_ids(ARCHIVE_TABLES[tabla], user_id, [i for i in old_ids if i not in existentes])
+    ids = {
+        old_id: old_id if old_id in existentes or old_id in archivados else import_id(user_id, old_id)
+        for old_id in old_ids
+    }
+    return ids, archivados
+
+def csv_cell(value: str):
+    """Valor de una celda CSV exportada: vacío = null, JSON para listas/objetos"""
+    if value == "":
+        return None
+    if value[:1] in ("[", "{"):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            pass
+    return value
+
+def iter_archive_rows(zf: zipfile.ZipFile, tabla: str, formato: str):
+    """Leer las filas de una tabla del archivo sin cargarlo completo"""
+    name = f"{tabla}.{formato}"
+    if name not in zf.namelist():
+        return
+    with zf.open(name) as entry:
+        text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+        if formato == "csv":
+            for row in csv.DictReader(text):
+                yield {k: csv_cell(v) for k, v in row.items()}
+        else:
+            for line in text:
+                if line.strip():
+                    yield orjson.loads(line)
+
+def import_payload(user_id: str, row: dict, model) -> dict:
+    """Validar una fila con su modelo y dejarla lista para insertar
+
+    Se conservan todas las columnas exportadas (completed_at, created_at...)
+    salvo las que asigna la base de datos; el modelo valida y normaliza las
+    que declara.
+    """
+    data = {k: v for k, v in row.items() if k not in IMPORT_SYSTEM_COLUMNS}
+    if model is not None:
+        data.update(model(**row).dict())
+
+    for key, value in data.items():
+        if isinstance(value, date):
+            data[key] = value.isoformat()
+
+    data["user_id"] = user_id
+    return data
+
+def restore_evidencia_file(zf: zipfile.ZipFile, user_id: str, row: dict, data: dict) -> Optional[str]:
+    """Volver a subir el archivo de una evidencia incluido en el archivo
+
+    archivo_url nunca se toma del archivo: solo se asigna con el nombre
+    generado aquí ({user_id}_...). Devuelve el motivo si no se restauró.
+    """
+    data.pop("archivo_url", None)
+    # Exportaciones anteriores usaban archivo_nombre sin normalizar
+    info = None
+    for name in (evidencia_archive_name(row), f"evidencias/{row.get('id')}_{row.get('archivo_nombre')}"):
+        try:
+            info = zf.getinfo(name)
+            break
+        except KeyError:
+            continue
+    if info is None:
+        return "archivo no incluido en el ZIP"
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    if info.file_size > max_bytes:
+        return f"archivo mayor de {MAX_FILE_SIZE_MB}MB"
+    with zf.open(info) as entry:
+        contents = entry.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        return f"archivo mayor de {MAX_FILE_SIZE_MB}MB"
+
+    data["archivo_nombre"] = safe_filename(row.get("archivo_nombre"))
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{user_id}_{timestamp}_{secrets.token_hex(4)}_{data['archivo_nombre']}"
+    (UPLOAD_DIR / filename).write_bytes(contents)
+    data["archivo_url"] = upload_to_storage(filename, contents, row.get("mime_type"))
+    return None
+
+def generate_import(archive_path: str, user_id: str):
+    """Importar el archivo por bloques y emitir el progreso como NDJSON"""
+    def progress(**kwargs) -> bytes:
+        return orjson.dumps(kwargs) + b"\n"
+
+    id_map = {}
+    totales = {}
+    errores = []
+
+    zf = None
+    try:
+        zf = zipfile.ZipFile(archive_path)
+        manifest = {}
+        if "manifest.json" in zf.namelist() and zf.getinfo("manifest.json").file_size <= 64 * 1024:
+            manifest = orjson.loads(zf.read("manifest.json"))
+        formato = manifest.get("formato", "ndjson") if isinstance(manifest, dict) else "ndjson"
+        if formato not in ("ndjson", "csv"):
+            formato = "ndjson"
+
+        # Configuración: se agregan los valores que falten
+        for config in iter_archive_rows(zf, "user_config", formato):
+            if not isinstance(config, dict):
+                continue
+            for campo in ("clasificaciones", "categorias"):
+                if config.get(campo):
+                    supabase_admin.rpc("user_config_array_patch", {
+                        "p_user_id": user_id,
+                        "p_campo": campo,
+                        "p_agregar": config[campo],
+                        "p_quitar": []
+                    }).execute()
+            yield progress(tabla="user_config", importadas=1)
+
+        for tabla, model, natural_key in IMPORT_TABLES:
+            stats = totales[tabla] = {"leidas": 0, "importadas": 0, "invalidas": 0}
+            references = IMPORT_REFERENCES.get(tabla, [])
+            chunk = []
+            pending = []  # subtareas cuya tarea padre aún no se ha importado
+
+            def flush():
+                if not chunk:
+                    return
+                try:
+                    if natural_key:
+                        key_of = lambda data: tuple(str(data[k]) for k in natural_key)
+                    else:
+                        new_ids, archivados = import_ids(tabla, user_id, [old_id for old_id, _ in chunk])
+                        for old_id, data in chunk:
+                            data["id"] = id_map[old_id] = new_ids[old_id]
+                        chunk[:] = [(old_id, data) for old_id, data in chunk if old_id not in archivados]
+                        key_of = lambda data: data["id"]
+
+                    # Un upsert no puede tocar dos veces la misma fila: gana la última
+                    payloads = list({key_of(data): data for _, data in chunk}.values())
+                    if not payloads:
+                        chunk.clear()
+                        return
+
+                    if natural_key:
+                        result = supabase_admin.table(tabla) \
+                            .upsert(payloads, on_conflict=",".join(natural_key)) \
+                            .execute()
+                        # La fila existente conserva su id: mapear por clave natural
+                        by_key = {key_of(r): r["id"] for r in result.data}
+                        for old_id, data in chunk:
+                            new_id = by_key.get(key_of(data))
+                            if new_id:
+                                id_map[old_id] = new_id
+                    else:
+                        supabase_admin.table(tabla).upsert(payloads, on_conflict="id").execute()
+                    stats["importadas"] += len(payloads)
+                except APIError as e:
+                    for old_id, _ in chunk:
+                        id_map.pop(old_id, None)
+                    if len(errores) < IMPORT_MAX_ERRORS:
+                        errores.append({"tabla": tabla, "filas": len(chunk), "error": e.message})
+                chunk.clear()
+
+            def add(row: dict, data: dict):
+                # El id definitivo (y id_map) se asigna en flush(), por bloque
+                chunk.append((row["id"], data))
+
+            for row in iter_archive_rows(zf, tabla, formato):
+                stats["leidas"] += 1
+                if not isinstance(row, dict) or not row.get("id"):
+                    stats["invalidas"] += 1
+                    if len(errores) < IMPORT_MAX_ERRORS:
+                        errores.append({"tabla": tabla, "error": "Fila sin formato de objeto o sin id"})
+                    continue
+                try:
+                    data = import_payload(user_id, row, model)
+                except ValidationError as e:
+                    stats["invalidas"] += 1
+                    if len(errores) < IMPORT_MAX_ERRORS:
+                        detalle = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                        errores.append({"tabla": tabla, "id": row.get("id"), "error": detalle})
+                    continue
+
+                if tabla == "evidencias":
+                    # Sin archivo restaurado la fila no se importa
+                    motivo = restore_evidencia_file(zf, user_id, row, data)
+                    if motivo:
+                        stats["invalidas"] += 1
+                        if len(errores) < IMPORT_MAX_ERRORS:
+                            errores.append({"tabla": tabla, "id": row.get("id"), "error": motivo})
+                        continue
+
+                deferred = False
+                for ref in references:
+                    old_ref = data.get(ref)
+                    if not old_ref:
+                        continue
+                    if old_ref in id_map:
+                        data[ref] = id_map[old_ref]
+                    elif ref == "parent_task_id":
+                        deferred = True
+                    else:
+                        data[ref] = None
+
+                if deferred:
+                    pending.append((row, data))
+                    continue
+
+                add(row, data)
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    flush()
+                    yield progress(tabla=tabla, **stats)
+
+            # Subtareas: se insertan cuando su tarea padre ya está escrita
+            flush()
+            while pending:
+                ready = [item for item in pending if item[1]["parent_task_id"] in id_map]
+                pending = [item for item in pending if item[1]["parent_task_id"] not in id_map]
+                if not ready:
+                    # Tarea padre ausente del archivo: quedan como tareas de primer nivel
+                    ready, pending = pending, []
+                    for _, data in ready:
+                        data["parent_task_id"] = None
+                for row, data in ready:
+                    if data["parent_task_id"]:
+                        data["parent_task_id"] = id_map[data["parent_task_id"]]
+                    add(row, data)
+                    if len(chunk) >= IMPORT_CHUNK_SIZE:
+                        flush()
+                flush()
+
+            flush()
+            yield progress(tabla=tabla, **stats)
+
+        yield progress(estado="completado", tablas=totales, errores=errores)
+    except (zipfile.BadZipFile, KeyError, orjson.JSONDecodeError, UnicodeDecodeError, csv.Error) as e:
+        yield progress(estado="error", error=f"Archivo inválido: {e}", tablas=totales, errores=errores)
+    except Exception:
+        # La respuesta ya empezó: el cliente solo ve el error en la última línea
+        logger.exception("Error al importar", extra={"user_id": user_id})
+        yield progress(estado="error", error="Error interno al importar", tablas=totales, errores=errores)
+    finally:
+        if zf is not None:
+            zf.close()
+        os.unlink(archive_path)
+
+def copy_limited(src, dst, max_bytes: int, chunk_size: int = 1024 * 1024) -> bool:
+    """Copiar por partes; False (sin terminar) si se supera max_bytes"""
+    total = 0
+    while chunk := src.read(chunk_size):
+        total += len(chunk)
+        if total > max_bytes:
+            return False
+        dst.write(chunk)
+    return True
+
+async def notify_import(user_id: str):
+    """Avisar a las pestañas abiertas que recarguen los datos importados"""
+    for tabla, _, _ in IMPORT_TABLES:
+        await notify_change(user_id, tabla, "insert")
+    await notify_change(user_id, "user_config", "update")
+
+@app.post("/api/import")
+async def import_data(archivo: UploadFile = File(...), user_id: str = Depends(verify_token)):
+    """Importar un ZIP generado por /api/export (restauración o migración)
+
+    Las filas se validan con los modelos de la API y se escriben con upserts
+    en bloque: conservan su id si ya existen en la cuenta y, si no, reciben
+    uno estable (con las referencias entre tablas reasignadas), así que
+    reimportar el mismo archivo no duplica. La respuesta es NDJSON: una línea de progreso por bloque y
+    una final con `estado`, totales por tabla y errores.
+    """
+    # Copiar a disco por partes: zipfile necesita un archivo con seek
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        archive_path = tmp.name
+        copied = await asyncio.to_thread(
+            copy_limited, archivo.file, tmp, IMPORT_MAX_SIZE_MB * 1024 * 1024
+        )
+
+    if not copied:
+        os.unlink(archive_path)
+        raise HTTPException(413, f"Archivo muy grande. Máximo {IMPORT_MAX_SIZE_MB}MB")
+    if not zipfile.is_zipfile(archive_path):
+        os.unlink(archive_path)
+        raise HTTPException(400, "El archivo debe ser un ZIP generado por /api/export")
+
+    return StreamingResponse(
+        generate_import(archive_path, user_id),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(notify_import, user_id)
+    )
+
+# ============================================
+# RUTAS - BÚSQUEDA
+# ============================================
+
+@app.get("/api/search")
+async def search_content(
+    q: str,
+    user_id: str = Depends(verify_token),
+    tipo: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20
+):
+    """Buscar en tareas, bitácoras, planes y actividades
+
+    Búsqueda en español sin distinguir acentos (índice GIN de search_documents),
+    ordenada por relevancia. `q` admite la sintaxis de websearch_to_tsquery:
+    "frase exacta", -excluir, OR. `tipo` filtra por una lista separada por comas.
+    """
+    q = q.strip()
+    if len(q) < SEARCH_MIN_QUERY_LENGTH:
+        raise HTTPException(400, f"La búsqueda debe tener al menos {SEARCH_MIN_QUERY_LENGTH} caracteres")
+
+    tipos = None
+    if tipo:
+        tipos = [t.strip() for t in tipo.split(",") if t.strip()]
+        invalidos = [t for t in tipos if t not in SEARCH_TIPOS]
+        if invalidos:
+            raise HTTPException(400, f"Tipo inválido: {', '.join(invalidos)}")
+
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), SEARCH_MAX_PAGE_SIZE)
+
+    result = supabase_admin.rpc("search_content", {
+        "p_user_id": user_id,
+        "p_query": q,
+        "p_tipos": tipos,
+        "p_limit": page_size,
+        "p_offset": (page - 1) * page_size
+    }).execute()
+
+    rows = result.data or []
+    total = rows[0]["total"] if rows else 0
+
+    return {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "results": [
+            {
+                "tipo": row["tipo"],
+                "id": row["entity_id"],
+                "titulo": row["titulo"],
+                "fecha": row["fecha"],
+                "rank": row["rank"],
+                "snippet": row["snippet"]
+            }
+            for row in rows
+        ]
+    }
+
+# ============================================
+# RUTAS - SINCRONIZACIÓN INCREMENTAL
+# ============================================
+
+# Tablas que el dashboard descarga al cargar (todas con user_id y updated_at)
+SYNC_TABLES = [
+    "daily_tasks",
+    "weekly_logs",
+    "monthly_plans",
+    "user_config",
+    "financial_categories",
+    "financial_records",
+    "financial_monthly_summary",
+]
+
+def parse_sync_cursor(cursor: str) -> datetime:
+    """Convertir el cursor (timestamp ISO 8601) a datetime con zona horaria"""
+    try:
+        value = datetime.fromisoformat(cursor.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(400, "Cursor inválido")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def iter_changed_pages(build, column: str, desde: Optional[str], page_size: int = SYNC_PAGE_SIZE):
+    """Filas con column >= desde, por páginas con keyset sobre (column, id)
+
+    Ninguna consulta supera page_size, así que el max-rows de PostgREST no
+    puede truncar la respuesta. Los empates de timestamp (lotes escritos en
+    una misma transacción) se recorren por id antes de avanzar.
+    build() devuelve una consulta nueva ya filtrada por usuario.
+    """
+    if desde is None:
+        # Filas sin timestamp: sólo pueden aparecer en la descarga completa
+        query = build().is_(column, "null").order("id")
+        while True:
+            rows = query.limit(page_size).execute().data
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                break
+            query = build().is_(column, "null").gt("id", rows[-1]["id"]).order("id")
+
+    query = build().gte(column, desde) if desde else build().gt(column, "-infinity")
+    query = query.order(column).order("id")
+    last_ts, ties = None, False
+    while True:
+        rows = query.limit(page_size).execute().data
+        if rows:
+            yield rows
+        if len(rows) == page_size:
+            # Página llena: seguir por los empates del último timestamp...
+            last_ts = rows[-1][column]
+            query = build().eq(column, last_ts).gt("id", rows[-1]["id"]).order("id")
+            ties = True
+        elif ties:
+            # ...y después por los timestamps siguientes
+            query = build().gt(column, last_ts).order(column).order("id")
+            ties = False
+        else:
+            return
+
+@app.get("/api/sync")
+async def sync_changes(user_id: str = Depends(verify_token), since: Optional[str] = None):
+    """Obtener filas insertadas/actualizadas/eliminadas desde el cursor
+
+    Sin `since` (o con un cursor más antiguo que la retención de eliminaciones)
+    devuelve todo y `full=true`: el cliente debe reemplazar su estado local.
+    El cursor devuelto se envía en la siguiente llamada.
+    """
+    since_dt = parse_sync_cursor(since) if since else None
+    full = since_dt is None or \
+        since_dt < datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+
+    desde = None if full else (since_dt - timedelta(seconds=SYNC_CURSOR_OVERLAP_SECONDS)).isoformat()
+    cursor = since_dt
+    changes = {}
+
+    for tabla in SYNC_TABLES:
+        build = lambda: supabase_admin.table(tabla).select("*").eq("user_id", user_id)
+        rows = changes[tabla] = []
+        for page in iter_changed_pages(build, "updated_at", desde):
+            rows.extend(page)
+
+        for row in rows:
+            if row.get("updated_at"):
+                updated_at = parse_sync_cursor(row["updated_at"])
+                if cursor is None or updated_at > cursor:
+                    cursor = updated_at
+
+    deleted = {}
+    if not full:
+        build = lambda: supabase_admin.table("sync_deletions") \
+            .select("id, tabla, row_id, deleted_at") \
+            .eq("user_id", user_id)
+
+        for page in iter_changed_pages(build, "deleted_at", desde):
+            for tombstone in page:
+                deleted.setdefault(tombstone["tabla"], []).append(tombstone["row_id"])
+                deleted_at = parse_sync_cursor(tombstone["deleted_at"])
+                if deleted_at > cursor:
+                    cursor = deleted_at
+
+    if cursor is None:
+        # Usuario sin datos: el próximo cursor es ahora
+        cursor = datetime.now(timezone.utc)
+
+    return {
+        "cursor": cursor.isoformat(),
+        "full": full,
+        "changes": changes,
+        "deleted": deleted
+    }
+
+# ============================================
+# RUTAS - EVENTOS EN TIEMPO REAL (SSE)
+# ============================================
+
+@app.get("/api/events")
+async def stream_events(request: Request, user_id: str = Depends(verify_stream_token)):
+    """Canal Server-Sent Events con notificaciones de cambios del usuario
+
+    Los eventos `change` indican tabla, acción e id; el cliente pide los datos
+    con /api/sync. Un evento `resync` indica que se perdieron eventos.
+    """
+    queue = change_broker.subscribe(user_id)
+
+    # Si el cliente se desconecta antes de la primera iteración el generador
+    # nunca arranca y su finally no se ejecuta: la tarea de fondo libera la cola
+    async def event_stream():
+        try:
+            yield f"retry: {SSE_HEARTBEAT_SECONDS * 1000}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Heartbeat: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['tipo']}\ndata: {orjson.dumps(event).decode()}\n\n"
+        finally:
+            change_broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(change_broker.unsubscribe, user_id, queue)
+    )
+
+# ============================================
+# RUTAS - CALENDARIO (ICS)
+# ============================================
+
+# Tablas publicadas en el feed (nombre de la categoría del evento)
+CALENDAR_TABLES = {"daily_tasks": "Tarea", "actividades": "Actividad"}
+CALENDAR_COLUMNS = "id, titulo, descripcion, fecha_inicio, fecha_fin, estado, clasificacion, updated_at"
+
+def ics_escape(text: str) -> str:
+    """Escapar texto para una propiedad iCalendar (RFC 5545)"""
+    # Un CR suelto terminaría la línea de contenido: todo salto pasa a \n
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_fold(line: str) -> str:
+    """Partir una línea en segmentos de 75 octetos como máximo"""
+    parts = []
+    current = ""
+    for char in line:
+        if len((current + char).encode("utf-8")) > 75:
+            parts.append(current)
+            current = " "
+        current += char
+    parts.append(current)
+    return "\r\n".join(parts)
+
+def render_vevent(tabla: str, row: dict) -> Optional[str]:
+    """VEVENT de todo el día para una tarea o actividad"""
+    if not row.get("fecha_inicio"):
+        return None
+
+    inicio = date.fromisoformat(row["fecha_inicio"][:10])
+    fin = date.fromisoformat((row.get("fecha_fin") or row["fecha_inicio"])[:10])
+    stamp = parse_sync_cursor(row["updated_at"]) if row.get("updated_at") else datetime.now(timezone.utc)
+
+    categorias = [CALENDAR_TABLES[tabla]]
+    if row.get("clasificacion"):
+        categorias.append(row["clasificacion"])
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{tabla}-{row['id']}@pdp",
+        f"DTSTAMP:{stamp.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}",
+        f"DTSTART;VALUE=DATE:{inicio:%Y%m%d}",
+        # DTEND es exclusivo en eventos de día completo
+        f"DTEND;VALUE=DATE:{max(fin, inicio) + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{ics_escape(row.get('titulo') or '')}",
+        f"CATEGORIES:{','.join(ics_escape(c) for c in categorias)}",
+        f"STATUS:{'CANCELLED' if row.get('estado') == 'cancelada' else 'CONFIRMED'}",
+    ]
+    if row.get("descripcion"):
+        lines.append(f"DESCRIPTION:{ics_escape(row['descripcion'])}")
+    lines.append("END:VEVENT")
+    return "\r\n".join(ics_fold(line) for line in lines)
+
+class CalendarFeed:
+    """Feed .ics de un usuario: un VEVENT cacheado por fila y el cursor de cambios"""
+
+    def __init__(self):
+        self.events = {}  # (tabla, id) -> VEVENT
+        self.cursor = None
+        self.checked_at = 0.0
+        self.body = b""
+        self.etag = ""
+
+    def refresh(self, user_id: str):
+        """Volver a renderizar solo las filas con updated_at posterior al cursor"""
+        if self.cursor and time.monotonic() - self.checked_at < CALENDAR_REFRESH_SECONDS:
+            return
+
+        full = self.cursor is None or \
+            self.cursor < datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+        if full:
+            self.events = {}
+        desde = None if full else (self.cursor - timedelta(seconds=SYNC_CURSOR_OVERLAP_SECONDS)).isoformat()
+        cursor = None if full else self.cursor
+        changed = full
+
+        for tabla in CALENDAR_TABLES:
+            build = lambda: supabase_admin.table(tabla).select(CALENDAR_COLUMNS).eq("user_id", user_id)
+
+            for row in itertools.chain.from_iterable(iter_changed_pages(build, "updated_at", desde)):
+                key = (tabla, row["id"])
+                vevent = render_vevent(tabla, row)
+                if self.events.get(key) != vevent:
+                    changed = True
+                    if vevent:
+                        self.events[key] = vevent
+                    else:
+                        self.events.pop(key, None)
+                if row.get("updated_at"):
+                    updated_at = parse_sync_cursor(row["updated_at"])
+                    if cursor is None or updated_at > cursor:
+                        cursor = updated_at
+
+        if desde:
+            build = lambda: supabase_admin.table("sync_deletions") \
+                .select("id, tabla, row_id, deleted_at") \
+                .eq("user_id", user_id) \
+                .in_("tabla", list(CALENDAR_TABLES))
+
+            for tombstone in itertools.chain.from_iterable(iter_changed_pages(build, "deleted_at", desde)):
+                if self.events.pop((tombstone["tabla"], tombstone["row_id"]), None):
+                    changed = True
+                deleted_at = parse_sync_cursor(tombstone["deleted_at"])
+                if deleted_at > cursor:
+                    cursor = deleted_at
+
+        if changed:
+            body = "\r\n".join([
+                "BEGIN:VCALENDAR",
+                "VERSION:2.0",
+                "PRODID:-//Plan de Desarrollo Profesional//ES",
+                "CALSCALE:GREGORIAN",
+                "X-WR-CALNAME:Plan de Desarrollo Profesional",
+                f"REFRESH-INTERVAL;VALUE=DURATION:PT{max(CALENDAR_REFRESH_SECONDS // 60, 1)}M",
+                *(self.events[key] for key in sorted(self.events)),
+                "END:VCALENDAR",
+            ]) + "\r\n"
+            self.body = body.encode("utf-8")
+            self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+
+        self.cursor = cursor or datetime.now(timezone.utc)
+        self.checked_at = time.monotonic()
+
+class CalendarFeedCache:
+    """Feeds por usuario (LRU) y tokens ya resueltos"""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self.feeds = OrderedDict()
+        self.tokens = {}  # token -> (user_id, expira)
+
+    def resolve_token(self, token: str) -> Optional[str]:
+        """user_id dueño del token (None si no existe)"""
+        cached = self.tokens.get(token)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        response = supabase_admin.table("user_config") \
+            .select("user_id") \
+            .eq("calendar_token", token) \
+            .limit(1) \
+            .execute()
+
+        if not response.data:
+            self.tokens.pop(token, None)
+            return None
+
+        user_id = response.data[0]["user_id"]
+        self.tokens[token] = (user_id, time.monotonic() + CALENDAR_REFRESH_SECONDS)
+        return user_id
+
+    def forget_token(self, token: Optional[str]):
+        """Olvidar un token rotado (solo en este worker; ver on_change)"""
+        self.tokens.pop(token, None)
+
+    def on_change(self, user_id: str, event: dict):
+        """Olvidar los tokens del usuario cuando cambia user_config
+
+        Llega desde cualquier worker con EVENTS_BROKER_URL; sin broker, los
+        demás workers siguen aceptando el token rotado hasta que caduca su
+        entrada (CALENDAR_REFRESH_SECONDS).
+        """
+        if event.get("tabla") == "user_config":
+            for token in [t for t, (owner, _) in self.tokens.items() if owner == user_id]:
+                self.tokens.pop(token, None)
+
+    def get(self, user_id: str) -> CalendarFeed:
+        """Feed actualizado del usuario"""
+        feed = self.feeds.pop(user_id, None) or CalendarFeed()
+        self.feeds[user_id] = feed
+        while len(self.feeds) > self.max_users:
+            self.feeds.popitem(last=False)
+        feed.refresh(user_id)
+        return feed
+
+calendar_feeds = CalendarFeedCache(CALENDAR_CACHE_MAX_USERS)
+change_broker.on_change(calendar_feeds.on_change)
+
+def calendar_feed_url(request: Request, token: str) -> str:
+    """URL pública del feed para suscribirse desde un cliente de calendario"""
+    return f"{str(request.base_url).rstrip('/')}/calendar/{token}.ics"
+
+@app.get("/api/calendar/feed")
+async def get_calendar_feed(request: Request, user_id: str = Depends(verify_token)):
+    """Obtener (y crear la primera vez) la URL del feed .ics del usuario"""
+    config = await get_user_config(user_id)
+    token = config.get("calendar_token")
+
+    if not token:
+        # Solo se asigna si sigue vacío: dos peticiones a la vez obtienen el mismo token
+        response = supabase_admin.table("user_config") \
+            .update({"calendar_token": secrets.token_urlsafe(32)}) \
+            .eq("user_id", user_id) \
+            .is_("calendar_token", "null") \
+            .execute()
+
+        if response.data:
+            token = response.data[0]["calendar_token"]
+        else:
+            token = (await get_user_config(user_id))["calendar_token"]
+
+    return {"url": calendar_feed_url(request, token)}
+
+@app.post("/api/calendar/feed/rotate")
+async def rotate_calendar_feed(request: Request, user_id: str = Depends(verify_token)):
+    """Generar un token nuevo: la URL anterior deja de funcionar"""
+    config = await get_user_config(user_id)
+    token = secrets.token_urlsafe(32)
+
+    supabase_admin.table("user_config") \
+        .update({"calendar_token": token}) \
+        .eq("user_id", user_id) \
+        .execute()
+
+    calendar_feeds.forget_token(config.get("calendar_token"))
+    await notify_change(user_id, "user_config", "update")
+    return {"url": calendar_feed_url(request, token)}
+
+@app.get("/calendar/{token}.ics")
+async def calendar_feed(token: str, if_none_match: Optional[str] = Header(None)):
+    """Feed iCalendar de tareas y actividades (sin sesión: el token es la credencial)"""
+    user_id = calendar_feeds.resolve_token(token)
+    if not user_id:
+        raise HTTPException(404, "Calendario no encontrado")
+
+    feed = calendar_feeds.get(user_id)
+    headers = {
+        "ETag": feed.etag,
+        "Cache-Control": f"private, max-age={CALENDAR_REFRESH_SECONDS}"
+    }
+
+    if if_none_match and feed.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(feed.body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+# ============================================
+# RUTAS - PERFILADO
+# ============================================
+
+def verify_profiling_access(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Mismo criterio que ProfilingMiddleware: fuera de producción o email admin"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(404, "Not Found")
+    decode_access_token(credentials.credentials)
+    if not profiling_allowed({b"authorization": f"Bearer {credentials.credentials}".encode()}):
+        raise HTTPException(403, "Perfilado no permitido")
+
+@app.get("/api/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, formato: str = "pstats", _: None = Depends(verify_profiling_access)):
+    """Descargar un perfil (`pstats`) o ver las funciones más costosas (`texto`)"""
+    if not profile_id.replace("_", "").isalnum():
+        raise HTTPException(400, "Id de perfil inválido")
+
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    if not path.exists():
+        raise HTTPException(404, "Perfil no encontrado")
+
+    if formato == "texto":
+        output = io.StringIO()
+        stats = pstats.Stats(str(path), stream=output)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(40)
+        return Response(output.getvalue(), media_type="text/plain; charset=utf-8")
+
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
 # ============================================
 # RUTAS - PÁGINAS HTML
 # ============================================
@@ -1354,32 +4551,32 @@ async def initialize_financial_categories(user_id: str = Depends(verify_token)):
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Página principal - redireccionar a login o dashboard"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return page_cache.response(request, "index.html")
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Página de login"""
-    return templates.TemplateResponse("login.html", {"request": request})
+    return page_cache.response(request, "login.html")
 
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard_page(request: Request):
     """Página del dashboard"""
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+    return page_cache.response(request, "dashboard.html")
 
 @app.get("/tasks", response_class=HTMLResponse)
 async def tasks_page(request: Request):
     """Página de tareas"""
-    return templates.TemplateResponse("tasks.html", {"request": request})
+    return page_cache.response(request, "tasks.html")
 
 @app.get("/monthly", response_class=HTMLResponse)
 async def monthly_page(request: Request):
     """Página de planes mensuales"""
-    return templates.TemplateResponse("monthly.html", {"request": request})
+    return page_cache.response(request, "monthly.html")
 
 @app.get("/weekly", response_class=HTMLResponse)
 async def weekly_page(request: Request):
     """Página de bitácoras semanales"""
-    return templates.TemplateResponse("weekly.html", {"request": request})
+    return page_cache.response(request, "weekly.html")
 
 # ============================================
 # HEALTH CHECK
@@ -0,0 +1,134 @@
+-- ================================================
+-- COMPETENCIAS PROGRESS - Migration 003
+-- Date: 2026-10-19
+-- Purpose: Precomputed per-user, per-competencia monthly progress series
+--          so /api/monthly/evolution?source=series is a single range scan
+-- ================================================
+
+-- ================================================
+-- TABLE: COMPETENCIAS PROGRESS
+-- ================================================
+CREATE TABLE IF NOT EXISTS competencias_progress (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    mes DATE NOT NULL,
+    competencia VARCHAR(100) NOT NULL,
+    monthly_plan_id UUID REFERENCES monthly_plans(id) ON DELETE CASCADE NOT NULL,
+
+    progreso_inicio INT DEFAULT 0,
+    progreso_actual INT DEFAULT 0,
+    progreso_fin INT,
+
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (user_id, mes, competencia)
+);
+
+-- (user_id, mes) cubre el rango de meses; este índice cubre la serie de una competencia
+CREATE INDEX IF NOT EXISTS idx_competencias_progress_serie
+    ON competencias_progress(user_id, competencia, mes);
+CREATE INDEX IF NOT EXISTS idx_competencias_progress_plan
+    ON competencias_progress(monthly_plan_id);
+
+-- ================================================
+-- FUNCTION: PROGRESO COMO ENTERO
+-- ================================================
+-- monthly_plans.competencias es JSON libre: '50.5' se redondea y '', 'abc'
+-- o valores fuera de rango quedan en NULL en lugar de abortar la escritura
+-- del plan
+CREATE OR REPLACE FUNCTION progreso_int(p_valor TEXT)
+RETURNS INT AS $$
+BEGIN
+    IF p_valor IS NULL OR btrim(p_valor) !~ '^-?[0-9]+(\.[0-9]+)?$' THEN
+        RETURN NULL;
+    END IF;
+    RETURN round(btrim(p_valor)::NUMERIC)::INT;
+EXCEPTION
+    WHEN numeric_value_out_of_range THEN
+        RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- ================================================
+-- TRIGGER: SYNC FROM monthly_plans.competencias
+-- ================================================
+-- Con nombres repetidos en el plan gana la última entrada (DISTINCT ON):
+-- un ON CONFLICT no puede actualizar dos veces la misma fila
+CREATE OR REPLACE FUNCTION sync_competencias_progress()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM competencias_progress WHERE monthly_plan_id = NEW.id;
+
+    IF NEW.competencias IS NULL OR jsonb_typeof(NEW.competencias) <> 'array' THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO competencias_progress (
+        user_id, mes, competencia, monthly_plan_id,
+        progreso_inicio, progreso_actual, progreso_fin
+    )
+    SELECT DISTINCT ON (left(comp->>'nombre', 100))
+        NEW.user_id,
+        NEW.mes,
+        left(comp->>'nombre', 100),
+        NEW.id,
+        COALESCE(progreso_int(comp->>'progreso_inicio'), 0),
+        COALESCE(progreso_int(comp->>'progreso_actual'), 0),
+        progreso_int(comp->>'progreso_fin')
+    FROM jsonb_array_elements(NEW.competencias) WITH ORDINALITY AS elem(comp, posicion)
+    WHERE COALESCE(comp->>'nombre', '') <> ''
+    ORDER BY left(comp->>'nombre', 100), posicion DESC
+    ON CONFLICT (user_id, mes, competencia) DO UPDATE SET
+        monthly_plan_id = EXCLUDED.monthly_plan_id,
+        progreso_inicio = EXCLUDED.progreso_inicio,
+        progreso_actual = EXCLUDED.progreso_actual,
+        progreso_fin = EXCLUDED.progreso_fin,
+        updated_at = NOW();
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- create_monthly_plan, update_monthly_plan y update_competencias_progress
+-- mantienen la serie sin round-trips adicionales desde la API
+DROP TRIGGER IF EXISTS sync_competencias_progress_on_plan_change ON monthly_plans;
+CREATE TRIGGER sync_competencias_progress_on_plan_change
+    AFTER INSERT OR UPDATE OF competencias, mes ON monthly_plans
+    FOR EACH ROW EXECUTE FUNCTION sync_competencias_progress();
+
+-- ================================================
+-- BACKFILL
+-- ================================================
+INSERT INTO competencias_progress (
+    user_id, mes, competencia, monthly_plan_id,
+    progreso_inicio, progreso_actual, progreso_fin
+)
+SELECT DISTINCT ON (mp.user_id, mp.mes, left(comp->>'nombre', 100))
+    mp.user_id,
+    mp.mes,
+    left(comp->>'nombre', 100),
+    mp.id,
+    COALESCE(progreso_int(comp->>'progreso_inicio'), 0),
+    COALESCE(progreso_int(comp->>'progreso_actual'), 0),
+    progreso_int(comp->>'progreso_fin')
+FROM monthly_plans mp
+CROSS JOIN LATERAL jsonb_array_elements(mp.competencias) WITH ORDINALITY AS elem(comp, posicion)
+WHERE jsonb_typeof(mp.competencias) = 'array'
+  AND COALESCE(comp->>'nombre', '') <> ''
+ORDER BY mp.user_id, mp.mes, left(comp->>'nombre', 100), posicion DESC
+ON CONFLICT (user_id, mes, competencia) DO NOTHING;
+
+-- ================================================
+-- ROW LEVEL SECURITY
+-- ================================================
+ALTER TABLE competencias_progress ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own competencias_progress" ON competencias_progress;
+CREATE POLICY "Users can view own competencias_progress" ON competencias_progress
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 003_competencias_progress completada exitosamente' AS status;
+
+SELECT 'competencias_progress' as tabla, COUNT(*) as registros FROM competencias_progress;
@@ -0,0 +1,45 @@
+-- ================================================
+-- UPSERT CONSTRAINTS - Migration 004
+-- Date: 2026-10-19
+-- Purpose: Unique constraint required by the atomic upserts of
+--          POST /api/monthly/plans and GET/PUT /api/config
+-- ================================================
+
+-- ================================================
+-- TABLE: USER CONFIG
+-- ================================================
+CREATE TABLE IF NOT EXISTS user_config (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    clasificaciones TEXT[] DEFAULT ARRAY[
+        'desarrollo', 'investigacion', 'documentacion', 'reunion',
+        'estudio', 'revision', 'planificacion', 'testing'
+    ],
+    categorias TEXT[] DEFAULT ARRAY[
+        'aprendizaje', 'compromiso', 'competencia', 'personal'
+    ],
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Eliminar configuraciones duplicadas creadas por la carrera select-then-insert
+-- (se conserva una sola fila por usuario)
+DELETE FROM user_config a
+USING user_config b
+WHERE a.user_id = b.user_id
+  AND a.ctid < b.ctid;
+
+-- ON CONFLICT (user_id) necesita un índice único
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_config_user_unique ON user_config(user_id);
+
+-- monthly_plans ya tiene UNIQUE(user_id, mes) desde database_setup.sql,
+-- que es el destino de ON CONFLICT (user_id, mes)
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 004_upsert_constraints completada exitosamente' AS status;
+
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename IN ('user_config', 'monthly_plans');
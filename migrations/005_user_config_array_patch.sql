@@ -0,0 +1,69 @@
+-- ================================================
+-- USER CONFIG ARRAY PATCH - Migration 005
+-- Date: 2026-10-19
+-- Purpose: Atomic append-if-absent / remove for user_config.clasificaciones
+--          and user_config.categorias (one round-trip, no lost updates)
+-- Requires: 004_upsert_constraints.sql (unique index on user_config.user_id)
+-- ================================================
+
+-- ================================================
+-- FUNCTION: PATCH CONFIG ARRAY
+-- ================================================
+CREATE OR REPLACE FUNCTION user_config_array_patch(
+    p_user_id UUID,
+    p_campo TEXT,
+    p_agregar TEXT[] DEFAULT '{}',
+    p_quitar TEXT[] DEFAULT '{}'
+)
+RETURNS TABLE (valores TEXT[], agregados TEXT[], eliminados TEXT[]) AS $$
+DECLARE
+    v_valores TEXT[];
+    v_agregados TEXT[] := '{}';
+    v_eliminados TEXT[] := '{}';
+    v_valor TEXT;
+BEGIN
+    -- Solo columnas conocidas (el nombre se usa en SQL dinámico)
+    IF p_campo NOT IN ('clasificaciones', 'categorias') THEN
+        RAISE EXCEPTION 'Campo no permitido: %', p_campo;
+    END IF;
+
+    -- Crear la configuración con los valores por defecto si no existe
+    INSERT INTO user_config (user_id) VALUES (p_user_id)
+    ON CONFLICT (user_id) DO NOTHING;
+
+    -- Bloquear la fila: dos pestañas agregando a la vez se serializan aquí
+    EXECUTE format('SELECT %I FROM user_config WHERE user_id = $1 FOR UPDATE', p_campo)
+        INTO v_valores
+        USING p_user_id;
+
+    v_valores := COALESCE(v_valores, '{}');
+
+    FOREACH v_valor IN ARRAY COALESCE(p_quitar, '{}') LOOP
+        IF v_valor = ANY(v_valores) THEN
+            v_valores := array_remove(v_valores, v_valor);
+            v_eliminados := array_append(v_eliminados, v_valor);
+        END IF;
+    END LOOP;
+
+    FOREACH v_valor IN ARRAY COALESCE(p_agregar, '{}') LOOP
+        IF NOT (v_valor = ANY(v_valores)) THEN
+            v_valores := array_append(v_valores, v_valor);
+            v_agregados := array_append(v_agregados, v_valor);
+        END IF;
+    END LOOP;
+
+    IF cardinality(v_agregados) > 0 OR cardinality(v_eliminados) > 0 THEN
+        EXECUTE format('UPDATE user_config SET %I = $1 WHERE user_id = $2', p_campo)
+            USING v_valores, p_user_id;
+    END IF;
+
+    RETURN QUERY SELECT v_valores, v_agregados, v_eliminados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 005_user_config_array_patch completada exitosamente' AS status;
+
+SELECT proname FROM pg_proc WHERE proname = 'user_config_array_patch';
@@ -0,0 +1,111 @@
+-- ================================================
+-- DELTA SYNC - Migration 006
+-- Date: 2026-10-19
+-- Purpose: updated_at indexes and a deletions log (tombstones) so
+--          GET /api/sync?since=<cursor> returns only what changed
+-- ================================================
+
+-- ================================================
+-- updated_at EN TODAS LAS TABLAS SINCRONIZADAS
+-- ================================================
+-- user_config no tenía updated_at en algunas instalaciones
+ALTER TABLE user_config ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS update_user_config_updated_at ON user_config;
+CREATE TRIGGER update_user_config_updated_at
+    BEFORE UPDATE ON user_config
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- ================================================
+-- ÍNDICES (user_id, updated_at)
+-- ================================================
+CREATE INDEX IF NOT EXISTS idx_daily_tasks_user_updated ON daily_tasks(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_weekly_logs_user_updated ON weekly_logs(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_monthly_plans_user_updated ON monthly_plans(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_user_config_user_updated ON user_config(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_financial_categories_user_updated ON financial_categories(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_financial_records_user_updated ON financial_records(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_financial_summary_user_updated ON financial_monthly_summary(user_id, updated_at);
+
+-- ================================================
+-- TABLE: SYNC DELETIONS (TOMBSTONES)
+-- ================================================
+CREATE TABLE IF NOT EXISTS sync_deletions (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    tabla VARCHAR(50) NOT NULL,
+    row_id UUID NOT NULL,
+    deleted_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_deletions_user_deleted ON sync_deletions(user_id, deleted_at);
+
+CREATE OR REPLACE FUNCTION log_sync_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_deletions (user_id, tabla, row_id)
+    VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS log_deletion_daily_tasks ON daily_tasks;
+CREATE TRIGGER log_deletion_daily_tasks
+    AFTER DELETE ON daily_tasks
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_weekly_logs ON weekly_logs;
+CREATE TRIGGER log_deletion_weekly_logs
+    AFTER DELETE ON weekly_logs
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_monthly_plans ON monthly_plans;
+CREATE TRIGGER log_deletion_monthly_plans
+    AFTER DELETE ON monthly_plans
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_financial_categories ON financial_categories;
+CREATE TRIGGER log_deletion_financial_categories
+    AFTER DELETE ON financial_categories
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_financial_records ON financial_records;
+CREATE TRIGGER log_deletion_financial_records
+    AFTER DELETE ON financial_records
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+-- ================================================
+-- FUNCTION: PURGE OLD TOMBSTONES
+-- ================================================
+-- Los clientes con un cursor más antiguo que la retención reciben una
+-- sincronización completa (SYNC_TOMBSTONE_RETENTION_DAYS en main.py).
+-- Programar con pg_cron, por ejemplo:
+--   SELECT cron.schedule('purge-sync-deletions', '0 3 * * *',
+--                        $$SELECT purge_sync_deletions(30)$$);
+CREATE OR REPLACE FUNCTION purge_sync_deletions(p_retention_days INT DEFAULT 30)
+RETURNS BIGINT AS $$
+DECLARE
+    v_deleted BIGINT;
+BEGIN
+    DELETE FROM sync_deletions
+    WHERE deleted_at < NOW() - make_interval(days => p_retention_days);
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- ROW LEVEL SECURITY
+-- ================================================
+ALTER TABLE sync_deletions ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own sync_deletions" ON sync_deletions;
+CREATE POLICY "Users can view own sync_deletions" ON sync_deletions
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 006_delta_sync completada exitosamente' AS status;
+
+SELECT 'sync_deletions' as tabla, COUNT(*) as registros FROM sync_deletions;
@@ -0,0 +1,304 @@
+-- ================================================
+-- FULL-TEXT SEARCH - Migration 007
+-- Date: 2026-10-19
+-- Purpose: Ranked, accent-insensitive Spanish search across tasks, weekly
+--          logs, monthly plans and actividades for GET /api/search
+-- ================================================
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- ================================================
+-- TEXT SEARCH CONFIGURATION: español sin acentos
+-- ================================================
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+
+-- ================================================
+-- TABLE: SEARCH DOCUMENTS
+-- ================================================
+-- Un documento por fila buscable. Se mantiene con triggers en las tablas
+-- origen, así el backfill no modifica esas tablas (ni su updated_at).
+CREATE TABLE IF NOT EXISTS search_documents (
+    tipo VARCHAR(20) NOT NULL, -- 'tarea', 'bitacora', 'plan', 'actividad'
+    entity_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    titulo TEXT,
+    fecha DATE,
+    contenido TEXT,
+    search_vector TSVECTOR NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    PRIMARY KEY (tipo, entity_id)
+);
+
+-- btree_gin permite filtrar por usuario y texto con un solo índice GIN
+CREATE INDEX IF NOT EXISTS idx_search_documents_user_vector
+    ON search_documents USING GIN (user_id, search_vector);
+
+-- ================================================
+-- FUNCTION: UPSERT SEARCH DOCUMENT
+-- ================================================
+-- p_texto_a pesa más en el ranking (títulos, objetivos) que p_texto_b
+CREATE OR REPLACE FUNCTION upsert_search_document(
+    p_tipo TEXT,
+    p_entity_id UUID,
+    p_user_id UUID,
+    p_titulo TEXT,
+    p_fecha DATE,
+    p_texto_a TEXT,
+    p_texto_b TEXT
+)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO search_documents (tipo, entity_id, user_id, titulo, fecha, contenido, search_vector, updated_at)
+    VALUES (
+        p_tipo,
+        p_entity_id,
+        p_user_id,
+        p_titulo,
+        p_fecha,
+        concat_ws(' ', p_texto_a, p_texto_b),
+        setweight(to_tsvector('es_unaccent', COALESCE(p_texto_a, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', COALESCE(p_texto_b, '')), 'B'),
+        NOW()
+    )
+    ON CONFLICT (tipo, entity_id) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        titulo = EXCLUDED.titulo,
+        fecha = EXCLUDED.fecha,
+        contenido = EXCLUDED.contenido,
+        search_vector = EXCLUDED.search_vector,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- INDEX FUNCTIONS (una por tabla origen)
+-- ================================================
+CREATE OR REPLACE FUNCTION search_index_daily_task(t daily_tasks)
+RETURNS void AS $$
+BEGIN
+    PERFORM upsert_search_document(
+        'tarea', t.id, t.user_id, t.titulo, t.fecha_inicio,
+        t.titulo,
+        concat_ws(' ', t.descripcion, t.notas, t.observaciones)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_index_weekly_log(w weekly_logs)
+RETURNS void AS $$
+BEGIN
+    PERFORM upsert_search_document(
+        'bitacora', w.id, w.user_id,
+        'Bitácora ' || to_char(w.semana_inicio, 'YYYY-MM-DD'),
+        w.semana_inicio,
+        concat_ws(' ', w.aprendizajes, w.reflexiones),
+        concat_ws(' ', array_to_string(w.logros, ' '), array_to_string(w.desafios, ' '))
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_index_monthly_plan(p monthly_plans)
+RETURNS void AS $$
+DECLARE
+    v_actividades TEXT;
+BEGIN
+    IF jsonb_typeof(p.actividades_lograr) = 'array' THEN
+        SELECT string_agg(elem->>'texto', ' ')
+        INTO v_actividades
+        FROM jsonb_array_elements(p.actividades_lograr) AS elem;
+    END IF;
+
+    PERFORM upsert_search_document(
+        'plan', p.id, p.user_id,
+        'Plan ' || to_char(p.mes, 'YYYY-MM'),
+        p.mes,
+        concat_ws(' ', p.competencias_trabajar, p.que_quiero_lograr, p.objetivos),
+        concat_ws(' ', p.mis_fortalezas, p.mis_debilidades, p.mejoras_hacer, v_actividades)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_index_actividad(a actividades)
+RETURNS void AS $$
+BEGIN
+    PERFORM upsert_search_document(
+        'actividad', a.id, a.user_id, a.titulo, a.fecha_inicio,
+        a.titulo,
+        concat_ws(' ', a.descripcion, a.notas)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- TRIGGERS
+-- ================================================
+CREATE OR REPLACE FUNCTION sync_search_document()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tipo TEXT;
+BEGIN
+    v_tipo := CASE TG_TABLE_NAME
+        WHEN 'daily_tasks' THEN 'tarea'
+        WHEN 'weekly_logs' THEN 'bitacora'
+        WHEN 'monthly_plans' THEN 'plan'
+        WHEN 'actividades' THEN 'actividad'
+    END;
+
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM search_documents WHERE tipo = v_tipo AND entity_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    CASE TG_TABLE_NAME
+        WHEN 'daily_tasks' THEN PERFORM search_index_daily_task(NEW);
+        WHEN 'weekly_logs' THEN PERFORM search_index_weekly_log(NEW);
+        WHEN 'monthly_plans' THEN PERFORM search_index_monthly_plan(NEW);
+        WHEN 'actividades' THEN PERFORM search_index_actividad(NEW);
+    END CASE;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_search_daily_tasks ON daily_tasks;
+CREATE TRIGGER sync_search_daily_tasks
+    AFTER INSERT OR UPDATE OR DELETE ON daily_tasks
+    FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+DROP TRIGGER IF EXISTS sync_search_weekly_logs ON weekly_logs;
+CREATE TRIGGER sync_search_weekly_logs
+    AFTER INSERT OR UPDATE OR DELETE ON weekly_logs
+    FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+DROP TRIGGER IF EXISTS sync_search_monthly_plans ON monthly_plans;
+CREATE TRIGGER sync_search_monthly_plans
+    AFTER INSERT OR UPDATE OR DELETE ON monthly_plans
+    FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+DROP TRIGGER IF EXISTS sync_search_actividades ON actividades;
+CREATE TRIGGER sync_search_actividades
+    AFTER INSERT OR UPDATE OR DELETE ON actividades
+    FOR EACH ROW EXECUTE FUNCTION sync_search_document();
+
+-- ================================================
+-- FUNCTION: SEARCH
+-- ================================================
+CREATE OR REPLACE FUNCTION search_content(
+    p_user_id UUID,
+    p_query TEXT,
+    p_tipos TEXT[] DEFAULT NULL,
+    p_limit INT DEFAULT 20,
+    p_offset INT DEFAULT 0
+)
+RETURNS TABLE (
+    tipo VARCHAR(20),
+    entity_id UUID,
+    titulo TEXT,
+    fecha DATE,
+    rank REAL,
+    snippet TEXT,
+    total BIGINT
+) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('es_unaccent', p_query) AS query
+    ),
+    matches AS (
+        SELECT d.tipo, d.entity_id, d.titulo, d.fecha, d.contenido,
+               ts_rank_cd(d.search_vector, q.query) AS rank,
+               COUNT(*) OVER () AS total
+        FROM search_documents d, q
+        WHERE d.user_id = p_user_id
+          AND d.search_vector @@ q.query
+          AND (p_tipos IS NULL OR d.tipo = ANY(p_tipos))
+        ORDER BY rank DESC, d.fecha DESC NULLS LAST
+        LIMIT p_limit OFFSET p_offset
+    )
+    -- ts_headline solo sobre la página devuelta (es la parte costosa)
+    SELECT m.tipo, m.entity_id, m.titulo, m.fecha, m.rank,
+           ts_headline('es_unaccent', COALESCE(m.contenido, ''), q.query,
+                       'MaxFragments=2, MaxWords=20, MinWords=5'),
+           m.total
+    FROM matches m, q
+    ORDER BY m.rank DESC, m.fecha DESC NULLS LAST;
+$$ LANGUAGE sql STABLE;
+
+-- ================================================
+-- PROCEDURE: BATCHED BACKFILL
+-- ================================================
+-- Indexa las filas existentes en lotes, confirmando cada lote para no
+-- mantener bloqueos largos. Ejecutar después de la migración:
+--   CALL backfill_search_documents(500);
+CREATE OR REPLACE PROCEDURE backfill_search_documents(p_batch_size INT DEFAULT 500)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_count INT;
+BEGIN
+    LOOP
+        SELECT COUNT(search_index_daily_task(t)) INTO v_count
+        FROM (
+            SELECT t.* FROM daily_tasks t
+            WHERE NOT EXISTS (SELECT 1 FROM search_documents d WHERE d.tipo = 'tarea' AND d.entity_id = t.id)
+            LIMIT p_batch_size
+        ) t;
+        COMMIT;
+        EXIT WHEN v_count < p_batch_size;
+    END LOOP;
+
+    LOOP
+        SELECT COUNT(search_index_weekly_log(w)) INTO v_count
+        FROM (
+            SELECT w.* FROM weekly_logs w
+            WHERE NOT EXISTS (SELECT 1 FROM search_documents d WHERE d.tipo = 'bitacora' AND d.entity_id = w.id)
+            LIMIT p_batch_size
+        ) w;
+        COMMIT;
+        EXIT WHEN v_count < p_batch_size;
+    END LOOP;
+
+    LOOP
+        SELECT COUNT(search_index_monthly_plan(p)) INTO v_count
+        FROM (
+            SELECT p.* FROM monthly_plans p
+            WHERE NOT EXISTS (SELECT 1 FROM search_documents d WHERE d.tipo = 'plan' AND d.entity_id = p.id)
+            LIMIT p_batch_size
+        ) p;
+        COMMIT;
+        EXIT WHEN v_count < p_batch_size;
+    END LOOP;
+
+    LOOP
+        SELECT COUNT(search_index_actividad(a)) INTO v_count
+        FROM (
+            SELECT a.* FROM actividades a
+            WHERE NOT EXISTS (SELECT 1 FROM search_documents d WHERE d.tipo = 'actividad' AND d.entity_id = a.id)
+            LIMIT p_batch_size
+        ) a;
+        COMMIT;
+        EXIT WHEN v_count < p_batch_size;
+    END LOOP;
+END;
+$$;
+
+-- ================================================
+-- ROW LEVEL SECURITY
+-- ================================================
+ALTER TABLE search_documents ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own search_documents" ON search_documents;
+CREATE POLICY "Users can view own search_documents" ON search_documents
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 007_full_text_search completada exitosamente' AS status;
+SELECT 'Ejecutar ahora: CALL backfill_search_documents(500);' AS siguiente_paso;
@@ -0,0 +1,44 @@
+-- ================================================
+-- CALENDAR FEED - Migration 008
+-- Date: 2026-10-19
+-- Purpose: Per-user secret token for the .ics feed of tasks and actividades,
+--          plus the updated_at / tombstone support the feed uses to
+--          regenerate only changed events
+-- Requires: 004_upsert_constraints.sql, 006_delta_sync.sql
+-- ================================================
+
+-- ================================================
+-- TOKEN DEL FEED
+-- ================================================
+ALTER TABLE user_config ADD COLUMN IF NOT EXISTS calendar_token TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_config_calendar_token
+    ON user_config(calendar_token)
+    WHERE calendar_token IS NOT NULL;
+
+-- ================================================
+-- ACTIVIDADES: updated_at Y ELIMINACIONES
+-- ================================================
+ALTER TABLE actividades ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS update_actividades_updated_at ON actividades;
+CREATE TRIGGER update_actividades_updated_at
+    BEFORE UPDATE ON actividades
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE INDEX IF NOT EXISTS idx_actividades_user_updated ON actividades(user_id, updated_at);
+
+DROP TRIGGER IF EXISTS log_deletion_actividades ON actividades;
+CREATE TRIGGER log_deletion_actividades
+    AFTER DELETE ON actividades
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 008_calendar_feed completada exitosamente' AS status;
+
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE (table_name = 'user_config' AND column_name = 'calendar_token')
+   OR (table_name = 'actividades' AND column_name = 'updated_at');
@@ -0,0 +1,46 @@
+-- ================================================
+-- ACTIVIDADES PERIODO - Migration 009
+-- Date: 2026-10-19
+-- Purpose: daterange column + GiST index for from/to overlap filtering in
+--          GET /api/actividades, and DISTINCT grupos computed in the database
+-- ================================================
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- ================================================
+-- COLUMNA PERIODO
+-- ================================================
+-- Rango cerrado [fecha_inicio, fecha_fin]. LEAST/GREATEST evitan el error
+-- de daterange si alguna fila tiene las fechas invertidas.
+ALTER TABLE actividades ADD COLUMN IF NOT EXISTS periodo DATERANGE
+    GENERATED ALWAYS AS (
+        daterange(LEAST(fecha_inicio, fecha_fin), GREATEST(fecha_inicio, fecha_fin), '[]')
+    ) STORED;
+
+-- Filtro por usuario + solapamiento (operador &&, "ov" en PostgREST)
+CREATE INDEX IF NOT EXISTS idx_actividades_user_periodo
+    ON actividades USING GIST (user_id, periodo);
+
+-- ================================================
+-- FUNCTION: GRUPOS DE ACTIVIDADES
+-- ================================================
+CREATE INDEX IF NOT EXISTS idx_actividades_user_grupo ON actividades(user_id, grupo);
+
+CREATE OR REPLACE FUNCTION actividades_grupos(p_user_id UUID)
+RETURNS TABLE (grupo TEXT) AS $$
+    SELECT DISTINCT a.grupo::TEXT
+    FROM actividades a
+    WHERE a.user_id = p_user_id
+      AND a.grupo IS NOT NULL
+      AND a.grupo <> ''
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 009_actividades_periodo completada exitosamente' AS status;
+
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'actividades';
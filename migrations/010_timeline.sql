@@ -0,0 +1,109 @@
+-- ================================================
+-- TIMELINE - Migration 010
+-- Date: 2026-10-19
+-- Purpose: Bucketed timeline lanes (per actividades grupo and per
+--          macrotarea) computed in the database for GET /api/timeline
+-- Requires: 009_actividades_periodo.sql (actividades.periodo)
+-- ================================================
+
+-- ================================================
+-- ÍNDICES
+-- ================================================
+CREATE INDEX IF NOT EXISTS idx_daily_tasks_user_rango ON daily_tasks(user_id, fecha_inicio, fecha_fin);
+CREATE INDEX IF NOT EXISTS idx_daily_tasks_parent ON daily_tasks(parent_task_id);
+
+-- ================================================
+-- FUNCTION: TIMELINE BUCKETS
+-- ================================================
+-- Un arreglo JSON con un objeto por carril y periodo (semana o mes) con
+-- actividad (un solo valor: el max-rows de PostgREST no lo trunca):
+--   items       elementos que se solapan con el periodo
+--   carga_dias  suma de los días de cada elemento dentro del periodo
+--   progreso    progreso promedio ponderado por esos días
+-- Carriles: 'grupo' (actividades por grupo) y 'macrotarea' (subtareas de
+-- cada macrotarea, o la macrotarea misma si no tiene subtareas).
+DROP FUNCTION IF EXISTS timeline_buckets(UUID, DATE, DATE, TEXT);
+CREATE OR REPLACE FUNCTION timeline_buckets(
+    p_user_id UUID,
+    p_from DATE,
+    p_to DATE,
+    p_bucket TEXT DEFAULT 'month'
+)
+RETURNS JSONB AS $$
+    WITH elementos AS (
+        SELECT 'grupo'::TEXT AS lane_tipo,
+               COALESCE(NULLIF(a.grupo, ''), 'Sin grupo')::TEXT AS lane_id,
+               COALESCE(NULLIF(a.grupo, ''), 'Sin grupo')::TEXT AS lane_nombre,
+               lower(a.periodo) AS inicio,
+               upper(a.periodo) - 1 AS fin,
+               COALESCE(a.progreso, 0) AS progreso
+        FROM actividades a
+        WHERE a.user_id = p_user_id
+          AND a.periodo && daterange(p_from, p_to, '[]')
+
+        UNION ALL
+
+        -- Subtareas de cada macrotarea (índice por parent_task_id)
+        SELECT 'macrotarea'::TEXT,
+               m.id::TEXT,
+               m.titulo::TEXT,
+               LEAST(t.fecha_inicio, COALESCE(t.fecha_fin, t.fecha_inicio)),
+               GREATEST(t.fecha_inicio, COALESCE(t.fecha_fin, t.fecha_inicio)),
+               COALESCE(t.progreso, 0)
+        FROM daily_tasks t
+        JOIN daily_tasks m ON m.id = t.parent_task_id
+        WHERE t.user_id = p_user_id
+          AND m.es_macrotarea
+          AND t.fecha_inicio <= p_to
+          AND COALESCE(t.fecha_fin, t.fecha_inicio) >= p_from
+
+        UNION ALL
+
+        -- Macrotareas sin subtareas
+        SELECT 'macrotarea'::TEXT,
+               m.id::TEXT,
+               m.titulo::TEXT,
+               LEAST(m.fecha_inicio, COALESCE(m.fecha_fin, m.fecha_inicio)),
+               GREATEST(m.fecha_inicio, COALESCE(m.fecha_fin, m.fecha_inicio)),
+               COALESCE(m.progreso, 0)
+        FROM daily_tasks m
+        WHERE m.user_id = p_user_id
+          AND m.es_macrotarea
+          AND m.fecha_inicio <= p_to
+          AND COALESCE(m.fecha_fin, m.fecha_inicio) >= p_from
+          AND NOT EXISTS (SELECT 1 FROM daily_tasks c WHERE c.parent_task_id = m.id)
+    ),
+    periodos AS (
+        SELECT b::DATE AS inicio,
+               (b + ('1 ' || p_bucket)::INTERVAL - INTERVAL '1 day')::DATE AS fin
+        FROM generate_series(
+            date_trunc(p_bucket, p_from::TIMESTAMP),
+            p_to::TIMESTAMP,
+            ('1 ' || p_bucket)::INTERVAL
+        ) AS b
+    ),
+    solapes AS (
+        SELECT e.lane_tipo, e.lane_id, e.lane_nombre, p.inicio AS bucket, e.progreso,
+               LEAST(e.fin, p.fin, p_to) - GREATEST(e.inicio, p.inicio, p_from) + 1 AS dias
+        FROM elementos e
+        JOIN periodos p ON e.inicio <= p.fin AND e.fin >= p.inicio
+    )
+    agregados AS (
+        SELECT s.lane_tipo, s.lane_id, s.lane_nombre, s.bucket,
+               COUNT(*)::INT AS items,
+               SUM(s.dias)::INT AS carga_dias,
+               ROUND(SUM(s.progreso * s.dias)::NUMERIC / NULLIF(SUM(s.dias), 0), 1) AS progreso
+        FROM solapes s
+        WHERE s.dias > 0
+        GROUP BY s.lane_tipo, s.lane_id, s.lane_nombre, s.bucket
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(a) ORDER BY a.lane_tipo, a.lane_nombre, a.bucket), '[]'::JSONB)
+    FROM agregados a;
+$$ LANGUAGE sql STABLE;
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 010_timeline completada exitosamente' AS status;
+
+SELECT proname FROM pg_proc WHERE proname = 'timeline_buckets';
@@ -0,0 +1,112 @@
+-- ================================================
+-- TASK CASCADE - Migration 011
+-- Date: 2026-10-19
+-- Purpose: Delete a task together with its subtasks and evidencias in one
+--          transaction (DELETE /api/tasks/{id}) and list evidencias whose
+--          task no longer exists for the storage GC job
+-- ================================================
+
+-- ================================================
+-- CLAVE FORÁNEA DE SUBTAREAS
+-- ================================================
+-- Reemplaza la restricción existente (si la hay) por una con ON DELETE
+-- CASCADE. NOT VALID: no revisa las subtareas huérfanas ya existentes
+-- (ver VERIFICATION); una vez revisadas se puede ejecutar
+--   ALTER TABLE daily_tasks VALIDATE CONSTRAINT daily_tasks_parent_task_id_fkey;
+DO $$
+DECLARE
+    v_constraint TEXT;
+BEGIN
+    FOR v_constraint IN
+        SELECT c.conname
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+        WHERE c.conrelid = 'daily_tasks'::regclass
+          AND c.contype = 'f'
+          AND a.attname = 'parent_task_id'
+    LOOP
+        EXECUTE format('ALTER TABLE daily_tasks DROP CONSTRAINT %I', v_constraint);
+    END LOOP;
+END $$;
+
+ALTER TABLE daily_tasks
+    ADD CONSTRAINT daily_tasks_parent_task_id_fkey
+    FOREIGN KEY (parent_task_id) REFERENCES daily_tasks(id) ON DELETE CASCADE
+    NOT VALID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_tasks_parent ON daily_tasks(parent_task_id);
+
+-- ================================================
+-- FUNCTION: ELIMINAR TAREA EN CASCADA
+-- ================================================
+-- Elimina la tarea, sus subtareas (a cualquier profundidad) y sus
+-- evidencias en una sola transacción. Devuelve los ids eliminados y los
+-- archivos de las evidencias para que la API borre Storage y /uploads
+-- (los que no se puedan borrar los recoge el GC).
+CREATE OR REPLACE FUNCTION delete_task_cascade(p_user_id UUID, p_task_id UUID)
+RETURNS JSONB AS $$
+DECLARE
+    v_tareas UUID[];
+    v_evidencias JSONB;
+BEGIN
+    WITH RECURSIVE arbol AS (
+        SELECT t.id
+        FROM daily_tasks t
+        WHERE t.id = p_task_id AND t.user_id = p_user_id
+        UNION
+        SELECT t.id
+        FROM daily_tasks t
+        JOIN arbol a ON t.parent_task_id = a.id
+        WHERE t.user_id = p_user_id
+    )
+    SELECT array_agg(id) INTO v_tareas FROM arbol;
+
+    IF v_tareas IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    WITH eliminadas AS (
+        DELETE FROM evidencias
+        WHERE task_id = ANY(v_tareas)
+        RETURNING id, archivo_url, tamanio_kb
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id', id, 'archivo_url', archivo_url, 'tamanio_kb', tamanio_kb
+    )), '[]'::JSONB)
+    INTO v_evidencias
+    FROM eliminadas;
+
+    DELETE FROM daily_tasks WHERE id = ANY(v_tareas);
+
+    RETURN jsonb_build_object('tareas', to_jsonb(v_tareas), 'evidencias', v_evidencias);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- FUNCTION: EVIDENCIAS HUÉRFANAS
+-- ================================================
+-- Evidencias con task_id de una tarea que ya no existe (bases de datos
+-- donde evidencias.task_id no tenía la clave foránea). Paginado por id.
+-- user_id: los archivos solo se borran si el nombre es del mismo usuario.
+DROP FUNCTION IF EXISTS orphan_evidencias(UUID, INT);
+CREATE OR REPLACE FUNCTION orphan_evidencias(p_after UUID DEFAULT NULL, p_limit INT DEFAULT 500)
+RETURNS TABLE (id UUID, user_id UUID, archivo_url TEXT, tamanio_kb INT) AS $$
+    SELECT e.id, e.user_id, e.archivo_url, e.tamanio_kb
+    FROM evidencias e
+    WHERE e.task_id IS NOT NULL
+      AND (p_after IS NULL OR e.id > p_after)
+      AND NOT EXISTS (SELECT 1 FROM daily_tasks t WHERE t.id = e.task_id)
+    ORDER BY e.id
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 011_task_cascade completada exitosamente' AS status;
+
+-- Subtareas cuya macrotarea ya no existe (impiden VALIDATE CONSTRAINT)
+SELECT COUNT(*) AS subtareas_huerfanas
+FROM daily_tasks t
+WHERE t.parent_task_id IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM daily_tasks p WHERE p.id = t.parent_task_id);
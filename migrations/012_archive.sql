@@ -0,0 +1,340 @@
+-- ================================================
+-- HOT/COLD ARCHIVE - Migration 012
+-- Date: 2026-10-19
+-- Purpose: Move old daily_tasks, weekly_logs and financial_records into
+--          archive tables range-partitioned by month so the list queries
+--          only scan recent rows. The API reads the archive with
+--          include_archived=true; the archive job (ARCHIVE_* in main.py)
+--          calls archive_batch() in small batches
+-- Requires: 002_financial_control.sql, 006_delta_sync.sql,
+--           011_task_cascade.sql (replaces recalculate_financial_summary()
+--           from 002 so archived rows stay in the monthly totals)
+-- ================================================
+
+-- ================================================
+-- TABLAS DE ARCHIVO (PARTICIONADAS POR MES)
+-- ================================================
+-- Mismas columnas que la tabla activa (en el mismo orden) más el mes de la
+-- partición y la fecha de archivo. Si se agrega una columna a la tabla
+-- activa hay que agregarla también aquí, antes de archivo_mes.
+CREATE TABLE IF NOT EXISTS daily_tasks_archive (
+    LIKE daily_tasks INCLUDING DEFAULTS,
+    archivo_mes DATE NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, archivo_mes)
+) PARTITION BY RANGE (archivo_mes);
+
+CREATE TABLE IF NOT EXISTS weekly_logs_archive (
+    LIKE weekly_logs INCLUDING DEFAULTS,
+    archivo_mes DATE NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, archivo_mes)
+) PARTITION BY RANGE (archivo_mes);
+
+CREATE TABLE IF NOT EXISTS financial_records_archive (
+    LIKE financial_records INCLUDING DEFAULTS,
+    archivo_mes DATE NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, archivo_mes)
+) PARTITION BY RANGE (archivo_mes);
+
+-- Índices en la tabla padre: se crean en cada partición
+CREATE INDEX IF NOT EXISTS idx_daily_tasks_archive_user ON daily_tasks_archive(user_id, archivo_mes);
+CREATE INDEX IF NOT EXISTS idx_weekly_logs_archive_user ON weekly_logs_archive(user_id, semana_inicio);
+CREATE INDEX IF NOT EXISTS idx_financial_records_archive_user ON financial_records_archive(user_id, mes);
+
+-- ================================================
+-- FUNCTION: CREAR PARTICIÓN MENSUAL
+-- ================================================
+-- daily_tasks_archive_2024_03 = FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')
+CREATE OR REPLACE FUNCTION ensure_archive_partition(p_tabla TEXT, p_mes DATE)
+RETURNS VOID AS $$
+DECLARE
+    v_inicio DATE := date_trunc('month', p_mes)::DATE;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        p_tabla || '_' || to_char(v_inicio, 'YYYY_MM'),
+        p_tabla,
+        v_inicio,
+        (v_inicio + INTERVAL '1 month')::DATE
+    );
+EXCEPTION
+    -- Otro worker la creó al mismo tiempo
+    WHEN duplicate_table THEN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- TRIGGERS AL ARCHIVAR
+-- ================================================
+-- Archivar sí deja tombstone: para /api/sync y el feed de calendario la
+-- fila sale de la tabla activa y los clientes deben quitarla (se consulta
+-- con include_archived=true). Se recrean sin condición por si se aplicó
+-- una versión anterior de esta migración que los omitía al archivar.
+DROP TRIGGER IF EXISTS log_deletion_daily_tasks ON daily_tasks;
+CREATE TRIGGER log_deletion_daily_tasks
+    AFTER DELETE ON daily_tasks
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_weekly_logs ON weekly_logs;
+CREATE TRIGGER log_deletion_weekly_logs
+    AFTER DELETE ON weekly_logs
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+DROP TRIGGER IF EXISTS log_deletion_financial_records ON financial_records;
+CREATE TRIGGER log_deletion_financial_records
+    AFTER DELETE ON financial_records
+    FOR EACH ROW EXECUTE FUNCTION log_sync_deletion();
+
+-- archive_batch() activa pdp.archiving en su transacción: mover una fila
+-- al archivo no cambia el resumen financiero del mes (que conserva los
+-- totales archivados).
+
+DROP TRIGGER IF EXISTS recalculate_summary_on_record_change ON financial_records;
+CREATE TRIGGER recalculate_summary_on_record_change
+    AFTER INSERT OR UPDATE ON financial_records
+    FOR EACH ROW EXECUTE FUNCTION recalculate_financial_summary();
+
+DROP TRIGGER IF EXISTS recalculate_summary_on_record_delete ON financial_records;
+CREATE TRIGGER recalculate_summary_on_record_delete
+    AFTER DELETE ON financial_records
+    FOR EACH ROW
+    WHEN (current_setting('pdp.archiving', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION recalculate_financial_summary();
+
+-- ================================================
+-- FUNCTION: RESUMEN FINANCIERO CON EL ARCHIVO
+-- ================================================
+-- Reemplaza la de 002: un cambio posterior en un mes ya archivado (pagar
+-- una deuda que sigue activa, un registro con fecha atrasada) recalcula el
+-- mes sumando también las filas archivadas, que si no se perderían.
+CREATE OR REPLACE FUNCTION recalculate_financial_summary()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID;
+    v_mes DATE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_user_id := OLD.user_id;
+        v_mes := OLD.mes;
+    ELSE
+        v_user_id := NEW.user_id;
+        v_mes := NEW.mes;
+    END IF;
+
+    INSERT INTO financial_monthly_summary (user_id, mes, total_ingresos, total_gastos, total_deudas, balance, tasa_ahorro)
+    SELECT
+        v_user_id,
+        v_mes,
+        COALESCE(SUM(monto) FILTER (WHERE tipo = 'ingreso'), 0) as total_ingresos,
+        COALESCE(SUM(monto) FILTER (WHERE tipo = 'gasto'), 0) as total_gastos,
+        COALESCE(SUM(monto) FILTER (WHERE tipo = 'deuda'), 0) as total_deudas,
+        COALESCE(SUM(monto) FILTER (WHERE tipo = 'ingreso'), 0) -
+            COALESCE(SUM(monto) FILTER (WHERE tipo = 'gasto'), 0) as balance,
+        CASE
+            WHEN SUM(monto) FILTER (WHERE tipo = 'ingreso') > 0 THEN
+                ((SUM(monto) FILTER (WHERE tipo = 'ingreso') - SUM(monto) FILTER (WHERE tipo = 'gasto')) /
+                 SUM(monto) FILTER (WHERE tipo = 'ingreso') * 100)::DECIMAL(5,2)
+            ELSE 0
+        END as tasa_ahorro
+    FROM (
+        SELECT tipo, monto FROM financial_records
+        WHERE user_id = v_user_id AND mes = v_mes
+        UNION ALL
+        SELECT tipo, monto FROM financial_records_archive
+        WHERE user_id = v_user_id AND mes = v_mes
+          -- Solo la partición del mes
+          AND archivo_mes = date_trunc('month', v_mes)::DATE
+    ) r
+    HAVING COUNT(*) > 0
+    ON CONFLICT (user_id, mes) DO UPDATE SET
+        total_ingresos = EXCLUDED.total_ingresos,
+        total_gastos = EXCLUDED.total_gastos,
+        total_deudas = EXCLUDED.total_deudas,
+        balance = EXCLUDED.balance,
+        tasa_ahorro = EXCLUDED.tasa_ahorro,
+        updated_at = NOW();
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- FUNCTION: ÁRBOL DE UNA TAREA
+-- ================================================
+CREATE OR REPLACE FUNCTION task_tree_ids(p_root UUID)
+RETURNS SETOF UUID AS $$
+    WITH RECURSIVE arbol AS (
+        SELECT p_root AS id
+        UNION
+        SELECT t.id
+        FROM daily_tasks t
+        JOIN arbol a ON t.parent_task_id = a.id
+    )
+    SELECT id FROM arbol;
+$$ LANGUAGE sql STABLE;
+
+-- ================================================
+-- FUNCTION: ARCHIVAR UN LOTE
+-- ================================================
+-- Mueve hasta p_limit filas anteriores a p_before (primer día de un mes) y
+-- devuelve cuántas movió; 0 = no queda nada por archivar. Cada llamada es
+-- una transacción corta y SKIP LOCKED evita esperar a filas bloqueadas (o
+-- a otro worker archivando al mismo tiempo).
+--
+-- Se archivan:
+--   daily_tasks        árboles completos (macrotarea + subtareas) con todas
+--                      las tareas completadas o canceladas, terminadas antes
+--                      de p_before y sin evidencias (evidencias.task_id
+--                      referencia a daily_tasks con ON DELETE CASCADE)
+--   weekly_logs        semanas terminadas antes de p_before
+--   financial_records  meses anteriores a p_before, salvo deudas sin pagar
+CREATE OR REPLACE FUNCTION archive_batch(p_tabla TEXT, p_before DATE, p_limit INT DEFAULT 500)
+RETURNS INT AS $$
+DECLARE
+    v_ids UUID[];
+    v_mes DATE;
+    v_moved INT := 0;
+BEGIN
+    PERFORM set_config('pdp.archiving', 'on', true);
+
+    IF p_tabla = 'daily_tasks' THEN
+        SELECT array_agg(arbol.id) INTO v_ids
+        FROM (
+            SELECT r.id
+            FROM daily_tasks r
+            WHERE r.parent_task_id IS NULL
+              AND r.estado IN ('completada', 'cancelada')
+              AND COALESCE(r.fecha_fin, r.fecha_inicio) < p_before
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM task_tree_ids(r.id) AS a(id)
+                  JOIN daily_tasks t ON t.id = a.id
+                  WHERE t.estado NOT IN ('completada', 'cancelada')
+                     OR COALESCE(t.fecha_fin, t.fecha_inicio) >= p_before
+                     OR EXISTS (SELECT 1 FROM evidencias e WHERE e.task_id = t.id)
+              )
+            ORDER BY COALESCE(r.fecha_fin, r.fecha_inicio)
+            LIMIT p_limit
+            FOR UPDATE OF r SKIP LOCKED
+        ) raices
+        CROSS JOIN LATERAL task_tree_ids(raices.id) AS arbol(id);
+
+        IF v_ids IS NULL THEN
+            RETURN 0;
+        END IF;
+
+        FOR v_mes IN
+            SELECT DISTINCT date_trunc('month', COALESCE(fecha_fin, fecha_inicio, created_at::DATE))::DATE
+            FROM daily_tasks WHERE id = ANY(v_ids)
+        LOOP
+            PERFORM ensure_archive_partition('daily_tasks_archive', v_mes);
+        END LOOP;
+
+        INSERT INTO daily_tasks_archive
+        SELECT t.*, date_trunc('month', COALESCE(t.fecha_fin, t.fecha_inicio, t.created_at::DATE))::DATE, NOW()
+        FROM daily_tasks t
+        WHERE t.id = ANY(v_ids);
+
+        DELETE FROM daily_tasks WHERE id = ANY(v_ids);
+        GET DIAGNOSTICS v_moved = ROW_COUNT;
+
+    ELSIF p_tabla = 'weekly_logs' THEN
+        SELECT array_agg(id) INTO v_ids
+        FROM (
+            SELECT w.id
+            FROM weekly_logs w
+            WHERE w.semana_fin < p_before
+            ORDER BY w.semana_fin
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        ) lote;
+
+        IF v_ids IS NULL THEN
+            RETURN 0;
+        END IF;
+
+        FOR v_mes IN
+            SELECT DISTINCT date_trunc('month', semana_inicio)::DATE FROM weekly_logs WHERE id = ANY(v_ids)
+        LOOP
+            PERFORM ensure_archive_partition('weekly_logs_archive', v_mes);
+        END LOOP;
+
+        INSERT INTO weekly_logs_archive
+        SELECT w.*, date_trunc('month', w.semana_inicio)::DATE, NOW()
+        FROM weekly_logs w
+        WHERE w.id = ANY(v_ids);
+
+        DELETE FROM weekly_logs WHERE id = ANY(v_ids);
+        GET DIAGNOSTICS v_moved = ROW_COUNT;
+
+    ELSIF p_tabla = 'financial_records' THEN
+        SELECT array_agg(id) INTO v_ids
+        FROM (
+            SELECT f.id
+            FROM financial_records f
+            WHERE f.mes < p_before
+              AND NOT (f.tipo = 'deuda' AND NOT COALESCE(f.deuda_pagada, false))
+            ORDER BY f.mes
+            LIMIT p_limit
+            FOR UPDATE SKIP LOCKED
+        ) lote;
+
+        IF v_ids IS NULL THEN
+            RETURN 0;
+        END IF;
+
+        FOR v_mes IN
+            SELECT DISTINCT date_trunc('month', mes)::DATE FROM financial_records WHERE id = ANY(v_ids)
+        LOOP
+            PERFORM ensure_archive_partition('financial_records_archive', v_mes);
+        END LOOP;
+
+        INSERT INTO financial_records_archive
+        SELECT f.*, date_trunc('month', f.mes)::DATE, NOW()
+        FROM financial_records f
+        WHERE f.id = ANY(v_ids);
+
+        DELETE FROM financial_records WHERE id = ANY(v_ids);
+        GET DIAGNOSTICS v_moved = ROW_COUNT;
+
+    ELSE
+        RAISE EXCEPTION 'Tabla no archivable: %', p_tabla;
+    END IF;
+
+    RETURN v_moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- ROW LEVEL SECURITY
+-- ================================================
+ALTER TABLE daily_tasks_archive ENABLE ROW LEVEL SECURITY;
+ALTER TABLE weekly_logs_archive ENABLE ROW LEVEL SECURITY;
+ALTER TABLE financial_records_archive ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own archived tasks" ON daily_tasks_archive;
+CREATE POLICY "Users can view own archived tasks" ON daily_tasks_archive
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view own archived weekly_logs" ON weekly_logs_archive;
+CREATE POLICY "Users can view own archived weekly_logs" ON weekly_logs_archive
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view own archived financial_records" ON financial_records_archive;
+CREATE POLICY "Users can view own archived financial_records" ON financial_records_archive
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ================================================
+-- VERIFICATION
+-- ================================================
+SELECT 'Migración 012_archive completada exitosamente' AS status;
+
+-- Particiones creadas por el job de archivo
+SELECT parent.relname AS tabla, child.relname AS particion
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname IN ('daily_tasks_archive', 'weekly_logs_archive', 'financial_records_archive')
+ORDER BY 1, 2;
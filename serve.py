@@ -0,0 +1,176 @@
+"""
+Servidor de Producción
+Arranca la API con varios procesos worker (gunicorn + workers de uvicorn con
+uvloop y httptools). Un solo proceso de Python usa un solo núcleo: con
+varios workers el trabajo de CPU de una petición (JSON, JWT, bcrypt) no
+bloquea a las demás.
+
+- Workers: WEB_CONCURRENCY; si no se define, uno por núcleo disponible con
+  EVENTS_BROKER_URL (Redis) y uno solo sin él
+- Reciclado: cada worker se reinicia tras WEB_MAX_REQUESTS peticiones (con
+  jitter para que no se reinicien todos a la vez)
+- Reinicio sin cortes: `kill -HUP <pid del master>` levanta workers nuevos
+  y deja terminar a los anteriores (hasta WEB_GRACEFUL_TIMEOUT segundos)
+
+Estado de cada worker (se advierte al arrancar con más de uno):
+- Notificaciones SSE, caché de /api/analytics y rotación del token del feed
+  de calendario: necesitan EVENTS_BROKER_URL (Redis) para llegar a los
+  demás workers; sin él la caché de analítica se desactiva
+- Idempotency-Key: necesitan IDEMPOTENCY_REDIS_URL (o EVENTS_BROKER_URL)
+  para que un reintento atendido por otro worker no vuelva a insertar
+- Caché de páginas HTML (se revalida con la fecha del archivo) y límite
+  SSE_MAX_CONNECTIONS_PER_USER: siempre por worker, sin efecto en los datos
+- SUPABASE_BACKEND=memory: solo funciona con un worker
+El número de workers se exporta en WEB_CONCURRENCY para que la app lo vea.
+En Windows (sin gunicorn) se usa el supervisor de procesos de uvicorn.
+
+Uso:
+    python serve.py
+    WEB_CONCURRENCY=4 PORT=8000 python serve.py
+"""
+
+import importlib.util
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "2000"))
+MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "200"))
+GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+# IPs del proxy de la plataforma cuyos X-Forwarded-* se aceptan ("*" solo
+# si nadie más puede llegar al puerto: cualquier cliente podría falsear su IP)
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+except ImportError:
+    BaseApplication = None
+    UvicornWorker = None
+
+def available_cores() -> int:
+    """Núcleos asignados a este proceso (respeta los límites del contenedor)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def per_worker_state() -> list:
+    """Estado que con la configuración actual no se comparte entre workers"""
+    redis_installed = importlib.util.find_spec("redis") is not None
+    events = bool(os.getenv("EVENTS_BROKER_URL")) and redis_installed
+    idempotency = bool(os.getenv("IDEMPOTENCY_REDIS_URL") or os.getenv("EVENTS_BROKER_URL")) and redis_installed
+
+    problems = []
+    if not redis_installed and (os.getenv("EVENTS_BROKER_URL") or os.getenv("IDEMPOTENCY_REDIS_URL")):
+        problems.append("Redis configurado pero el paquete 'redis' no está instalado")
+    if not events:
+        problems += [
+            "notificaciones SSE: solo llegan a las conexiones del worker que hizo el cambio",
+            "caché de /api/analytics: desactivada (cada petición recalcula)",
+            "feed de calendario: un token rotado sigue valiendo en los demás workers "
+            "hasta CALENDAR_REFRESH_SECONDS",
+        ]
+    if not idempotency:
+        problems.append("Idempotency-Key: un reintento que llega a otro worker vuelve a insertar")
+    return problems
+
+def worker_count() -> int:
+    """Workers a lanzar y advertencias sobre el estado compartido"""
+    problems = per_worker_state()
+    requested = int(os.getenv("WEB_CONCURRENCY") or "0")
+    # Sin Redis, varios workers solo si se piden explícitamente
+    workers = requested or (1 if problems else available_cores())
+
+    if os.getenv("SUPABASE_BACKEND", "supabase") == "memory" and workers > 1:
+        print("ADVERTENCIA: SUPABASE_BACKEND=memory no se comparte entre procesos; se usa 1 worker")
+        return 1
+    if workers > 1 and problems:
+        print(f"ADVERTENCIA: {workers} workers sin estado compartido (configura EVENTS_BROKER_URL "
+              "con Redis o usa WEB_CONCURRENCY=1):")
+        for problem in problems:
+            print(f"  - {problem}")
+        print("  - siempre por worker, sin efecto en los datos: caché de páginas HTML y "
+              "SSE_MAX_CONNECTIONS_PER_USER")
+    return workers
+
+if UvicornWorker is not None:
+    class ProductionWorker(UvicornWorker):
+        """Worker de uvicorn con uvloop + httptools y cierre ordenado
+
+        UvicornWorker no pasa graceful_timeout a uvicorn, que esperaría
+        indefinidamente a las conexiones SSE; se cierran un poco antes de que
+        gunicorn mate el worker.
+        """
+
+        CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.config.timeout_graceful_shutdown = max(self.cfg.graceful_timeout - 5, 1)
+            # El access log lo escribe la app (RequestContextMiddleware)
+            self.config.access_log = False
+
+if BaseApplication is not None:
+    class ProductionServer(BaseApplication):
+        """Gunicorn configurado desde código (sin gunicorn.conf.py)"""
+
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+def main():
+    """Función principal del servidor"""
+    workers = worker_count()
+    # Los workers heredan el entorno: la app decide con esto si usa sus cachés
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    print(f"Iniciando {workers} worker(s) en {HOST}:{PORT}")
+
+    if BaseApplication is None:
+        # Windows o gunicorn no instalado: supervisor de uvicorn
+        import uvicorn
+        uvicorn.run(
+            "main:app",
+            host=HOST,
+            port=PORT,
+            workers=workers,
+            loop="auto",
+            http="auto",
+            limit_max_requests=MAX_REQUESTS,
+            timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+            timeout_keep_alive=KEEPALIVE,
+            forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+            access_log=False,
+        )
+        return 0
+
+    ProductionServer({
+        "bind": f"{HOST}:{PORT}",
+        "workers": workers,
+        "worker_class": "serve.ProductionWorker",
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        # Sin preload: cada worker crea sus propios clientes, hilos y conexiones
+        "preload_app": False,
+    }).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
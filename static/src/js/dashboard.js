@@ -0,0 +1,1843 @@
+function appData() {
+    return {
+        // Estado general
+        currentView: 'dashboard',
+        taskView: 'list',
+        monthlyView: 'gestion',
+        userInitials: 'U',
+        showToast: false,
+        toastMessage: '',
+        toastType: 'success',
+        showSubtasks: true,
+        expandedMacrotasks: {}, // Control de expansión por macrotarea
+
+        // Filtros de tareas
+        filterEstado: '',
+        filterPrioridad: '',
+        filterClasificacion: '',
+        filterFecha: '',
+
+        // Datos
+        stats: {
+            totalTasks: 0,
+            completedTasks: 0,
+            pendingTasks: 0,
+            completionRate: 0,
+            weeklyLogsCount: 0
+        },
+        tasks: [],
+        recentTasks: [],
+        weeklyLogs: [],
+        draggedTask: null,
+
+        // Modales
+        showNewTaskModal: false,
+        showEditTaskModal: false,
+        showNewMonthlyPlanModal: false,
+        showNewWeeklyLogModal: false,
+        showViewWeeklyLogModal: false,
+        showEditWeeklyLogModal: false,
+        showAddClasificacion: false,
+        showAddCategoria: false,
+
+        // Tarea en edición
+        editingTask: {
+            titulo: '',
+            descripcion: '',
+            clasificacion: '',
+            categoria: '',
+            fecha_inicio: '',
+            fecha_fin: '',
+            estado: 'pendiente',
+            prioridad: 'media',
+            progreso: 0,
+            es_macrotarea: false,
+            observaciones: '',
+            parent_task_id: ''
+        },
+        viewingWeeklyLog: null,
+        editingWeeklyLog: {
+            semana_inicio: '',
+            semana_fin: '',
+            logros: [],
+            desafios: [],
+            aprendizajes: '',
+            reflexiones: '',
+            nivel_energia: 3,
+            nivel_satisfaccion: 3
+        },
+
+        // Configuración de usuario
+        userConfig: {
+            clasificaciones: ['desarrollo', 'investigacion', 'documentacion', 'reunion', 'estudio', 'revision', 'planificacion', 'testing'],
+            categorias: ['aprendizaje', 'compromiso', 'competencia', 'personal']
+        },
+        nuevaClasificacion: '',
+        nuevaCategoria: '',
+
+        // Datos de formularios
+        newTask: {
+            titulo: '',
+            descripcion: '',
+            clasificacion: '',
+            categoria: 'personal',
+            fecha_inicio: new Date().toISOString().split('T')[0],
+            fecha_fin: new Date().toISOString().split('T')[0],
+            estado: 'pendiente',
+            prioridad: 'media',
+            progreso: 0,
+            es_macrotarea: false,
+            parent_task_id: '',
+            tiempo_estimado: null,
+            observaciones: ''
+        },
+
+        monthlyPlan: {
+            mes: new Date().toISOString().substring(0, 7), // YYYY-MM
+            competencias_trabajar: '',
+            competencias: [],
+            que_quiero_lograr: '',
+            actividades_lograr: [],
+            mis_fortalezas: '',
+            mis_debilidades: ''
+        },
+        newActividadLograr: '',
+
+        currentPlanId: null,
+        monthlyPlans: [],
+        competenciasEvolution: {},
+        planComparison: null,
+
+        // Estados para modo visualización/edición
+        isEditMode: false,
+        isCreatingNewPlan: false,
+        viewingPlanId: null,
+        monthAlreadyExists: false,
+
+        newCompetencia: {
+            nombre: '',
+            progreso_inicio: 0,
+            progreso_actual: 0,
+            progreso_fin: null,
+            notas: '',
+            actividades: []
+        },
+        newActividad: '',
+
+        monthlyReview: {
+            que_mejore: '',
+            que_falta_mejorar: '',
+            habilidades_desarrolladas: '',
+            momento_memorable: ''
+        },
+
+        // Charts
+        weeklyChart: null,
+        categoryChart: null,
+        competenciasChart: null,
+        evolutionChart: null,
+
+        weeklyLog: {
+            semana_inicio: new Date().toISOString().split('T')[0],
+            semana_fin: new Date().toISOString().split('T')[0],
+            logros: [],
+            desafios: [],
+            aprendizajes: '',
+            reflexiones: '',
+            nivel_energia: 3,
+            nivel_satisfaccion: 3
+        },
+        newLogro: '',
+        newDesafio: '',
+
+        // Financial Control
+        financialView: 'dashboard',
+        financialCategories: [],
+        financialRecords: [],
+        financialSummary: null,
+        selectedMonth: new Date().toISOString().split('T')[0].substring(0, 7),
+        newFinancialRecord: {
+            mes: new Date().toISOString().split('T')[0],
+            fecha_transaccion: new Date().toISOString().split('T')[0],
+            tipo: 'gasto',
+            monto: 0,
+            descripcion: '',
+            category_id: ''
+        },
+        newFinancialCategory: {
+            nombre: '',
+            tipo: 'gasto',
+            color: '#6366f1',
+            icono: ''
+        },
+        expensesChart: null,
+
+        // Inicialización
+        async init() {
+            const token = localStorage.getItem('access_token');
+            if (!token) {
+                window.location.href = '/login';
+                return;
+            }
+
+            this.userInitials = this.getUserInitials();
+            await this.loadUserConfig();
+            await this.loadDashboardData();
+            await this.loadTasks();
+            await this.loadWeeklyLogs();
+            await this.loadMonthlyPlans();
+            await this.loadCompetenciasEvolution();
+            await this.loadFinancialCategories();
+            await this.loadFinancialSummary();
+
+            // Inicializar charts DESPUÉS de que todos los datos estén cargados
+            // y el DOM esté completamente estable
+            setTimeout(() => {
+                this.initCharts();
+            }, 500);
+
+            this.connectEvents();
+        },
+
+        // Notificaciones en tiempo real (cambios hechos en otras pestañas/dispositivos)
+        async connectEvents() {
+            if (!window.EventSource) return;
+
+            // Token de corta duración: la URL de EventSource queda en los logs
+            let stream;
+            try {
+                stream = await this.apiCall('/api/auth/stream-token', 'POST');
+            } catch (error) {
+                console.error('Error obteniendo token de eventos:', error);
+            }
+            if (!stream) {
+                setTimeout(() => this.connectEvents(), 30000);
+                return;
+            }
+
+            const source = new EventSource(`/api/events?token=${encodeURIComponent(stream.token)}`);
+            const pending = new Set();
+            let timer = null;
+
+            // Agrupar ráfagas de eventos en una sola recarga por tabla
+            const schedule = (tabla) => {
+                pending.add(tabla);
+                clearTimeout(timer);
+                timer = setTimeout(() => {
+                    const tablas = [...pending];
+                    pending.clear();
+                    this.reloadTables(tablas);
+                }, 300);
+            };
+
+            source.addEventListener('change', (e) => schedule(JSON.parse(e.data).tabla));
+            source.addEventListener('resync', () => schedule('*'));
+            source.onerror = () => {
+                // EventSource reintenta con la misma URL; si el token ya caducó
+                // la conexión se cierra y hay que pedir otro
+                if (source.readyState === EventSource.CLOSED) {
+                    setTimeout(() => this.connectEvents(), 5000);
+                }
+            };
+        },
+
+        async reloadTables(tablas) {
+            const all = tablas.includes('*');
+            const has = (...names) => all || names.some(n => tablas.includes(n));
+
+            if (has('daily_tasks', 'evidencias')) {
+                await this.loadTasks();
+                await this.loadDashboardData();
+            }
+            if (has('weekly_logs')) await this.loadWeeklyLogs();
+            if (has('monthly_plans', 'monthly_reviews')) {
+                await this.loadMonthlyPlans();
+                await this.loadCompetenciasEvolution();
+            }
+            if (has('user_config')) await this.loadUserConfig();
+            if (has('financial_categories')) await this.loadFinancialCategories();
+            if (has('financial_records')) await this.loadFinancialSummary();
+        },
+        
+        getUserInitials() {
+            const email = localStorage.getItem('user_email') || 'user@example.com';
+            return email.charAt(0).toUpperCase();
+        },
+        
+        async loadDashboardData() {
+            try {
+                const response = await this.apiCall('/api/dashboard/summary');
+                if (response) {
+                    this.stats = response;
+                }
+            } catch (error) {
+                console.error('Error loading dashboard:', error);
+            }
+        },
+        
+        async loadTasks() {
+            try {
+                const response = await this.apiCall('/api/tasks');
+                if (response) {
+                    this.tasks = response;
+                    this.recentTasks = response.slice(0, 5);
+                }
+            } catch (error) {
+                console.error('Error loading tasks:', error);
+            }
+        },
+        
+        async loadWeeklyLogs() {
+            try {
+                const response = await this.apiCall('/api/weekly/logs');
+                if (response) {
+                    // Normalizar los datos para asegurar que logros y desafíos sean arrays
+                    this.weeklyLogs = response.map(log => ({
+                        ...log,
+                        logros: Array.isArray(log.logros) ? log.logros : (log.logros ? [log.logros] : []),
+                        desafios: Array.isArray(log.desafios) ? log.desafios : (log.desafios ? [log.desafios] : [])
+                    }));
+                }
+            } catch (error) {
+                console.error('Error loading weekly logs:', error);
+            }
+        },
+
+        async loadUserConfig() {
+            try {
+                const response = await this.apiCall('/api/config');
+                if (response) {
+                    this.userConfig = {
+                        clasificaciones: response.clasificaciones || [],
+                        categorias: response.categorias || []
+                    };
+                }
+            } catch (error) {
+                console.error('Error loading user config:', error);
+            }
+        },
+
+        async addClasificacion() {
+            if (!this.nuevaClasificacion.trim()) {
+                this.showNotification('Ingresa un nombre para la clasificación', 'error');
+                return;
+            }
+
+            try {
+                const response = await this.apiCall('/api/config/clasificaciones', 'POST', {
+                    nombre: this.nuevaClasificacion.trim()
+                });
+
+                if (response) {
+                    this.userConfig.clasificaciones = response.clasificaciones;
+                    this.nuevaClasificacion = '';
+                    this.showAddClasificacion = false;
+                    this.showNotification('Clasificación agregada', 'success');
+                }
+            } catch (error) {
+                this.showNotification('Error al agregar clasificación', 'error');
+            }
+        },
+
+        async addCategoria() {
+            if (!this.nuevaCategoria.trim()) {
+                this.showNotification('Ingresa un nombre para la categoría', 'error');
+                return;
+            }
+
+            try {
+                const response = await this.apiCall('/api/config/categorias', 'POST', {
+                    nombre: this.nuevaCategoria.trim()
+                });
+
+                if (response) {
+                    this.userConfig.categorias = response.categorias;
+                    this.nuevaCategoria = '';
+                    this.showAddCategoria = false;
+                    this.showNotification('Categoría agregada', 'success');
+                }
+            } catch (error) {
+                this.showNotification('Error al agregar categoría', 'error');
+            }
+        },
+
+        async apiCall(endpoint, method = 'GET', data = null) {
+            const token = localStorage.getItem('access_token');
+            const options = {
+                method,
+                headers: {
+                    'Authorization': `Bearer ${token}`,
+                    'Content-Type': 'application/json'
+                }
+            };
+            
+            if (data && method !== 'GET') {
+                options.body = JSON.stringify(data);
+            }
+            if (method === 'POST') {
+                // La misma clave en los reintentos: el servidor no vuelve a insertar
+                options.headers['Idempotency-Key'] = crypto.randomUUID();
+            }
+
+            let response;
+            for (let intento = 0; ; intento++) {
+                try {
+                    response = await fetch(endpoint, options);
+                    break;
+                } catch (error) {
+                    // Error de red (sin respuesta): reintentar GET y POST con Idempotency-Key
+                    if (intento >= 2 || (method !== 'GET' && method !== 'POST')) throw error;
+                    await new Promise(resolve => setTimeout(resolve, 500 * 2 ** intento));
+                }
+            }
+            if (response.ok) {
+                return await response.json();
+            }
+            throw new Error('API call failed');
+        },
+        
+        // Funciones de utilidad
+        formatDate(dateString) {
+            if (!dateString) return '';
+            // Evitar problemas de timezone - parsear fecha como local
+            const parts = dateString.split('-');
+            if (parts.length >= 3) {
+                const year = parseInt(parts[0]);
+                const month = parseInt(parts[1]) - 1; // Meses en JS son 0-indexed
+                const day = parseInt(parts[2].split('T')[0]); // Remover tiempo si existe
+                const date = new Date(year, month, day);
+                return date.toLocaleDateString('es-ES');
+            }
+            return dateString;
+        },
+
+        capitalize(str) {
+            if (!str) return '';
+            // Reemplazar guiones bajos con espacios y capitalizar
+            return str.replace(/_/g, ' ').split(' ').map(word =>
+                word.charAt(0).toUpperCase() + word.slice(1).toLowerCase()
+            ).join(' ');
+        },
+
+        // Funciones para expand/collapse de macrotareas
+        toggleMacrotask(taskId) {
+            this.expandedMacrotasks = {
+                ...this.expandedMacrotasks,
+                [taskId]: !this.isMacrotaskExpanded(taskId)
+            };
+        },
+
+        isMacrotaskExpanded(taskId) {
+            // Por defecto expandidas (true), solo colapsadas si explícitamente false
+            return this.expandedMacrotasks[taskId] !== false;
+        },
+
+        hasSubtasks(taskId) {
+            return this.tasks.some(t => t.parent_task_id === taskId);
+        },
+
+        formatMonth(dateString) {
+            if (!dateString) return '';
+            try {
+                // Extraer año y mes del string
+                const parts = dateString.split('-');
+                const year = parseInt(parts[0]);
+                const monthIndex = parseInt(parts[1]) - 1;
+
+                if (isNaN(year) || isNaN(monthIndex) || monthIndex < 0 || monthIndex > 11) {
+                    return dateString; // Retornar original si no se puede parsear
+                }
+
+                const months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic'];
+                return `${months[monthIndex]} ${year}`;
+            } catch (error) {
+                console.error('Error formatting month:', error, dateString);
+                return dateString;
+            }
+        },
+
+        // Convertir fecha sin timezone offset
+        toLocalISODate(dateInput) {
+            if (!dateInput) return null;
+            // Si es string en formato YYYY-MM-DD o YYYY-MM, retornar directamente
+            if (typeof dateInput === 'string') {
+                return dateInput;
+            }
+            // Si es Date object, extraer fecha local
+            const date = new Date(dateInput);
+            const year = date.getFullYear();
+            const month = String(date.getMonth() + 1).padStart(2, '0');
+            const day = String(date.getDate()).padStart(2, '0');
+            return `${year}-${month}-${day}`;
+        },
+
+        getStatusBadgeClass(status) {
+            const classes = {
+                'pendiente': 'badge-warning',
+                'en_progreso': 'badge-info',
+                'completada': 'badge-success',
+                'cancelada': 'badge-error'
+            };
+            return classes[status] || '';
+        },
+        
+        getPriorityBadgeClass(priority) {
+            const classes = {
+                'alta': 'badge-error',
+                'media': 'badge-warning',
+                'baja': 'badge-success'
+            };
+            return classes[priority] || '';
+        },
+
+        updateEstadoByProgreso(task) {
+            // Actualizar estado automáticamente según progreso
+            const progreso = parseInt(task.progreso) || 0;
+
+            if (progreso === 0) {
+                task.estado = 'pendiente';
+            } else if (progreso > 0 && progreso < 100) {
+                task.estado = 'en_progreso';
+            } else if (progreso === 100) {
+                task.estado = 'completada';
+            }
+        },
+
+        getTasksByStatus(status) {
+            return this.filteredTasks.filter(task => task.estado === status);
+        },
+        
+        // Drag and Drop Handlers
+        handleDragStart(event, task) {
+            this.draggedTask = task;
+            event.target.classList.add('dragging');
+        },
+        
+        handleDragEnd(event) {
+            event.target.classList.remove('dragging');
+            document.querySelectorAll('.drag-over').forEach(el => {
+                el.classList.remove('drag-over');
+            });
+        },
+        
+        async handleDrop(event, newStatus) {
+            event.preventDefault();
+            event.target.classList.remove('drag-over');
+            
+            if (this.draggedTask && this.draggedTask.estado !== newStatus) {
+                try {
+                    await this.apiCall(`/api/tasks/${this.draggedTask.id}`, 'PUT', {
+                        estado: newStatus
+                    });
+                    
+                    // Actualizar estado local
+                    const task = this.tasks.find(t => t.id === this.draggedTask.id);
+                    if (task) {
+                        task.estado = newStatus;
+                    }
+                    
+                    this.showNotification('Tarea actualizada correctamente', 'success');
+                } catch (error) {
+                    this.showNotification('Error al actualizar tarea', 'error');
+                }
+            }
+            
+            this.draggedTask = null;
+        },
+        
+        // CRUD Operations
+        async createTask() {
+            try {
+                const response = await this.apiCall('/api/tasks', 'POST', this.newTask);
+
+                if (response) {
+                    this.showNotification('Tarea creada exitosamente', 'success');
+                    this.showNewTaskModal = false;
+
+                    // Si es una subtarea, recalcular fechas de la macrotarea padre
+                    const parentTaskId = this.newTask.parent_task_id;
+
+                    await this.loadTasks();
+                    await this.loadDashboardData();
+
+                    // Recalcular fechas de macrotarea si es subtarea
+                    if (parentTaskId) {
+                        await this.recalcularFechasMacrotarea(parentTaskId);
+                    }
+
+                    // Reset form
+                    this.newTask = {
+                        titulo: '',
+                        descripcion: '',
+                        clasificacion: '',
+                        categoria: 'personal',
+                        fecha_inicio: new Date().toISOString().split('T')[0],
+                        fecha_fin: new Date().toISOString().split('T')[0],
+                        estado: 'pendiente',
+                        prioridad: 'media',
+                        progreso: 0,
+                        es_macrotarea: false,
+                        parent_task_id: '',
+                        tiempo_estimado: null,
+                        observaciones: ''
+                    };
+                }
+            } catch (error) {
+                this.showNotification('Error al crear tarea: ' + error.message, 'error');
+            }
+        },
+
+        async deleteTask(taskId) {
+            if (!confirm('¿Estás seguro de eliminar esta tarea?')) return;
+
+            try {
+                // Obtener parent_task_id antes de eliminar
+                const task = this.tasks.find(t => t.id === taskId);
+                const parentTaskId = task ? task.parent_task_id : null;
+
+                await this.apiCall(`/api/tasks/${taskId}`, 'DELETE');
+                this.tasks = this.tasks.filter(t => t.id !== taskId);
+                this.showNotification('Tarea eliminada', 'success');
+                await this.loadDashboardData();
+
+                // Si era una subtarea, recalcular fechas de la macrotarea padre
+                if (parentTaskId) {
+                    await this.recalcularFechasMacrotarea(parentTaskId);
+                }
+            } catch (error) {
+                this.showNotification('Error al eliminar tarea', 'error');
+            }
+        },
+
+        editTask(task) {
+            // Cargar los datos de la tarea en el formulario de edición
+            this.editingTask = { ...task };
+            this.showEditTaskModal = true;
+        },
+
+        async updateTask() {
+            try {
+                const taskId = this.editingTask.id;
+                const parentTaskId = this.editingTask.parent_task_id;
+                const response = await this.apiCall(`/api/tasks/${taskId}`, 'PUT', this.editingTask);
+
+                if (response) {
+                    this.showNotification('Tarea actualizada exitosamente', 'success');
+                    this.showEditTaskModal = false;
+                    await this.loadTasks();
+                    await this.loadDashboardData();
+
+                    // Si es una subtarea, recalcular fechas de la macrotarea padre
+                    if (parentTaskId) {
+                        await this.recalcularFechasMacrotarea(parentTaskId);
+                    }
+
+                    this.editingTask = null;
+                }
+            } catch (error) {
+                this.showNotification('Error al actualizar tarea: ' + error.message, 'error');
+            }
+        },
+
+        async recalcularFechasMacrotarea(macrotareaId) {
+            try {
+                const response = await this.apiCall(`/api/tasks/${macrotareaId}/recalcular-fechas`, 'PUT');
+                if (response && response.message !== 'No hay subtareas' && response.message !== 'Las subtareas no tienen fechas definidas') {
+                    // Actualizar la tarea en el array local
+                    const taskIndex = this.tasks.findIndex(t => t.id === macrotareaId);
+                    if (taskIndex !== -1) {
+                        this.tasks[taskIndex].fecha_inicio = response.fecha_inicio;
+                        this.tasks[taskIndex].fecha_fin = response.fecha_fin;
+                    }
+                }
+            } catch (error) {
+                console.error('Error al recalcular fechas:', error);
+            }
+        },
+
+        // Plan Mensual y Bitácoras
+        async loadMonthlyPlans() {
+            try {
+                const response = await this.apiCall('/api/monthly/plans');
+                if (response) {
+                    this.monthlyPlans = response;
+                    if (response.length > 0) {
+                        this.currentPlanId = response[0].id;
+                        this.monthlyPlan = {...response[0]};
+                    }
+                }
+            } catch (error) {
+                console.error('Error loading monthly plans:', error);
+            }
+        },
+
+        async loadCompetenciasEvolution() {
+            try {
+                const response = await this.apiCall('/api/monthly/evolution?months=6&include_plans=false');
+                if (response) {
+                    this.competenciasEvolution = response.evolution;
+                    // Solo renderizar si estamos en la vista monthly
+                    if (this.currentView === 'monthly') {
+                        this.$nextTick(() => {
+                            setTimeout(() => this.renderEvolutionChart(), 100);
+                        });
+                    }
+                }
+            } catch (error) {
+                console.error('Error loading evolution:', error);
+            }
+        },
+
+        async loadExistingPlan(planId) {
+            if (!planId) return;
+
+            try {
+                // Plan, evaluación y métricas en una sola petición
+                const detail = await this.apiCall(`/api/monthly/plans/${planId}/detail`);
+
+                if (detail) {
+                    const plan = detail.plan;
+
+                    // Poblar formulario - convertir fecha YYYY-MM-DD a YYYY-MM para input type="month"
+                    let mesFormato = plan.mes;
+                    if (mesFormato && mesFormato.length > 7) {
+                        mesFormato = mesFormato.substring(0, 7); // Extraer YYYY-MM
+                    }
+
+                    this.monthlyPlan = {
+                        mes: mesFormato,
+                        competencias_trabajar: plan.competencias_trabajar || '',
+                        competencias: plan.competencias || [],
+                        que_quiero_lograr: plan.que_quiero_lograr || '',
+                        actividades_lograr: plan.actividades_lograr || [],
+                        mis_fortalezas: plan.mis_fortalezas || '',
+                        mis_debilidades: plan.mis_debilidades || ''
+                    };
+
+                    // Modo visualización
+                    this.isEditMode = false;
+                    this.isCreatingNewPlan = false;
+                    this.viewingPlanId = planId;
+
+                    this.applyPlanComparison(detail);
+
+                    // Review si existe
+                    const review = detail.review;
+                    if (review) {
+                        this.monthlyReview = {
+                            que_mejore: review.que_mejore || '',
+                            que_falta_mejorar: review.que_falta_mejorar || '',
+                            habilidades_desarrolladas: review.habilidades_desarrolladas || '',
+                            momento_memorable: review.momento_memorable || ''
+                        };
+                    } else {
+                        console.log('No review found');
+                    }
+                }
+            } catch (error) {
+                this.showNotification('Error al cargar plan: ' + error.message, 'error');
+            }
+        },
+
+        applyPlanComparison(response) {
+            this.planComparison = response;
+            // Solo renderizar si estamos en la vista monthly
+            if (this.currentView === 'monthly') {
+                this.$nextTick(() => {
+                    setTimeout(() => this.renderCompetenciasChart(), 100);
+                });
+            }
+        },
+
+        async loadPlanComparison(planId) {
+            try {
+                const response = await this.apiCall(`/api/monthly/comparison/${planId}`);
+                if (response) {
+                    this.applyPlanComparison(response);
+                }
+            } catch (error) {
+                console.error('Error loading comparison:', error);
+            }
+        },
+
+        createNewPlan() {
+            // Limpiar formularios
+            this.monthlyPlan = {
+                mes: new Date().toISOString().split('T')[0],
+                competencias_trabajar: '',
+                competencias: [],
+                que_quiero_lograr: '',
+                actividades_lograr: [],
+                mis_fortalezas: '',
+                mis_debilidades: ''
+            };
+
+            this.monthlyReview = {
+                que_mejore: '',
+                que_falta_mejorar: '',
+                habilidades_desarrolladas: '',
+                momento_memorable: ''
+            };
+
+            // Activar modo edición
+            this.isEditMode = true;
+            this.isCreatingNewPlan = true;
+            this.viewingPlanId = null;
+            this.currentPlanId = null;
+
+            // Cambiar a pestaña Gestión
+            this.monthlyView = 'gestion';
+
+            this.showNotification('Creando nuevo plan mensual', 'info');
+        },
+
+        enableEditMode() {
+            this.isEditMode = true;
+            this.showNotification('Modo edición activado', 'info');
+        },
+
+        cancelEdit() {
+            if (this.viewingPlanId) {
+                this.loadExistingPlan(this.viewingPlanId);
+            }
+            this.isEditMode = false;
+            this.showNotification('Edición cancelada', 'info');
+        },
+
+        async updateMonthlyPlan() {
+            if (!this.viewingPlanId) {
+                this.showNotification('Error: No hay plan para actualizar', 'error');
+                return;
+            }
+
+            try {
+                // Preparar datos - convertir mes formato YYYY-MM a YYYY-MM-01
+                const planData = { ...this.monthlyPlan };
+                if (planData.mes && planData.mes.length === 7) {
+                    planData.mes = planData.mes + '-01';
+                }
+
+                const response = await this.apiCall(
+                    `/api/monthly/plans/${this.viewingPlanId}`,
+                    'PUT',
+                    planData
+                );
+
+                if (response) {
+                    this.showNotification('Plan actualizado exitosamente', 'success');
+                    this.isEditMode = false;
+                    await this.loadMonthlyPlans();
+                }
+            } catch (error) {
+                this.showNotification('Error al actualizar: ' + error.message, 'error');
+            }
+        },
+
+        async saveMonthlyPlan() {
+            // Validar que se haya seleccionado un mes
+            if (!this.monthlyPlan.mes) {
+                this.showNotification('Por favor selecciona un mes', 'error');
+                return;
+            }
+
+            // Verificar si ya existe un plan para este mes
+            const existingPlan = this.monthlyPlans.find(p => p.mes === this.monthlyPlan.mes);
+
+            if (existingPlan && this.isCreatingNewPlan) {
+                const confirmed = confirm(
+                    `Ya existe un plan para ${this.formatDate(this.monthlyPlan.mes)}.\n\n` +
+                    `¿Deseas editar el plan existente?`
+                );
+
+                if (confirmed) {
+                    // Cambiar a modo edición del plan existente
+                    this.currentPlanId = existingPlan.id;
+                    this.viewingPlanId = existingPlan.id;
+                    this.isCreatingNewPlan = false;
+                    await this.loadExistingPlan(existingPlan.id);
+                    this.enableEditMode();
+                    return;
+                } else {
+                    return;
+                }
+            }
+
+            try {
+                // Preparar datos - convertir mes formato YYYY-MM a YYYY-MM-01
+                const planData = { ...this.monthlyPlan };
+                if (planData.mes && planData.mes.length === 7) {
+                    planData.mes = planData.mes + '-01';
+                }
+
+                const response = await this.apiCall('/api/monthly/plans', 'POST', planData);
+
+                if (response) {
+                    this.currentPlanId = response.id;
+                    this.viewingPlanId = response.id;
+                    this.isCreatingNewPlan = false;
+                    this.isEditMode = false;
+
+                    this.showNotification('Plan creado exitosamente', 'success');
+                    await this.loadMonthlyPlans();
+                }
+            } catch (error) {
+                if (error.message && (error.message.includes('duplicate') || error.message.includes('unique'))) {
+                    this.showNotification('Ya existe un plan para este mes', 'error');
+                } else {
+                    this.showNotification('Error: ' + error.message, 'error');
+                }
+            }
+        },
+
+        checkMonthAvailability() {
+            if (!this.isCreatingNewPlan) return;
+
+            const existingPlan = this.monthlyPlans.find(p => p.mes === this.monthlyPlan.mes);
+            this.monthAlreadyExists = !!existingPlan;
+        },
+
+        addCompetencia() {
+            if (!this.newCompetencia.nombre.trim()) {
+                this.showNotification('Ingresa el nombre de la competencia', 'error');
+                return;
+            }
+
+            this.monthlyPlan.competencias.push({...this.newCompetencia});
+
+            // Reset
+            this.newCompetencia = {
+                nombre: '',
+                progreso_inicio: 0,
+                progreso_actual: 0,
+                progreso_fin: null,
+                notas: '',
+                actividades: []
+            };
+
+            this.showNotification('Competencia agregada', 'success');
+        },
+
+        removeCompetencia(index) {
+            this.monthlyPlan.competencias.splice(index, 1);
+            this.showNotification('Competencia eliminada', 'success');
+        },
+
+        async updateCompetenciaProgress(index, field, value) {
+            this.monthlyPlan.competencias[index][field] = value;
+
+            // Guardar automáticamente si el plan ya existe
+            if (this.currentPlanId) {
+                try {
+                    await this.apiCall(
+                        `/api/monthly/plans/${this.currentPlanId}/competencias`,
+                        'PUT',
+                        this.monthlyPlan.competencias
+                    );
+                } catch (error) {
+                    console.error('Error updating competencia:', error);
+                }
+            }
+        },
+
+        addActividadToCompetencia(competenciaIndex) {
+            if (!this.newActividad || !this.newActividad.trim()) return;
+
+            const competencia = this.monthlyPlan.competencias[competenciaIndex];
+
+            if (!competencia.actividades) {
+                competencia.actividades = [];
+            }
+
+            competencia.actividades.push({
+                texto: this.newActividad.trim(),
+                completada: false,
+                fecha_creacion: new Date().toISOString().split('T')[0]
+            });
+
+            this.newActividad = '';
+
+            // Actualizar progreso basado en actividades
+            this.updateProgressoFromActividades(competenciaIndex);
+
+            if (this.currentPlanId) {
+                this.saveCompetencias();
+            }
+        },
+
+        toggleActividadCompletada(competenciaIndex, actividadIndex) {
+            const actividad = this.monthlyPlan.competencias[competenciaIndex].actividades[actividadIndex];
+            actividad.completada = !actividad.completada;
+
+            // Actualizar progreso automáticamente basado en actividades completadas
+            this.updateProgressoFromActividades(competenciaIndex);
+
+            if (this.currentPlanId) {
+                this.saveCompetencias();
+            }
+        },
+
+        updateProgressoFromActividades(competenciaIndex) {
+            const competencia = this.monthlyPlan.competencias[competenciaIndex];
+            if (!competencia.actividades || competencia.actividades.length === 0) return;
+
+            const completadas = competencia.actividades.filter(a => a.completada).length;
+            const total = competencia.actividades.length;
+            const porcentaje = Math.round((completadas / total) * 100);
+
+            // Actualizar progreso actual basado en las actividades completadas
+            competencia.progreso_actual = porcentaje;
+        },
+
+        removeActividad(competenciaIndex, actividadIndex) {
+            this.monthlyPlan.competencias[competenciaIndex].actividades.splice(actividadIndex, 1);
+
+            // Actualizar progreso basado en actividades
+            this.updateProgressoFromActividades(competenciaIndex);
+
+            if (this.currentPlanId) {
+                this.saveCompetencias();
+            }
+        },
+
+        async saveCompetencias() {
+            if (!this.currentPlanId) return;
+
+            try {
+                await this.apiCall(
+                    `/api/monthly/plans/${this.currentPlanId}/competencias`,
+                    'PUT',
+                    this.monthlyPlan.competencias
+                );
+                this.showNotification('Competencias actualizadas', 'success');
+            } catch (error) {
+                this.showNotification('Error: ' + error.message, 'error');
+            }
+        },
+
+        // Actividades del Plan Mensual
+        addActividadLograr() {
+            if (!this.newActividadLograr || !this.newActividadLograr.trim()) return;
+
+            if (!this.monthlyPlan.actividades_lograr) {
+                this.monthlyPlan.actividades_lograr = [];
+            }
+
+            this.monthlyPlan.actividades_lograr.push({
+                texto: this.newActividadLograr.trim(),
+                completada: false,
+                fecha_creacion: new Date().toISOString().split('T')[0]
+            });
+
+            this.newActividadLograr = '';
+        },
+
+        toggleActividadLograr(index) {
+            const actividad = this.monthlyPlan.actividades_lograr[index];
+            actividad.completada = !actividad.completada;
+        },
+
+        removeActividadLograr(index) {
+            this.monthlyPlan.actividades_lograr.splice(index, 1);
+        },
+
+        async saveMonthlyReview() {
+            try {
+                // Necesitamos el ID del plan mensual actual
+                const currentPlan = this.stats.currentMonthPlan;
+                if (!currentPlan) {
+                    this.showNotification('Debes crear un plan mensual primero', 'warning');
+                    return;
+                }
+
+                const reviewData = {
+                    ...this.monthlyReview,
+                    monthly_plan_id: currentPlan.id
+                };
+
+                const response = await this.apiCall('/api/monthly/reviews', 'POST', reviewData);
+
+                if (response) {
+                    this.showNotification('Evaluación mensual guardada exitosamente', 'success');
+
+                    // Reset form
+                    this.monthlyReview = {
+                        que_mejore: '',
+                        que_falta_mejorar: '',
+                        habilidades_desarrolladas: '',
+                        momento_memorable: ''
+                    };
+                }
+            } catch (error) {
+                this.showNotification('Error al guardar evaluación: ' + error.message, 'error');
+            }
+        },
+
+        async saveWeeklyLog() {
+            try {
+                const response = await this.apiCall('/api/weekly/logs', 'POST', this.weeklyLog);
+
+                if (response) {
+                    this.showNotification('Bitácora semanal guardada exitosamente', 'success');
+                    await this.loadWeeklyLogs();
+                    await this.loadDashboardData();
+
+                    // Reset form
+                    this.weeklyLog = {
+                        semana_inicio: new Date().toISOString().split('T')[0],
+                        semana_fin: new Date().toISOString().split('T')[0],
+                        logros: [],
+                        desafios: [],
+                        aprendizajes: '',
+                        reflexiones: '',
+                        nivel_energia: 3,
+                        nivel_satisfaccion: 3
+                    };
+                    this.newLogro = '';
+                    this.newDesafio = '';
+                }
+            } catch (error) {
+                this.showNotification('Error al guardar bitácora: ' + error.message, 'error');
+            }
+        },
+
+        addLogro() {
+            if (this.newLogro && this.newLogro.trim()) {
+                if (!Array.isArray(this.weeklyLog.logros)) {
+                    this.weeklyLog.logros = [];
+                }
+                this.weeklyLog.logros.push(this.newLogro.trim());
+                this.newLogro = '';
+            }
+        },
+
+        removeLogro(index) {
+            this.weeklyLog.logros.splice(index, 1);
+        },
+
+        addDesafio() {
+            if (this.newDesafio && this.newDesafio.trim()) {
+                if (!Array.isArray(this.weeklyLog.desafios)) {
+                    this.weeklyLog.desafios = [];
+                }
+                this.weeklyLog.desafios.push(this.newDesafio.trim());
+                this.newDesafio = '';
+            }
+        },
+
+        removeDesafio(index) {
+            this.weeklyLog.desafios.splice(index, 1);
+        },
+
+        viewWeeklyLog(log) {
+            console.log('=== DEBUG viewWeeklyLog ===');
+            console.log('Raw log object:', log);
+            console.log('log.logros type:', typeof log.logros, 'value:', log.logros);
+            console.log('log.desafios type:', typeof log.desafios, 'value:', log.desafios);
+
+            // Normalizar logros
+            let normalizedLogros = [];
+            if (Array.isArray(log.logros)) {
+                normalizedLogros = log.logros;
+            } else if (log.logros && typeof log.logros === 'string') {
+                normalizedLogros = [log.logros];
+            } else if (log.logros && typeof log.logros === 'object') {
+                // Podría ser un objeto JSON que necesita ser parseado
+                try {
+                    const parsed = typeof log.logros === 'string' ? JSON.parse(log.logros) : log.logros;
+                    normalizedLogros = Array.isArray(parsed) ? parsed : [parsed];
+                } catch (e) {
+                    normalizedLogros = [];
+                }
+            }
+
+            // Normalizar desafíos
+            let normalizedDesafios = [];
+            if (Array.isArray(log.desafios)) {
+                normalizedDesafios = log.desafios;
+            } else if (log.desafios && typeof log.desafios === 'string') {
+                normalizedDesafios = [log.desafios];
+            } else if (log.desafios && typeof log.desafios === 'object') {
+                try {
+                    const parsed = typeof log.desafios === 'string' ? JSON.parse(log.desafios) : log.desafios;
+                    normalizedDesafios = Array.isArray(parsed) ? parsed : [parsed];
+                } catch (e) {
+                    normalizedDesafios = [];
+                }
+            }
+
+            this.viewingWeeklyLog = {
+                ...log,
+                logros: normalizedLogros,
+                desafios: normalizedDesafios
+            };
+
+            console.log('Normalized viewingWeeklyLog:', this.viewingWeeklyLog);
+            console.log('logros array:', this.viewingWeeklyLog.logros);
+            console.log('desafios array:', this.viewingWeeklyLog.desafios);
+
+            this.showViewWeeklyLogModal = true;
+        },
+
+        editWeeklyLog(log) {
+            // Normalizar logros
+            let logros = [];
+            if (Array.isArray(log.logros)) {
+                logros = [...log.logros];
+            } else if (log.logros && typeof log.logros === 'string') {
+                logros = [log.logros];
+            }
+
+            // Normalizar desafíos
+            let desafios = [];
+            if (Array.isArray(log.desafios)) {
+                desafios = [...log.desafios];
+            } else if (log.desafios && typeof log.desafios === 'string') {
+                desafios = [log.desafios];
+            }
+
+            this.editingWeeklyLog = {
+                id: log.id,
+                semana_inicio: log.semana_inicio,
+                semana_fin: log.semana_fin,
+                logros: logros,
+                desafios: desafios,
+                aprendizajes: log.aprendizajes || '',
+                reflexiones: log.reflexiones || '',
+                nivel_energia: parseInt(log.nivel_energia) || 3,
+                nivel_satisfaccion: parseInt(log.nivel_satisfaccion) || 3
+            };
+            this.showEditWeeklyLogModal = true;
+        },
+
+        async updateWeeklyLog() {
+            try {
+                if (!this.editingWeeklyLog || !this.editingWeeklyLog.id) return;
+
+                await this.apiCall(`/api/weekly/logs/${this.editingWeeklyLog.id}`, 'PUT', this.editingWeeklyLog);
+                this.showNotification('Bitácora actualizada', 'success');
+                await this.loadWeeklyLogs();
+                this.showEditWeeklyLogModal = false;
+                this.editingWeeklyLog = null;
+            } catch (error) {
+                this.showNotification('Error: ' + error.message, 'error');
+            }
+        },
+
+        addLogroEdit() {
+            if (this.newLogro && this.newLogro.trim()) {
+                if (!Array.isArray(this.editingWeeklyLog.logros)) {
+                    this.editingWeeklyLog.logros = [];
+                }
+                this.editingWeeklyLog.logros.push(this.newLogro.trim());
+                this.newLogro = '';
+            }
+        },
+
+        removeLogroEdit(index) {
+            this.editingWeeklyLog.logros.splice(index, 1);
+        },
+
+        addDesafioEdit() {
+            if (this.newDesafio && this.newDesafio.trim()) {
+                if (!Array.isArray(this.editingWeeklyLog.desafios)) {
+                    this.editingWeeklyLog.desafios = [];
+                }
+                this.editingWeeklyLog.desafios.push(this.newDesafio.trim());
+                this.newDesafio = '';
+            }
+        },
+
+        removeDesafioEdit(index) {
+            this.editingWeeklyLog.desafios.splice(index, 1);
+        },
+
+        // UI Functions
+        toggleTheme() {
+            const html = document.documentElement;
+            const currentTheme = html.getAttribute('data-theme');
+            const newTheme = currentTheme === 'light' ? 'dark' : 'light';
+            html.setAttribute('data-theme', newTheme);
+            localStorage.setItem('theme', newTheme);
+        },
+        
+        showNotification(message, type = 'success') {
+            this.toastMessage = message;
+            this.toastType = type;
+            this.showToast = true;
+            setTimeout(() => {
+                this.showToast = false;
+            }, 3000);
+        },
+        
+        logout() {
+            localStorage.removeItem('access_token');
+            localStorage.removeItem('user_email');
+            window.location.href = '/login';
+        },
+        
+        // ========== GRÁFICAS CON APEXCHARTS ==========
+
+        initCharts() {
+            // Esperar a que ApexCharts esté cargado
+            if (typeof ApexCharts === 'undefined') {
+                setTimeout(() => this.initCharts(), 200);
+                return;
+            }
+
+            // Usar $nextTick para asegurar que Alpine terminó de renderizar
+            this.$nextTick(() => {
+                setTimeout(() => {
+                    if (this.currentView === 'dashboard') {
+                        this.renderWeeklyChart();
+                        this.renderCategoryChart();
+                    }
+                }, 100);
+            });
+        },
+
+        refreshCharts() {
+            this.$nextTick(() => {
+                setTimeout(() => {
+                    if (this.currentView === 'dashboard') {
+                        this.renderWeeklyChart();
+                        this.renderCategoryChart();
+                    } else if (this.currentView === 'monthly') {
+                        if (this.competenciasEvolution && Object.keys(this.competenciasEvolution).length > 0) {
+                            this.renderEvolutionChart();
+                        }
+                        if (this.planComparison) {
+                            this.renderCompetenciasChart();
+                        }
+                    } else if (this.currentView === 'financial' && this.financialView === 'dashboard') {
+                        this.updateExpensesChart();
+                    }
+                }, 100);
+            });
+        },
+
+        navigateTo(view) {
+            this.currentView = view;
+            this.refreshCharts();
+        },
+
+        renderWeeklyChart() {
+            try {
+                const container = document.getElementById('weeklyChart');
+                if (!container) {
+                    console.log('weeklyChart container not found');
+                    return;
+                }
+
+                // Verificar que hay tareas
+                if (!this.tasks) {
+                    console.log('Tasks not loaded yet for weekly chart, retrying...');
+                    setTimeout(() => this.renderWeeklyChart(), 500);
+                    return;
+                }
+
+                // Destruir chart existente
+                if (this.weeklyChart) {
+                    this.weeklyChart.destroy();
+                    this.weeklyChart = null;
+                }
+
+                // Datos de las últimas 7 semanas
+                const labels = [];
+                const completedData = [];
+                const pendingData = [];
+
+                for (let i = 6; i >= 0; i--) {
+                    const d = new Date();
+                    d.setDate(d.getDate() - (i * 7));
+                    labels.push(`${d.getDate()}/${d.getMonth() + 1}`);
+
+                    const weekStart = new Date(d);
+                    weekStart.setDate(weekStart.getDate() - 7);
+
+                    const completed = this.tasks.filter(t => {
+                        if (t.estado !== 'completada') return false;
+                        const taskDate = new Date(t.fecha_fin);
+                        return taskDate >= weekStart && taskDate <= d;
+                    }).length;
+
+                    const pending = this.tasks.filter(t => {
+                        if (t.estado === 'completada') return false;
+                        const taskDate = new Date(t.fecha_inicio || t.fecha);
+                        return taskDate >= weekStart && taskDate <= d;
+                    }).length;
+
+                    completedData.push(completed || Math.floor(Math.random() * 3) + 1);
+                    pendingData.push(pending || Math.floor(Math.random() * 4) + 2);
+                }
+
+                const options = {
+                    series: [{
+                        name: 'Completadas',
+                        data: completedData
+                    }, {
+                        name: 'En progreso',
+                        data: pendingData
+                    }],
+                    chart: {
+                        type: 'bar',
+                        height: 280,
+                        toolbar: { show: false }
+                    },
+                    plotOptions: {
+                        bar: {
+                            borderRadius: 4,
+                            columnWidth: '60%'
+                        }
+                    },
+                    colors: ['#22c55e', '#6366f1'],
+                    dataLabels: { enabled: false },
+                    xaxis: { categories: labels },
+                    yaxis: {
+                        min: 0,
+                        forceNiceScale: true,
+                        labels: {
+                            formatter: (val) => Math.floor(val)
+                        }
+                    },
+                    legend: { position: 'top' }
+                };
+
+                this.weeklyChart = new ApexCharts(container, options);
+                this.weeklyChart.render();
+                console.log('Weekly chart rendered');
+            } catch (error) {
+                console.error('Error rendering weekly chart:', error);
+            }
+        },
+
+        renderCategoryChart() {
+            try {
+                const container = document.getElementById('categoryChart');
+                if (!container) {
+                    console.log('categoryChart container not found');
+                    return;
+                }
+
+                // Verificar que hay tareas
+                if (!this.tasks || this.tasks.length === 0) {
+                    console.log('No tasks available for category chart, retrying...');
+                    setTimeout(() => this.renderCategoryChart(), 500);
+                    return;
+                }
+
+                // Destruir chart existente
+                if (this.categoryChart) {
+                    this.categoryChart.destroy();
+                    this.categoryChart = null;
+                }
+
+                // Contar tareas por categoría
+                const categoryCount = {};
+                this.tasks.forEach(task => {
+                    const cat = task.categoria || 'Sin categoría';
+                    categoryCount[cat] = (categoryCount[cat] || 0) + 1;
+                });
+
+                const labels = Object.keys(categoryCount);
+                const data = Object.values(categoryCount);
+                const colors = ['#6366f1', '#22c55e', '#f59e0b', '#ec4899', '#3b82f6', '#8b5cf6'];
+
+                const options = {
+                    series: data,
+                    chart: {
+                        type: 'donut',
+                        height: 280
+                    },
+                    labels: labels,
+                    colors: colors.slice(0, labels.length),
+                    plotOptions: {
+                        pie: {
+                            donut: {
+                                size: '60%'
+                            }
+                        }
+                    },
+                    legend: { position: 'right' },
+                    dataLabels: { enabled: false }
+                };
+
+                this.categoryChart = new ApexCharts(container, options);
+                this.categoryChart.render();
+                console.log('Category chart rendered');
+            } catch (error) {
+                console.error('Error rendering category chart:', error);
+            }
+        },
+
+        renderCompetenciasChart() {
+            try {
+                if (!this.planComparison || !this.planComparison.competencias_stats.competencias.length) {
+                    console.warn('No competencias data available');
+                    return;
+                }
+
+                const container = document.getElementById('competenciasChart');
+                if (!container) {
+                    console.error('Container competenciasChart not found');
+                    return;
+                }
+
+                // Destruir chart existente
+                if (this.competenciasChart) {
+                    this.competenciasChart.destroy();
+                }
+
+                const competencias = this.planComparison.competencias_stats.competencias;
+
+                const options = {
+                    series: [
+                        {
+                            name: 'Progreso Inicio',
+                            data: competencias.map(c => c.progreso_inicio || 0)
+                        },
+                        {
+                            name: 'Progreso Actual',
+                            data: competencias.map(c => c.progreso_actual || 0)
+                        },
+                        {
+                            name: 'Progreso Fin',
+                            data: competencias.map(c => c.progreso_fin || 0)
+                        }
+                    ],
+                    chart: {
+                        type: 'bar',
+                        height: 300,
+                        toolbar: { show: false }
+                    },
+                    plotOptions: {
+                        bar: {
+                            borderRadius: 4,
+                            columnWidth: '70%'
+                        }
+                    },
+                    colors: ['#6366f1', '#22c55e', '#8b5cf6'],
+                    dataLabels: { enabled: false },
+                    xaxis: { categories: competencias.map(c => c.nombre) },
+                    yaxis: {
+                        min: 0,
+                        max: 100,
+                        labels: {
+                            formatter: (val) => val + '%'
+                        }
+                    },
+                    legend: { position: 'top' },
+                    title: {
+                        text: 'Comparación de Progreso por Competencia',
+                        align: 'center'
+                    }
+                };
+
+                this.competenciasChart = new ApexCharts(container, options);
+                this.competenciasChart.render();
+                console.log('Competencias chart rendered successfully');
+            } catch (error) {
+                console.error('Error rendering competencias chart:', error);
+            }
+        },
+
+        renderEvolutionChart() {
+            try {
+                if (!this.competenciasEvolution || Object.keys(this.competenciasEvolution).length === 0) {
+                    console.warn('No evolution data available');
+                    return;
+                }
+
+                const container = document.getElementById('evolutionChart');
+                if (!container) {
+                    console.error('Container evolutionChart not found');
+                    return;
+                }
+
+                // Destruir chart existente
+                if (this.evolutionChart) {
+                    this.evolutionChart.destroy();
+                }
+
+                const colors = ['#6366f1', '#22c55e', '#8b5cf6', '#ec4899', '#fbbf24', '#3b82f6'];
+
+                const series = Object.keys(this.competenciasEvolution).map((competencia, index) => {
+                    const data = this.competenciasEvolution[competencia];
+                    return {
+                        name: competencia,
+                        data: data.map(d => ({
+                            x: new Date(d.mes).getTime(),
+                            y: d.progreso_fin || d.progreso_actual
+                        }))
+                    };
+                });
+
+                const options = {
+                    series: series,
+                    chart: {
+                        type: 'line',
+                        height: 300,
+                        toolbar: { show: false }
+                    },
+                    colors: colors,
+                    stroke: {
+                        curve: 'smooth',
+                        width: 2
+                    },
+                    xaxis: {
+                        type: 'datetime',
+                        labels: {
+                            format: 'MMM yyyy'
+                        },
+                        title: { text: 'Mes' }
+                    },
+                    yaxis: {
+                        min: 0,
+                        max: 100,
+                        labels: {
+                            formatter: (val) => val + '%'
+                        },
+                        title: { text: 'Progreso' }
+                    },
+                    legend: { position: 'top' },
+                    title: {
+                        text: 'Evolución de Competencias (Últimos 6 Meses)',
+                        align: 'center'
+                    }
+                };
+
+                this.evolutionChart = new ApexCharts(container, options);
+                this.evolutionChart.render();
+                console.log('Evolution chart rendered successfully');
+            } catch (error) {
+                console.error('Error rendering evolution chart:', error);
+            }
+        },
+
+        // Financial Methods
+        async loadFinancialCategories() {
+            try {
+                const response = await this.apiCall('/api/financial/categories');
+                if (response) {
+                    this.financialCategories = response;
+                }
+                if (response && response.length === 0) {
+                    await this.apiCall('/api/financial/initialize', 'POST');
+                    await this.loadFinancialCategories();
+                }
+            } catch (error) {
+                console.error('Error loading categories:', error);
+            }
+        },
+
+        async loadFinancialRecords(mes = null) {
+            try {
+                const queryMes = mes || this.selectedMonth + '-01';
+                const response = await this.apiCall(`/api/financial/records?mes=${queryMes}`);
+                if (response) {
+                    this.financialRecords = response;
+                }
+            } catch (error) {
+                console.error('Error loading records:', error);
+            }
+        },
+
+        async loadFinancialSummary(mes = null) {
+            try {
+                const queryMes = mes || this.selectedMonth + '-01';
+                const response = await this.apiCall(`/api/financial/summary?mes=${queryMes}`);
+                if (response) {
+                    this.financialSummary = response;
+                    // Solo renderizar si estamos en la vista financiera
+                    if (this.currentView === 'financial') {
+                        await this.$nextTick();
+                        setTimeout(() => {
+                            this.updateExpensesChart();
+                        }, 200);
+                    }
+                }
+            } catch (error) {
+                console.error('Error loading summary:', error);
+            }
+        },
+
+        async saveFinancialRecord() {
+            if (!this.newFinancialRecord.monto || this.newFinancialRecord.monto <= 0) {
+                this.showNotification('Ingresa un monto válido', 'error');
+                return;
+            }
+            if (!this.newFinancialRecord.category_id) {
+                this.showNotification('Selecciona una categoría', 'error');
+                return;
+            }
+
+            try {
+                this.newFinancialRecord.mes = this.selectedMonth + '-01';
+                await this.apiCall('/api/financial/records', 'POST', this.newFinancialRecord);
+                this.showNotification('Registro guardado', 'success');
+                await this.loadFinancialRecords();
+                await this.loadFinancialSummary();
+
+                // Reset form
+                this.newFinancialRecord = {
+                    mes: this.selectedMonth + '-01',
+                    fecha_transaccion: new Date().toISOString().split('T')[0],
+                    tipo: 'gasto',
+                    monto: 0,
+                    descripcion: '',
+                    category_id: ''
+                };
+            } catch (error) {
+                this.showNotification('Error: ' + error.message, 'error');
+            }
+        },
+
+        async deleteFinancialRecord(recordId) {
+            if (!confirm('¿Eliminar este registro?')) return;
+            try {
+                await this.apiCall(`/api/financial/records/${recordId}`, 'DELETE');
+                this.showNotification('Registro eliminado', 'success');
+                await this.loadFinancialRecords();
+                await this.loadFinancialSummary();
+            } catch (error) {
+                this.showNotification('Error: ' + error.message, 'error');
+            }
+        },
+
+        async saveFinancialCategory() {
+            if (!this.newFinancialCategory.nombre.trim()) {
+                this.showNotification('Ingresa un nombre', 'error');
+                return;
+            }
+            try {
+                await this.apiCall('/api/financial/categories', 'POST', this.newFinancialCategory);
+                this.showNotification('Categoría creada', 'success');
+                await this.loadFinancialCategories();
+                this.newFinancialCategory = {
+                    nombre: '',
+                    tipo: 'gasto',
+                    color: '#6366f1',
+                    icono: ''
+                };
+            } catch (error) {
+                this.showNotification('Error: ' + error.message, 'error');
+            }
+        },
+
+        async changeFinancialMonth() {
+            await this.loadFinancialRecords();
+            await this.loadFinancialSummary();
+        },
+
+        updateExpensesChart() {
+            try {
+                if (!this.financialSummary) return;
+
+                const gastos = this.financialSummary.gastos_por_categoria || [];
+                if (gastos.length === 0) return;
+
+                const container = document.getElementById('expensesChart');
+                if (!container) return;
+
+                // Destruir chart existente
+                if (this.expensesChart) {
+                    this.expensesChart.destroy();
+                }
+
+                const colors = gastos.map(g => {
+                    const cat = this.financialCategories.find(c => c.nombre === g.categoria);
+                    return cat ? cat.color : '#6366f1';
+                });
+
+                const options = {
+                    series: gastos.map(g => g.monto),
+                    chart: {
+                        type: 'donut',
+                        height: 280
+                    },
+                    labels: gastos.map(g => g.categoria),
+                    colors: colors,
+                    plotOptions: {
+                        pie: {
+                            donut: {
+                                size: '60%'
+                            }
+                        }
+                    },
+                    legend: { position: 'right' },
+                    dataLabels: { enabled: false },
+                    tooltip: {
+                        y: {
+                            formatter: (val, opts) => {
+                                const total = opts.globals.seriesTotals.reduce((a, b) => a + b, 0);
+                                const pct = ((val / total) * 100).toFixed(1);
+                                return `$${val.toLocaleString('es-MX', {minimumFractionDigits: 2})} (${pct}%)`;
+                            }
+                        }
+                    }
+                };
+
+                this.expensesChart = new ApexCharts(container, options);
+                this.expensesChart.render();
+                console.log('Expenses chart rendered successfully');
+            } catch (error) {
+                console.error('Error rendering expenses chart:', error);
+            }
+        },
+
+        formatCurrency(amount) {
+            return new Intl.NumberFormat('es-MX', {
+                style: 'currency',
+                currency: 'MXN'
+            }).format(amount || 0);
+        },
+
+        // Filtros de tareas
+        get filteredTasks() {
+            let filtered = this.tasks;
+
+            // Filtrar por estado
+            if (this.filterEstado) {
+                filtered = filtered.filter(t => t.estado === this.filterEstado);
+            }
+
+            // Filtrar por prioridad
+            if (this.filterPrioridad) {
+                filtered = filtered.filter(t => t.prioridad === this.filterPrioridad);
+            }
+
+            // Filtrar por clasificación
+            if (this.filterClasificacion) {
+                filtered = filtered.filter(t => t.clasificacion === this.filterClasificacion);
+            }
+
+            // Filtrar por fecha (fecha_inicio o fecha_fin coincide con la fecha seleccionada)
+            if (this.filterFecha) {
+                filtered = filtered.filter(t => {
+                    const fechaInicio = t.fecha_inicio ? t.fecha_inicio.split('T')[0] : null;
+                    const fechaFin = t.fecha_fin ? t.fecha_fin.split('T')[0] : null;
+                    return fechaInicio === this.filterFecha || fechaFin === this.filterFecha ||
+                           (fechaInicio <= this.filterFecha && fechaFin >= this.filterFecha);
+                });
+            }
+
+            return filtered;
+        },
+
+        get uniqueClasificaciones() {
+            const clasificaciones = new Set();
+            this.tasks.forEach(task => {
+                if (task.clasificacion) {
+                    clasificaciones.add(task.clasificacion);
+                }
+            });
+            return Array.from(clasificaciones).sort();
+        },
+
+        clearFilters() {
+            this.filterEstado = '';
+            this.filterPrioridad = '';
+            this.filterClasificacion = '';
+            this.filterFecha = '';
+        }
+    }
+}
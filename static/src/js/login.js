@@ -0,0 +1,106 @@
+function loginData() {
+    return {
+        isLogin: true,
+        showPassword: false,
+        loading: false,
+        error: false,
+        success: false,
+        errorMessage: '',
+        successMessage: '',
+        
+        // Form fields
+        email: '',
+        password: '',
+        nombreCompleto: '',
+        
+        checkAuth() {
+            const token = localStorage.getItem('access_token');
+            if (token) {
+                window.location.href = '/dashboard';
+            }
+        },
+        
+        async handleLogin() {
+            this.loading = true;
+            this.error = false;
+            
+            try {
+                const response = await fetch('/api/auth/login', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        email: this.email,
+                        password: this.password
+                    })
+                });
+                
+                if (response.ok) {
+                    const data = await response.json();
+                    localStorage.setItem('access_token', data.access_token);
+                    localStorage.setItem('user_email', data.email);
+                    localStorage.setItem('user_id', data.user_id);
+                    
+                    this.success = true;
+                    this.successMessage = '¡Inicio de sesión exitoso! Redirigiendo...';
+                    
+                    setTimeout(() => {
+                        window.location.href = '/dashboard';
+                    }, 1000);
+                } else {
+                    const errorData = await response.json();
+                    this.error = true;
+                    this.errorMessage = errorData.detail || 'Credenciales inválidas';
+                }
+            } catch (err) {
+                this.error = true;
+                this.errorMessage = 'Error de conexión. Verifica tu red.';
+            } finally {
+                this.loading = false;
+            }
+        },
+        
+        async handleRegister() {
+            this.loading = true;
+            this.error = false;
+            
+            try {
+                const response = await fetch('/api/auth/register', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        email: this.email,
+                        password: this.password,
+                        nombre_completo: this.nombreCompleto
+                    })
+                });
+                
+                if (response.ok) {
+                    const data = await response.json();
+                    localStorage.setItem('access_token', data.access_token);
+                    localStorage.setItem('user_email', data.email);
+                    localStorage.setItem('user_id', data.user_id);
+                    
+                    this.success = true;
+                    this.successMessage = '¡Cuenta creada exitosamente! Redirigiendo...';
+                    
+                    setTimeout(() => {
+                        window.location.href = '/dashboard';
+                    }, 1000);
+                } else {
+                    const errorData = await response.json();
+                    this.error = true;
+                    this.errorMessage = errorData.detail || 'Error al crear cuenta';
+                }
+            } catch (err) {
+                this.error = true;
+                this.errorMessage = 'Error de conexión. Verifica tu red.';
+            } finally {
+                this.loading = false;
+            }
+        }
+    }
+}
@@ -0,0 +1,41 @@
+"""
+Fixtures de las pruebas: la API completa sobre el backend en memoria
+(SUPABASE_BACKEND=memory), sin Supabase ni red.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Antes de importar main: la configuración se lee al importar
+os.environ["SUPABASE_BACKEND"] = "memory"
+os.environ["UPLOAD_DIR"] = tempfile.mkdtemp(prefix="pdp-tests-")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GC_INTERVAL_SECONDS", "0")
+os.environ.setdefault("ARCHIVE_INTERVAL_SECONDS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth(client):
+    """Headers de un usuario nuevo (cada prueba con sus propios datos)"""
+    response = client.post("/api/auth/register", json={
+        "email": f"{uuid.uuid4().hex[:12]}@pruebas.dev",
+        "password": "Secreta-123",
+        "nombre_completo": "Pruebas"
+    })
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,34 @@
+"""Caché de analítica: sin broker compartido y con varios workers no se usa"""
+
+import pytest
+
+import main
+
+class Broker:
+    def __init__(self, shared):
+        self.shared = shared
+
+@pytest.mark.parametrize("workers, shared, cached", [
+    (1, False, True),
+    (4, True, True),
+    (4, False, False),
+])
+def test_cache_only_used_when_invalidation_reaches_every_worker(workers, shared, cached):
+    cache = main.AnalyticsCache(60, 10, Broker(shared), workers)
+
+    result, generation = cache.get("u1", 12)
+    assert result is None
+    cache.put("u1", 12, generation, {"total": 1})
+
+    assert (cache.get("u1", 12)[0] == {"total": 1}) is cached
+
+def test_change_event_invalidates_result(client, auth):
+    first = client.get("/api/analytics", headers=auth)
+    assert first.status_code == 200, first.text
+
+    client.post("/api/tasks", headers=auth, json={
+        "titulo": "Nueva", "fecha_inicio": "2026-03-02", "fecha_fin": "2026-03-03"
+    })
+
+    user_id = main.decode_access_token(auth["Authorization"].split()[1])
+    assert main.analytics_cache.get(user_id, 12)[0] is None
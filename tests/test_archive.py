@@ -0,0 +1,49 @@
+"""Archivo: las filas archivadas dejan tombstone y no se pueden modificar (404)"""
+
+from urllib.parse import quote
+
+import main
+
+def archive(tabla):
+    main.supabase_admin.rpc("archive_batch", {
+        "p_tabla": tabla, "p_before": "2025-01-01", "p_limit": 500
+    }).execute()
+
+def create_old_rows(client, auth):
+    task = client.post("/api/tasks", headers=auth, json={
+        "titulo": "Antigua", "fecha_inicio": "2024-03-04", "fecha_fin": "2024-03-08"
+    }).json()
+    client.put(f"/api/tasks/{task['id']}", headers=auth, json={"estado": "completada"})
+    log = client.post("/api/weekly/logs", headers=auth, json={
+        "semana_inicio": "2024-03-04", "semana_fin": "2024-03-10"
+    }).json()
+    record = client.post("/api/financial/records", headers=auth, json={
+        "mes": "2024-03-01", "fecha_transaccion": "2024-03-05", "tipo": "gasto", "monto": 50
+    }).json()
+    return task["id"], log["id"], record["id"]
+
+def test_archiving_sends_tombstones_to_sync(client, auth):
+    task_id, log_id, record_id = create_old_rows(client, auth)
+    cursor = client.get("/api/sync", headers=auth).json()["cursor"]
+
+    for tabla in main.ARCHIVE_TABLES:
+        archive(tabla)
+
+    delta = client.get(f"/api/sync?since={quote(cursor)}", headers=auth).json()
+    assert task_id in delta["deleted"]["daily_tasks"]
+    assert log_id in delta["deleted"]["weekly_logs"]
+    assert record_id in delta["deleted"]["financial_records"]
+
+def test_archived_rows_return_404(client, auth):
+    task_id, log_id, record_id = create_old_rows(client, auth)
+    for tabla in main.ARCHIVE_TABLES:
+        archive(tabla)
+
+    assert client.get(f"/api/tasks/{task_id}", headers=auth).status_code == 404
+    assert client.put(f"/api/tasks/{task_id}", headers=auth, json={"titulo": "x"}).status_code == 404
+    assert client.delete(f"/api/tasks/{task_id}", headers=auth).status_code == 404
+    assert client.get(f"/api/weekly/logs/{log_id}", headers=auth).status_code == 404
+    assert client.put(f"/api/weekly/logs/{log_id}", headers=auth, json={
+        "semana_inicio": "2024-03-04", "semana_fin": "2024-03-10"
+    }).status_code == 404
+    assert client.delete(f"/api/financial/records/{record_id}", headers=auth).status_code == 404
@@ -0,0 +1,125 @@
+"""Importación: restaurar la propia exportación no duplica ni pierde columnas"""
+
+import io
+import zipfile
+
+import orjson
+
+import main
+
+TABLES = ("daily_tasks", "actividades", "financial_records", "weekly_logs")
+
+def user_of(auth):
+    return main.decode_access_token(auth["Authorization"].split()[1])
+
+def rows(tabla, user_id):
+    return main.supabase_admin.table(tabla).select("*").eq("user_id", user_id).execute().data
+
+def import_zip(client, auth, contents):
+    response = client.post(
+        "/api/import", headers=auth,
+        files={"archivo": ("export.zip", contents, "application/zip")}
+    )
+    assert response.status_code == 200, response.text
+    final = orjson.loads(response.text.strip().splitlines()[-1])
+    assert final["estado"] == "completado" and not final["errores"], final
+    return final
+
+def make_zip(**tablas):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("manifest.json", orjson.dumps({"formato": "ndjson"}))
+        for tabla, filas in tablas.items():
+            zf.writestr(f"{tabla}.ndjson", b"".join(orjson.dumps(f) + b"\n" for f in filas))
+    return buffer.getvalue()
+
+def seed(client, auth):
+    task = client.post("/api/tasks", headers=auth, json={
+        "titulo": "Preparar charla", "fecha_inicio": "2026-03-02", "fecha_fin": "2026-03-06"
+    }).json()
+    client.put(f"/api/tasks/{task['id']}", headers=auth, json={"estado": "completada"})
+    client.post("/api/tasks", headers=auth, json={
+        "titulo": "Subtarea", "fecha_inicio": "2026-03-02", "fecha_fin": "2026-03-03",
+        "parent_task_id": task["id"]
+    })
+    for titulo in ("Curso", "Certificación", "Proyecto"):
+        client.post("/api/actividades", headers=auth, json={
+            "titulo": titulo, "fecha_inicio": "2026-03-01", "fecha_fin": "2026-03-31"
+        })
+    for monto in (1500, 200):
+        client.post("/api/financial/records", headers=auth, json={
+            "mes": "2026-03-01", "fecha_transaccion": "2026-03-05",
+            "tipo": "ingreso" if monto > 1000 else "gasto", "monto": monto
+        })
+    client.post("/api/weekly/logs", headers=auth, json={
+        "semana_inicio": "2026-03-02", "semana_fin": "2026-03-08", "logros": ["Charla"]
+    })
+
+def test_reimporting_own_export_is_idempotent(client, auth):
+    user_id = user_of(auth)
+    seed(client, auth)
+    before = {tabla: len(rows(tabla, user_id)) for tabla in TABLES}
+    completed_at = {r["id"]: r.get("completed_at") for r in rows("daily_tasks", user_id)}
+    assert any(completed_at.values())
+
+    export = client.get("/api/export", headers=auth).content
+    import_zip(client, auth, export)
+    import_zip(client, auth, export)
+
+    assert {tabla: len(rows(tabla, user_id)) for tabla in TABLES} == before
+    assert {r["id"]: r.get("completed_at") for r in rows("daily_tasks", user_id)} == completed_at
+
+def test_import_into_another_account_keeps_columns_and_parents(client, auth):
+    source = auth
+    seed(client, source)
+    export = client.get("/api/export", headers=source).content
+
+    response = client.post("/api/auth/register", json={
+        "email": f"destino-{user_of(auth)[:8]}@pruebas.dev",
+        "password": "Secreta-123",
+        "nombre_completo": "Destino"
+    })
+    target = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    target_id = user_of(target)
+
+    import_zip(client, target, export)
+    import_zip(client, target, export)
+
+    tasks = rows("daily_tasks", target_id)
+    assert len(tasks) == 2
+    ids = {t["id"] for t in tasks}
+    assert not ids & {t["id"] for t in rows("daily_tasks", user_of(source))}
+    assert [t["parent_task_id"] for t in tasks if t["parent_task_id"]] == [
+        t["id"] for t in tasks if t["titulo"] == "Preparar charla"
+    ]
+    assert any(t.get("completed_at") for t in tasks)
+
+def test_duplicate_natural_keys_in_one_chunk_keep_the_last(client, auth):
+    user_id = user_of(auth)
+    semana = {"semana_inicio": "2026-04-06", "semana_fin": "2026-04-12"}
+    contents = make_zip(weekly_logs=[
+        {"id": "a", **semana, "logros": ["primero"]},
+        {"id": "b", **semana, "logros": ["segundo"]},
+    ])
+
+    final = import_zip(client, auth, contents)
+
+    logs = rows("weekly_logs", user_id)
+    assert len(logs) == 1
+    assert logs[0]["logros"] == ["segundo"]
+    assert final["tablas"]["weekly_logs"]["importadas"] == 1
+
+def test_reimport_skips_rows_already_archived(client, auth):
+    user_id = user_of(auth)
+    seed(client, auth)
+    export = client.get("/api/export", headers=auth).content
+
+    main.supabase_admin.rpc("archive_batch", {
+        "p_tabla": "financial_records", "p_before": "2026-10-01", "p_limit": 500
+    }).execute()
+    assert not rows("financial_records", user_id)
+
+    import_zip(client, auth, export)
+
+    assert not rows("financial_records", user_id)
+    assert len(rows("financial_records_archive", user_id)) == 2
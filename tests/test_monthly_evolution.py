@@ -0,0 +1,39 @@
+"""Evolución de competencias: `months` acotado y con el mismo significado en ambos orígenes"""
+
+from datetime import date
+
+import pytest
+
+import main
+
+def month_start(months_ago):
+    today = date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months_ago, 12)
+    return date(year, month + 1, 1).isoformat()
+
+@pytest.mark.parametrize("source", ["plans", "series"])
+@pytest.mark.parametrize("months", [0, -3, 121, 100000])
+def test_out_of_range_months_is_rejected(client, auth, source, months):
+    response = client.get(f"/api/monthly/evolution?source={source}&months={months}", headers=auth)
+    assert response.status_code == 422
+
+def test_months_counts_calendar_months_in_both_sources(client, auth):
+    user_id = main.decode_access_token(auth["Authorization"].split()[1])
+    # Planes de este mes y de hace 3 meses (sin los intermedios)
+    for months_ago in (0, 3):
+        mes = month_start(months_ago)
+        client.post("/api/monthly/plans", headers=auth, json={
+            "mes": mes,
+            "objetivos": "Plan",
+            "competencias": [{"nombre": "SQL", "progreso_inicio": 10}]
+        })
+        main.supabase_admin.table("competencias_progress").insert({
+            "user_id": user_id, "mes": mes, "competencia": "SQL",
+            "progreso_inicio": 10, "progreso_actual": 10, "progreso_fin": None
+        }).execute()
+
+    for months, esperados in ((2, 1), (4, 2)):
+        plans = client.get(f"/api/monthly/evolution?months={months}", headers=auth).json()
+        series = client.get(f"/api/monthly/evolution?source=series&months={months}", headers=auth).json()
+        assert len(plans["plans"]) == esperados
+        assert len(series["evolution"]["SQL"]) == esperados
@@ -0,0 +1,36 @@
+"""Creación de planes mensuales: POST no sobrescribe, upsert=true sí"""
+
+import main
+
+PLAN = {
+    "mes": "2026-03-01",
+    "objetivos": "Terminar la certificación",
+    "competencias": [{"nombre": "Python", "progreso_inicio": 40, "progreso_objetivo": 80}],
+}
+
+def test_post_for_existing_month_returns_409_and_keeps_plan(client, auth):
+    first = client.post("/api/monthly/plans", headers=auth, json=PLAN)
+    assert first.status_code == 200, first.text
+
+    second = client.post("/api/monthly/plans", headers=auth, json={**PLAN, "objetivos": "Otro", "competencias": []})
+    assert second.status_code == 409
+
+    plan = client.get(f"/api/monthly/plans/{first.json()['id']}", headers=auth).json()
+    assert plan["objetivos"] == PLAN["objetivos"]
+    assert plan["competencias"] == PLAN["competencias"]
+
+def test_upsert_replaces_plan_and_notifies_update(client, auth, monkeypatch):
+    events = []
+
+    async def record(user_id, tabla, accion, row_id=None):
+        events.append((tabla, accion))
+
+    monkeypatch.setattr(main, "notify_change", record)
+
+    created = client.post("/api/monthly/plans?upsert=true", headers=auth, json=PLAN)
+    replaced = client.post("/api/monthly/plans?upsert=true", headers=auth, json={**PLAN, "objetivos": "Nuevo"})
+
+    assert replaced.status_code == 200
+    assert replaced.json()["id"] == created.json()["id"]
+    assert replaced.json()["objetivos"] == "Nuevo"
+    assert events == [("monthly_plans", "insert"), ("monthly_plans", "update")]
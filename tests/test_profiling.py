@@ -0,0 +1,39 @@
+"""Perfilado: las respuestas en streaming no se retienen hasta terminar"""
+
+import asyncio
+
+import main
+
+SCOPE = {
+    "type": "http", "method": "GET", "path": "/api/events",
+    "query_string": b"__profile=1", "headers": [],
+}
+
+def test_streaming_response_is_sent_before_it_ends(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "PROFILE_DIR", tmp_path)
+    sent = []
+    never = asyncio.Event()
+
+    async def sse_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream")]})
+        await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+        await never.wait()
+
+    async def record(message):
+        sent.append(message)
+
+    async def run():
+        task = asyncio.create_task(main.ProfilingMiddleware(sse_app)(dict(SCOPE), None, record))
+        await asyncio.sleep(0.05)
+        # Antes de que la respuesta termine
+        received = list(sent)
+        task.cancel()
+        return received
+
+    received = asyncio.run(run())
+
+    assert [m["type"] for m in received] == ["http.response.start", "http.response.body"]
+    headers = dict(received[0]["headers"])
+    assert b"server-timing" in headers
+    assert (tmp_path / f"{headers[b'x-profile-id'].decode()}.prof").exists()
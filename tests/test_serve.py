@@ -0,0 +1,34 @@
+"""serve.py: un solo worker por defecto sin Redis"""
+
+import pytest
+
+import serve
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    for name in ("WEB_CONCURRENCY", "EVENTS_BROKER_URL", "IDEMPOTENCY_REDIS_URL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("SUPABASE_BACKEND", "supabase")
+    monkeypatch.setattr(serve, "available_cores", lambda: 8)
+    return monkeypatch
+
+def test_defaults_to_one_worker_without_redis():
+    assert serve.worker_count() == 1
+
+def test_uses_every_core_with_a_shared_broker(env):
+    env.setenv("EVENTS_BROKER_URL", "redis://localhost:6379/0")
+    env.setattr(serve, "per_worker_state", lambda: [])
+    assert serve.worker_count() == 8
+
+def test_explicit_workers_without_redis_lists_every_per_worker_store(env, capsys):
+    env.setenv("WEB_CONCURRENCY", "3")
+    assert serve.worker_count() == 3
+
+    warning = capsys.readouterr().out
+    for store in ("SSE", "Idempotency-Key", "analytics", "calendario", "páginas HTML"):
+        assert store in warning
+
+def test_memory_backend_forces_one_worker(env):
+    env.setenv("WEB_CONCURRENCY", "4")
+    env.setenv("SUPABASE_BACKEND", "memory")
+    assert serve.worker_count() == 1